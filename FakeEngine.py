@@ -0,0 +1,256 @@
+#!/usr/local/bin/python3
+
+"""
+101826
+Python 3.12.7
+
+FakeEngine.py - Stand-in Quake engine to test the smoke test & timedemo runners without Quake, and checks that run it.
+Usage as an engine: python FakeEngine.py -basedir /Quake -game mymod -dedicated 1 +map e1m1 +quit
+                    python FakeEngine.py -basedir /Quake -game mymod -fakefps 300 +timedemo demo1
+Usage as a check: python FakeEngine.py --check [--keep FOLDER]
+The map name picks the behaviour of a +map launch:
+    *crash* - killed by SIGSEGV, or exit code 3 without signals.
+    *error* - prints a Host_Error line then exits with code 0, as engines do after +quit.
+    *hang* - never exits.
+    Maps missing from the maps folder & pak files of -game and id1 print Couldn't spawn server and exit with code 0.
+    Any other map loads and exits with code 0.
+The demo name picks the behaviour of a +timedemo launch:
+    *hang* - never prints a result.
+    *broken* - prints a Host_Error line then exits with code 1.
+    Demos missing from -game and id1 print an error and exit with code 0.
+    Any other demo prints "969 frames S seconds F fps", F is -fakefps, then keeps running until killed.
+Functions
+    find_file(basedir, game, name) - True if the engine would find the file, loose or in a pak file.
+    engine(argv) - Engine entry, the console output goes to stdout.
+    launcher(folder, name, *args) - Executable script starting this engine with extra arguments, POSIX only.
+    check_smoke(root) - Run QuakeFoo.smoke_test() on a generated mod and compare the results with SMOKECASES.
+    check_timedemo(root) - Run QuakeFoo.timedemo() with two engines and compare the summary with TIMEDEMOCASES.
+    main(argv) - Command-line entry.
+
+"""
+
+import os
+import sys
+import time
+import shutil
+import signal
+import argparse
+import tempfile
+
+SMOKECASES = {  # Map -> expected smoke_test() status.
+    'start.bsp': 'pass',
+    'fake_ok.bsp': 'pass',
+    'fake_crash.bsp': 'fail',
+    'fake_error.bsp': 'fail',
+    'fake_hang.bsp': 'timeout',
+    'fake_absent.bsp': 'fail',
+}
+TIMEDEMOCASES = {  # Demo -> expected timedemo() status.
+    'demo_ok.dem': 'ok',
+    'demo_broken.dem': 'fail',
+    'demo_hang.dem': 'timeout',
+    'demo_absent.dem': 'fail',
+}
+TIMEDEMOENGINES = {'fastquake': 300.0, 'slowquake': 150.0}  # Launcher name -> -fakefps.
+TIMEDEMOFRAMES = 969
+CHECKTIMEOUT = 2  # Seconds per launch in the checks.
+
+
+def find_file(basedir, game, name):
+    """
+    :param basedir: Base directory.
+    :param game: Mod folder or None.
+    :param name: Game file ex. maps/e1m1.bsp or demo1.dem
+    :return: True if the file is loose or packed in a pak file of -game or id1.
+    """
+    import QuakeFoo as qf
+    for folder in [os.path.join(basedir, game)] * bool(game) + [os.path.join(basedir, 'id1')]:
+        if os.path.isfile(os.path.join(folder, name)):
+            return True
+        try:
+            paks = sorted(pak for pak in os.listdir(folder) if pak.lower().endswith('.pak'))
+        except OSError:
+            continue
+        if any(name in qf.read_pak(os.path.join(folder, pak)) for pak in paks):
+            return True
+    return False
+
+def engine(argv):
+    """
+    Parse the Quake command line, -option value and +command arguments, and act out the launch.
+
+    :param argv: List of command-line arguments.
+    :return: Exit code.
+    """
+    options = dict()
+    commands = []
+    for n, arg in enumerate(argv):
+        if arg.startswith('-'):
+            options[arg] = argv[n + 1] if n + 1 < len(argv) and argv[n + 1][0] not in '-+' else '1'
+        elif arg.startswith('+'):
+            commands.append([arg[1:]])
+        elif commands:
+            commands[-1].append(arg)
+    basedir = options.get('-basedir', '.')
+    game = options.get('-game')
+    print("FakeEngine 1.0")
+    print(f"basedir {basedir}, game {game or 'id1'}", flush=True)
+
+    for command, *args in commands:
+        if command == 'map' and args:
+            mapname = args[0]
+            if 'crash' in mapname:
+                print(f"Loading maps/{mapname}.bsp", flush=True)
+                if hasattr(signal, 'SIGSEGV') and os.name == 'posix':
+                    os.kill(os.getpid(), signal.SIGSEGV)
+                return 3
+            if 'error' in mapname:
+                print(f"Host_Error: Mod_LoadBrushModel: maps/{mapname}.bsp has wrong version number (30 should be 29)")
+                continue
+            if 'hang' in mapname:
+                print(f"Loading maps/{mapname}.bsp", flush=True)
+                while True:
+                    time.sleep(60)
+            if not find_file(basedir, game, f"maps/{mapname}.bsp"):
+                print(f"Couldn't spawn server maps/{mapname}.bsp")
+                continue
+            print(f"Loading maps/{mapname}.bsp")
+            print("Server spawned.")
+        elif command == 'timedemo' and args:
+            demo = args[0].removesuffix('.dem')
+            print(f"Playing demo from {demo}.dem.", flush=True)
+            if 'hang' in demo:
+                while True:
+                    time.sleep(60)
+            if 'broken' in demo:
+                print("Host_Error: CL_ParseServerMessage: Illegal server message", flush=True)
+                return 1
+            if not find_file(basedir, game, f"{demo}.dem"):
+                print(f"ERROR: couldn't open {demo}.dem.")
+                continue
+            fps = float(options.get('-fakefps', 300))
+            print(f"{TIMEDEMOFRAMES} frames {TIMEDEMOFRAMES / fps:.1f} seconds {fps:.1f} fps", flush=True)
+            while True:  # Engines stay at the console after a timedemo, the runner stops them.
+                time.sleep(60)
+        elif command == 'quit':
+            break
+    sys.stdout.flush()
+    return 0
+
+def launcher(folder, name, *args):
+    """
+    Write an executable shell script that starts this engine, QuakeFoo only launches an executable file.
+
+    :param folder: Folder of the script.
+    :param name: Script name.
+    :param args: Arguments added before those of the launch.
+    :return: Path of the script.
+    """
+    path = os.path.join(folder, name)
+    extra = ''.join(f' "{arg}"' for arg in args)
+    with open(path, 'w') as out_file:
+        out_file.write(f'#!/bin/sh\nexec "{sys.executable}" "{os.path.abspath(__file__)}"{extra} "$@"\n')
+    os.chmod(path, 0o755)
+    return path
+
+def _library(root):
+    """
+    Base directory with id1 and the mod folder fake, see QuakeBench.make_library(). Redirects the QuakeFoo cache files
+    into root so the checks never touch the caches of rsrc.
+    """
+    import QuakeBench as qb
+    qb.reset_caches(os.path.join(root, 'caches'))
+    basedir = os.path.join(root, 'quake')
+    qb.make_library(basedir, mods=0)
+    maps = os.path.join(basedir, 'fake', 'maps')
+    os.makedirs(maps)
+    for bsp in SMOKECASES:
+        if bsp != 'fake_absent.bsp' and bsp != 'start.bsp':
+            with open(os.path.join(maps, bsp), 'wb') as out_file:
+                out_file.write(qb.make_bsp([{'classname': 'worldspawn'}]))
+    with open(os.path.join(basedir, 'fake', 'progs.dat'), 'wb') as out_file:
+        out_file.write(b'\0' * 64)
+    for demo in TIMEDEMOCASES:
+        if demo != 'demo_absent.dem':
+            with open(os.path.join(basedir, 'fake', demo), 'wb') as out_file:
+                out_file.write(b'-1\n')
+    return basedir
+
+def check_smoke(root):
+    """
+    Run QuakeFoo.smoke_test() with this engine on the maps of SMOKECASES and compare the statuses.
+
+    :param root: Scratch folder.
+    :return: List of the mismatches as text, empty if the check passed.
+    """
+    import QuakeFoo as qf
+    basedir = _library(root)
+    quake = launcher(root, 'fakequake')
+    results = list(qf.smoke_test(quake, basedir, 'fake', list(SMOKECASES), jobs=len(SMOKECASES), timeout=CHECKTIMEOUT))
+    print(qf.smoke_table(results))
+    status = {result['map']: result['status'] for result in results}
+    return [f"smoke_test {bsp}: {status.get(bsp)}, expected {expected}"
+            for bsp, expected in SMOKECASES.items() if status.get(bsp) != expected]
+
+def check_timedemo(root, repeat=2):
+    """
+    Run QuakeFoo.timedemo() with the engines of TIMEDEMOENGINES on the demos of TIMEDEMOCASES and compare the
+    statuses, then the runs & fps of QuakeFoo.timedemo_summary().
+
+    :param root: Scratch folder.
+    :param repeat: Runs of each engine & demo.
+    :return: List of the mismatches as text, empty if the check passed.
+    """
+    import QuakeFoo as qf
+    basedir = os.path.join(root, 'quake') if os.path.isdir(os.path.join(root, 'quake')) else _library(root)
+    engines = {launcher(root, name, '-fakefps', str(fps)): fps for name, fps in TIMEDEMOENGINES.items()}
+    results = list(qf.timedemo(list(engines), basedir, list(TIMEDEMOCASES), 'fake', repeat, timeout=CHECKTIMEOUT))
+    summary = qf.timedemo_summary(results)
+    print(qf.timedemo_table(summary))
+
+    errors = [f"timedemo {os.path.basename(r['engine'])} {r['demo']} #{r['run']}: {r['status']}, expected {TIMEDEMOCASES[r['demo']]}"
+              for r in results if r['status'] != TIMEDEMOCASES[r['demo']]]
+    if len(results) != len(engines) * len(TIMEDEMOCASES) * repeat:
+        errors.append(f"timedemo: {len(results)} runs, expected {len(engines) * len(TIMEDEMOCASES) * repeat}")
+    for row in summary:
+        ok = TIMEDEMOCASES[row['demo']] == 'ok'
+        expected = (repeat, 0, engines[row['engine']], 0.0) if ok else (0, repeat, None, None)
+        found = (row['runs'], row['failed'], row['fps_mean'], row['fps_stddev'])
+        if found != expected:
+            errors.append(f"timedemo_summary {os.path.basename(row['engine'])} {row['demo']}: runs, failed, fps, "
+                          f"stddev {found}, expected {expected}")
+    return errors
+
+def main(argv=None):
+    """
+    Act as an engine, or with --check run the checks and report the mismatches.
+
+    :param argv: List of command-line arguments, None for sys.argv.
+    :return: Exit code.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if '--check' not in argv:
+        return engine(argv)
+
+    parser = argparse.ArgumentParser(prog='FakeEngine.py', description="Check the smoke test & timedemo runners against this engine.")
+    parser.add_argument('--check', action='store_true', help="Run the checks.")
+    parser.add_argument('--keep', help="Folder of the generated library, a temporary folder is used and removed if omitted.")
+    args = parser.parse_args(argv)
+    if os.name != 'posix':
+        parser.error("The checks launch the engine through a shell script, POSIX only.")
+
+    root = args.keep or tempfile.mkdtemp(prefix='qrfake')
+    os.makedirs(root, exist_ok=True)
+    try:
+        errors = check_smoke(root) + check_timedemo(root)
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+    for error in errors:
+        print(error, file=sys.stderr)
+    print("Check failed." if errors else "Check passed.")
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,333 @@
+#!/usr/local/bin/python3
+
+"""
+101826
+Python 3.12.7
+
+QuakeBench.py - Synthetic Quake library generator and benchmark of the QuakeFoo scanner functions.
+Usage: python QuakeBench.py [--mods 10000] [--maps 10] [--packed 0.5] [--repeat 5] [--sample 200] [--output FILE]
+       python QuakeBench.py --check
+Functions
+    make_pak(path, files) - Write a pak file from a dictionary of name -> bytes.
+    make_bsp(entities) - Minimal bsp file with an entity lump, see QuakeFoo.bsp_info().
+    make_library(root, mods, maps, packed, seed) - Generate a fake base directory, id1 with pak0/pak1 and mod folders.
+    reset_caches(folder) - Clear the in-memory caches of QuakeFoo and point its cache files to folder.
+    bench(basedir, repeat, sample) - Time id1_check, get_game_folders, get_maps and get_readme cold and warm.
+    check_duplicates(root) - Check that find_duplicates() never offers a mod folder against an extracted archive.
+    main(argv) - Command-line entry, writes the results and the foo.timingReport() of the run as json.
+
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import statistics
+import tempfile
+
+import foo
+import QuakeFoo as qf
+
+WORDS = ('quake', 'ranger', 'shambler', 'vore', 'fiend', 'ogre', 'zombie', 'grunt', 'enforcer', 'knight', 'rune',
+         'slipgate', 'episode', 'nailgun', 'rocket', 'lightning', 'grenade', 'secret', 'skill', 'nightmare', 'castle',
+         'base', 'metal', 'runic', 'wizard', 'chthon', 'shub', 'niggurath', 'teleport', 'lava', 'slime', 'custom')
+ID1PAK0 = ['start'] + [f"e1m{n}" for n in range(1, 9)]  # Shareware episode.
+ID1PAK1 = [f"e{e}m{n}" for e in range(2, 5) for n in range(1, 8)] + ['e4m8', 'end', 'dm1', 'dm2', 'dm3', 'dm4', 'dm5', 'dm6']
+
+
+def make_pak(path, files):
+    """
+    Write a pak file, see QuakeFoo.PAKHEADER & QuakeFoo.PAKENTRY.
+
+    :param path: Path & name of the pak file.
+    :param files: Dictionary of name ex. maps/e1m1.bsp -> bytes.
+    :return: None
+    """
+    offset = qf.PAKHEADER.size
+    entries = []
+    for name, data in files.items():
+        entries.append(qf.PAKENTRY.pack(name.encode('latin-1'), offset, len(data)))
+        offset += len(data)
+    directory = b''.join(entries)
+    with open(path, 'wb') as out_file:
+        out_file.write(qf.PAKHEADER.pack(b'PACK', offset, len(directory)))
+        for data in files.values():
+            out_file.write(data)
+        out_file.write(directory)
+
+def make_bsp(entities):
+    """
+    Minimal bsp file, the header and the entity lump. Enough for the scanner and QuakeFoo.bsp_info().
+
+    :param entities: List of entity dictionaries, the first is worldspawn.
+    :return: bytes
+    """
+    text = ''.join('{\n' + ''.join(f'"{ky}" "{val}"\n' for ky, val in entity.items()) + '}\n' for entity in entities)
+    lump = text.encode('latin-1') + b'\0'
+    lumps = [0] * 30
+    lumps[qf.LUMP_ENTITIES * 2] = qf.BSPLUMPS.size
+    lumps[qf.LUMP_ENTITIES * 2 + 1] = len(lump)
+    return qf.BSPLUMPS.pack(qf.BSPVERSIONS[0], *lumps) + lump
+
+def _map(rnd, name):
+    entities = [{'classname': 'worldspawn', 'message': f"The {rnd.choice(WORDS).title()} of {name}"},
+                {'classname': 'info_player_start', 'origin': '0 0 24'}]
+    for n in range(rnd.randint(2, 12)):
+        entities.append({'classname': rnd.choice(('monster_army', 'monster_ogre', 'monster_knight', 'item_health')),
+                         'origin': f"{n * 64} 0 24", 'spawnflags': str(rnd.choice((0, 256, 512, 1024)))})
+    if rnd.random() < 0.5:
+        entities.append({'classname': 'trigger_secret'})
+    return make_bsp(entities)
+
+def _readme(rnd, name):
+    lines = [name, '=' * len(name), '']
+    lines += [' '.join(rnd.choice(WORDS) for _ in range(rnd.randint(6, 14))) for _ in range(rnd.randint(5, 40))]
+    return '\n'.join(lines) + '\n'
+
+def make_library(root, mods=100, maps=10, packed=0.5, seed=0):
+    """
+    Generate a fake Quake base directory. id1 has pak0.pak & pak1.pak with the original map names. Each mod folder
+    has a readme, a progs.dat or a pak0.pak and its maps split between the maps folder and the pak file. One folder
+    in twenty has no game data, as with tool and backup folders in a real library.
+
+    :param root: Base directory, created if missing.
+    :param mods: Number of mod folders.
+    :param maps: Maps per mod folder.
+    :param packed: Fraction of the maps packed in pak0.pak, the others are loose bsp files.
+    :param seed: Random seed, the same arguments give the same library.
+    :return: Dictionary of counts, 'mods', 'maps', 'loose', 'packed', 'seconds'.
+    """
+    start = time.perf_counter()
+    rnd = random.Random(seed)
+    counts = {'mods': 0, 'maps': 0, 'loose': 0, 'packed': 0}
+
+    id1 = os.path.join(root, 'id1')
+    os.makedirs(id1, exist_ok=True)
+    for pak, names in (('pak0.pak', ID1PAK0), ('pak1.pak', ID1PAK1)):
+        files = {'progs.dat': b'\0' * 64} if pak == 'pak0.pak' else dict()
+        files.update({f"maps/{name}.bsp": _map(rnd, name) for name in names})
+        files.update({f"maps/b_{item}.bsp": make_bsp([{'classname': 'worldspawn'}]) for item in ('shell0', 'nail0')})
+        make_pak(os.path.join(id1, pak), files)
+        counts['maps'] += len(names)
+        counts['packed'] += len(names)
+
+    width = len(str(mods))
+    for n in range(mods):
+        name = f"{rnd.choice(WORDS)}{n:0{width}}"
+        folder = os.path.join(root, name)
+        os.makedirs(folder, exist_ok=True)
+        if n % 20 == 19:  # No game data.
+            with open(os.path.join(folder, 'notes.txt'), 'w') as out_file:
+                out_file.write(_readme(rnd, name))
+            continue
+
+        counts['mods'] += 1
+        names = [f"{name}_{m}" for m in range(maps)]
+        split = maps - round(maps * packed)
+        if split:
+            os.makedirs(os.path.join(folder, 'maps'), exist_ok=True)
+            for mapname in names[:split]:
+                with open(os.path.join(folder, 'maps', mapname + '.bsp'), 'wb') as out_file:
+                    out_file.write(_map(rnd, mapname))
+        if split < maps:
+            make_pak(os.path.join(folder, 'pak0.pak'),
+                     {f"maps/{mapname}.bsp": _map(rnd, mapname) for mapname in names[split:]} | {'progs.dat': b'\0' * 64})
+        else:
+            with open(os.path.join(folder, 'progs.dat'), 'wb') as out_file:
+                out_file.write(b'\0' * 64)
+        with open(os.path.join(folder, f"{name}.txt"), 'w') as out_file:
+            out_file.write(_readme(rnd, name))
+        counts['maps'] += maps
+        counts['loose'] += split
+        counts['packed'] += maps - split
+
+    counts['seconds'] = time.perf_counter() - start
+    return counts
+
+def reset_caches(folder):
+    """
+    Clear the in-memory caches of QuakeFoo and point its cache files to a scratch folder, the next call of a
+    scanner function starts cold. Only the QuakeFoo caches are cleared, the operating system file cache stays warm.
+
+    :param folder: Scratch folder for the index files, emptied.
+    :return: None
+    """
+    shutil.rmtree(folder, ignore_errors=True)
+    os.makedirs(folder)
+    qf.INDEXFILE = os.path.join(folder, 'qrindex.json')
+    qf.MAPINFOFILE = os.path.join(folder, 'qrmapinfo.json')
+    qf.READMEINDEXFILE = os.path.join(folder, 'qrreadme.json')
+    qf.HASHFILE = os.path.join(folder, 'qrhashes.json')
+    qf.PROGSINFOFILE = os.path.join(folder, 'qrprogs.json')
+    qf.PAKDIGESTFILE = os.path.join(folder, 'qrpakdigest.json')
+    qf.THUMBDIR = os.path.join(folder, 'thumbs')
+    with qf._index_lock:
+        qf._index = None
+        qf._index_dirty = False
+    with qf._pak_lock:
+        qf._pak_cache.clear()
+    with qf._map_info_lock:
+        qf._map_info = None
+    with qf._readme_lock:
+        qf._readme_index = None
+    with qf._hash_lock:
+        qf._hashes = None
+    with qf._progs_lock:
+        qf._progs_info = None
+        qf._progs_changed = False
+    with qf._pak_digest_lock:
+        qf._pak_digests = None
+
+def _cache_files():
+    return qf.INDEXFILE, qf.MAPINFOFILE, qf.READMEINDEXFILE, qf.HASHFILE, qf.PROGSINFOFILE, qf.PAKDIGESTFILE, qf.THUMBDIR
+
+def _restore_cache_files(saved):
+    qf.INDEXFILE, qf.MAPINFOFILE, qf.READMEINDEXFILE, qf.HASHFILE, qf.PROGSINFOFILE, qf.PAKDIGESTFILE, qf.THUMBDIR = saved
+
+def _time(func, args):
+    start = time.perf_counter()
+    for arg in args:
+        func(*arg)
+    return time.perf_counter() - start
+
+def bench(basedir, repeat=5, sample=200):
+    """
+    Time the scanner functions of QuakeFoo on a base directory. Each function is timed cold, after reset_caches(),
+    then warm repeat times. get_maps and get_readme are timed over an evenly spaced sample of the mod folders.
+
+    :param basedir: Base directory, see make_library().
+    :param repeat: Number of warm runs.
+    :param sample: Number of mod folders for get_maps & get_readme, 0 for every folder.
+    :return: Dictionary of function -> 'calls', 'cold', 'warm_min', 'warm_median' in seconds.
+    """
+    scratch = tempfile.mkdtemp(prefix='qrbench')
+    saved = _cache_files()
+    try:
+        reset_caches(scratch)
+        mods = sorted(qf.get_game_folders(basedir) or [], key=str.lower)
+        if sample and len(mods) > sample:
+            mods = mods[::len(mods) // sample][:sample]
+        folders = [(os.path.join(basedir, mod),) for mod in mods]
+
+        cases = {
+            'id1_check': (qf.id1_check, [(basedir,)]),
+            'get_game_folders': (qf.get_game_folders, [(basedir,)]),
+            'get_maps': (qf.get_maps, folders),
+            'get_readme': (qf.get_readme, folders),
+        }
+        results = dict()
+        for name, (func, args) in cases.items():
+            reset_caches(scratch)
+            cold = _time(func, args)
+            warm = [_time(func, args) for _ in range(repeat)]
+            results[name] = {'calls': len(args), 'cold': cold, 'warm_min': min(warm, default=None),
+                             'warm_median': statistics.median(warm) if warm else None}
+        return results
+    finally:
+        reset_caches(scratch)
+        _restore_cache_files(saved)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+def check_duplicates(root):
+    """
+    Generate a library where a mod folder has the same pak0.pak as an extracted archive, see
+    QuakeFoo.extract_archive(), and as a second mod folder. find_duplicates() must report the two mod folders and
+    never the extracted archive, a user following the report would otherwise delete the only lasting copy.
+
+    :param root: Scratch folder.
+    :return: List of the problems as text, empty if the check passed.
+    """
+    basedir = os.path.join(root, 'quake')
+    make_library(basedir, mods=3, maps=4)
+    scratch = os.path.join(root, 'caches')
+    saved = _cache_files()
+    try:
+        reset_caches(scratch)
+        mods = sorted(qf.get_game_folders(basedir) or [], key=str.lower)
+        paks = [mod for mod in mods if os.path.isfile(os.path.join(basedir, mod, 'pak0.pak'))]
+        if not paks:
+            return ["check_duplicates: no mod folder with a pak0.pak"]
+        mod = paks[0]
+        source = os.path.join(basedir, mod, 'pak0.pak')
+        for folder in (qf.ARCHIVEPREFIX + 'My_Mod', 'zz_backup'):
+            os.makedirs(os.path.join(basedir, folder))
+            shutil.copyfile(source, os.path.join(basedir, folder, 'pak0.pak'))
+        with open(os.path.join(basedir, qf.ARCHIVEPREFIX + 'My_Mod', qf.ARCHIVEMARKER), 'w') as out_file:
+            json.dump({'archive': os.path.join(root, 'My Mod.zip'), 'stamp': [0, 0], 'bytes': 0}, out_file)
+
+        result = qf.find_duplicates(basedir)
+        print(qf.duplicate_table(result))
+        errors = [f"check_duplicates: extracted archive {path} reported"
+                  for group in result['groups'] for path in [group['keep']] + group['copies']
+                  if os.path.basename(os.path.dirname(path)).startswith(qf.ARCHIVEPREFIX)]
+        group = next((g for g in result['groups'] if source in [g['keep']] + g['copies']), None)
+        if group is None or len(group['copies']) != 1 or group['keep'] != source:
+            errors.append(f"check_duplicates: expected keep {source} with one copy, found {group}")
+        if set(result['reclaimable']) - {'zz_backup'}:
+            errors.append(f"check_duplicates: reclaimable {sorted(result['reclaimable'])}, expected ['zz_backup']")
+        return errors
+    finally:
+        reset_caches(scratch)
+        _restore_cache_files(saved)
+
+def main(argv=None):
+    """
+    Generate a library, or use an existing one with --basedir, run bench() and write the results as json. With
+    --check run check_duplicates() on a generated library instead.
+
+    :param argv: List of command-line arguments, None for sys.argv.
+    :return: Exit code.
+    """
+    parser = argparse.ArgumentParser(prog='QuakeBench.py', description="Benchmark the Quake Runner library scanner.")
+    parser.add_argument('--basedir', help="Existing base directory, a library is generated if omitted.")
+    parser.add_argument('--root', help="Folder of the generated library, a temporary folder is used and removed if omitted.")
+    parser.add_argument('--mods', type=int, default=1000, help="Mod folders to generate.")
+    parser.add_argument('--maps', type=int, default=10, help="Maps per mod folder.")
+    parser.add_argument('--packed', type=float, default=0.5, help="Fraction of the maps packed in pak files.")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed of the generated library.")
+    parser.add_argument('--repeat', type=int, default=5, help="Warm runs per function.")
+    parser.add_argument('--sample', type=int, default=200, help="Mod folders timed by get_maps & get_readme, 0 for all.")
+    parser.add_argument('--output', help="json results file, stdout if omitted.")
+    parser.add_argument('--check', action='store_true', help="Check the duplicate finder instead of the benchmark.")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        root = args.root or tempfile.mkdtemp(prefix='qrcheck')
+        try:
+            errors = check_duplicates(root)
+        finally:
+            if not args.root:
+                shutil.rmtree(root, ignore_errors=True)
+        for error in errors:
+            print(error, file=sys.stderr)
+        print("Check failed." if errors else "Check passed.")
+        return 1 if errors else 0
+
+    report = {'python': platform.python_version(), 'platform': platform.platform(), 'time': time.time()}
+    root = args.basedir or args.root or tempfile.mkdtemp(prefix='qrlibrary')
+    try:
+        if not args.basedir:
+            report['library'] = make_library(root, args.mods, args.maps, args.packed, args.seed)
+        report['basedir'] = os.path.abspath(root)
+        report['repeat'] = args.repeat
+        report['results'] = bench(root, args.repeat, args.sample)
+        report['timings'] = foo.timingReport()  # Breakdown of the instrumented QuakeFoo functions.
+    finally:
+        if not (args.basedir or args.root):
+            shutil.rmtree(root, ignore_errors=True)
+
+    text = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, 'w') as out_file:
+            out_file.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,18 +7,177 @@ Python 3.12.7
 QuakeFoo.py - Support functions for Quake Runner.
 Functions
     engine_check(filepath) - Check if provided engine is valid executable.
-    id1_check(folder) - Check if provided folder has id1 folder and game data.
-    game_check(path) - Check if provided folder (mod folder) has game data
-    get_game_folders(path) - Uses game_check() to test folder for game data and return list of folders.
-    get_maps(path) - Check if provided folder has a maps folder and return a list of bsp files.
+    id1_check(folder, scan) - Check if provided folder has id1 folder and game data.
+    game_check(path, scan) - Check if provided folder (mod folder) has game data
+    get_game_folders(path, rebuild, scan) - Test the base directory for game folders and return list of folders.
+    get_maps(path, rebuild, scan, packed) - Return a list of bsp files from the maps folder and the pak files.
     set_config_dflt() - Set Quake Runner defaults if no config file (typicaly new installation"
-    get_readme(path) - Get list of text files in the mod folder. The mod folder usually has a file with insturtions.
+    build_command(engine, basedir, skill, game, mapname, opsys) - Build the command-line to launch Quake.
+    headless(argv) - Command-line mode, print or run the launch command without tkinter or PIL.
+    get_readme(path, scan) - Get list of text files in the mod folder. The mod folder usually has a file with insturtions.
+    scan_library(basedir, rebuild) - Single os.scandir traversal of a base directory shared by the functions above.
+    scan_mod(path, stamp) - Scan a single mod folder and return a record of the detected resources.
+    load_index(file) - Load the library index from disk, see INDEXFILE.
+    save_index(file) - Write the library index to disk.
+    flush_index() - Write the index if index_mod() changed it since the last save, see INDEXSAVEDELAY.
+    index_mod(path, rebuild) - Get the index record of a mod folder, rescanning only if the folder changed.
+    iter_library(basedir, rebuild, cancel) - Generator that updates the index of a base directory folder by folder.
+    update_index(basedir, rebuild) - Bring the index of a base directory up to date and return the mod records.
+    library_result(basedir, records) - Assemble the scan_library() result from folder records.
+    read_pak(path) - Read the directory of a pak file with mmap, cached by size/mtime.
+    get_pak_maps(path, paks) - List the bsp maps packed in the pak files of a folder.
+    get_pak_demos(path, paks) - List the demos packed in the pak files of a folder.
+    get_demos(path, rebuild, scan) - Return a list of the dem files of a mod folder, loose and packed.
+    merge_maps(loose, packed) - Merge loose and packed map lists, loose files take precedence.
+    map_source(path, mapname, record) - Locate a map as a loose bsp file or inside a pak file.
+    parse_entities(text) - Parse the entity lump of a bsp file into a list of dictionaries.
+    bsp_info(file, offset) - Map title & gameplay stats from the bsp entity lump, cached by size/mtime.
+    map_info(path, mapname, record) - bsp_info() of a map in a mod folder.
+    iter_map_info(path, maps, cancel) - Generator of map_info() for a list of maps.
+    save_map_info(file) - Write the map info cache to disk.
+    bsp_preview(file, offset, length, size) - Top-down wireframe of a bsp as an RGB array, requires NumPy.
+    map_thumbnail(path, mapname, size, record) - Cached png preview of a map, see THUMBDIR.
+    load_readme_index(file) - Load the readme search index from disk, see READMEINDEXFILE.
+    save_readme_index(file) - Write the readme search index to disk.
+    iter_readme_index(basedir, cancel) - Generator that updates the readme index of a base directory by file mtime.
+    search_readmes(query, basedir) - Rank the mods by the readme keyword hits of a query.
+    detect_encoding(sample) - Guess the encoding of a text file: utf-8, quake (gold characters), cp437 or latin-1.
+    decode_runs(data, encoding) - Decode text into runs of (text, tag), Quake gold characters are tagged 'gold'.
+    smoke_test(engine, basedir, game, maps, template, jobs, timeout, cancel) - Load every map once in parallel engines.
+    smoke_report(results, engine, basedir, game, template) - json report of a smoke test.
+    smoke_table(results) - Text table of smoke_test() results.
+    timedemo(engines, basedir, demos, game, repeat, template, timeout, cancel) - Run +timedemo for engines x demos x runs.
+    timedemo_summary(results) - fps mean, stddev, min & max per engine and demo.
+    timedemo_report(results, basedir, game, template, repeat) - json record of a timedemo run, see save_timedemo().
+    load_timedemo(file) - Earlier timedemo runs, see TIMEDEMOFILE.
+    save_timedemo(report, file) - Add a timedemo run to the history.
+    timedemo_table(summary, history) - Text table of a timedemo summary compared with the previous runs.
+    launch_files(cmd) - The pak, progs.dat & bsp files a launch command will read.
+    prewarm(files, cancel) - Read files ahead into the operating system page cache.
+    get_archives(folder) - List the zip & pk3 mod archives of a drop folder.
+    archive_info(path) - Game data of a mod archive from the zip central directory, cached by size/mtime.
+    archive_folder(archive) - Name of the base directory folder an archive is extracted to.
+    extract_archive(path, basedir, cache_size, keep, cancel) - Extract a mod archive once into the base directory.
+    evict_archives(basedir, limit, keep) - Remove the least recently played extracted archives above limit bytes.
+    load_hashes(file) - Load the content digest cache, see HASHFILE.
+    save_hashes(file) - Write the content digest cache to disk.
+    content_files(basedir, records) - The pak, progs.dat, bsp & dem files of the mod folders.
+    find_duplicates(basedir, jobs, cancel) - Groups of identical game files across the mods & the reclaimable bytes.
+    duplicate_table(result) - Text table of the reclaimable bytes per mod and the largest duplicate groups.
+    pak_digest(path, cancel) - md5 of a pak file read in chunks, cached by size/mtime.
+    verify_id1(basedir, known, cancel) - Check the id1 pak files against known digests and label the install.
+    progs_source(path, record) - Locate the progs.dat of a mod folder, loose or inside a pak file.
+    read_progs(file, offset, length) - Spawnable classnames & entity fields of a progs.dat, cached by size/mtime.
+    mod_classnames(path, basedir) - Classnames a mod can spawn, its own progs.dat or the id1 one, None if unknown.
+    save_progs_info(file) - Write the progs.dat cache to disk.
+    map_requirements(path, mapname, basedir, mods, cancel) - Classnames of a map missing from its mod & the mods that have them.
 
 """
 
 import os
+import re
 import foo
+import atexit
+import time
+import bisect
+import struct
 import platform
+import threading
+
+RSRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rsrc')
+CONFIGFILE = os.path.join(RSRC, 'qrconfig.json')
+SKILLS = "Easy", "Normal", "Hard", "Nightmare"  # Skill names, the index is the +skill value.
+INDEXFILE = os.path.join(RSRC, 'qrindex.json')  # Library index, one record per mod folder keyed by inode/mtime.
+INDEXVERSION = 5
+MAPINFOFILE = os.path.join(RSRC, 'qrmapinfo.json')  # Map titles & stats from the bsp entity lump keyed by size/mtime.
+READMEINDEXFILE = os.path.join(RSRC, 'qrreadme.json')  # Term counts of every readme file keyed by size/mtime.
+READMEINDEXVERSION = 1
+THUMBDIR = os.path.join(RSRC, 'thumbs')  # Map preview png files, see map_thumbnail().
+THUMBSIZE = 160  # Map preview width & height in pixels.
+THUMBCACHESIZE = 32 * 1024 * 1024  # Bytes, least recently used previews are removed above this size.
+
+INDEXSAVEDELAY = 2.0  # Seconds, the index_mod() updates of a burst are written once.
+_index = None  # In-memory copy of the library index, loaded on first use.
+_index_dirty = False  # Changed by index_mod() since the last save_index().
+_index_timer = None  # threading.Timer of flush_index().
+_index_lock = threading.RLock()  # Scans may run on worker threads.
+
+PAKHEADER = struct.Struct('<4sii')  # 'PACK', directory offset, directory length.
+PAKENTRY = struct.Struct('<56sii')  # File name, file offset, file length.
+_pak_cache = dict()  # pak path -> ([size, mtime_ns], directory), see read_pak().
+_pak_lock = threading.Lock()
+_archive_cache = dict()  # archive path -> ([size, mtime_ns], info), see archive_info().
+_archive_lock = threading.Lock()
+
+BSPLUMPS = struct.Struct('<4s30i')  # Version, 15 lumps of (offset, length).
+BSPVERSIONS = struct.pack('<i', 29), b'BSP2', b'2PSB'
+LUMP_ENTITIES = 0
+LUMP_VERTEXES = 3
+LUMP_VISIBILITY = 4
+LUMP_EDGES = 12
+ENTITYTOKEN = re.compile(rb'[{}]|"([^"]*)"')
+SKILLFLAGS = 256, 512, 1024  # spawnflags not in easy, normal, hard/nightmare.
+_map_info = None  # "path|offset" -> [[size, mtime_ns], info], see bsp_info().
+_map_info_lock = threading.Lock()
+
+PROGSHEADER = struct.Struct('<15i')  # Version, crc, (offset, count) of statements, globals, fields, functions, strings, global values, entity fields.
+PROGSFUNCTION = struct.Struct('<7i8B')  # First statement, parm start, locals, profile, name, file, parms, parm sizes.
+PROGSDEF = struct.Struct('<HHi')  # Type, offset, name.
+PROGSVERSIONS = 6, 7  # id Quake, FTE.
+PROGSINFOFILE = os.path.join(RSRC, 'qrprogs.json')  # Classnames & fields of the progs.dat files keyed by size/mtime.
+PROGSINFOVERSION = 1
+COMPILERCLASSES = frozenset(('func_group', 'func_detail', 'func_detail_illusionary', 'func_detail_wall',
+                             'func_detail_fence', 'func_illusionary_visblocker', 'misc_external_map'))  # Merged by the map compiler.
+_progs_info = None  # "path|offset" -> [[size, mtime_ns], info], see read_progs().
+_progs_changed = False  # Entries added since the last save_progs_info().
+_progs_lock = threading.Lock()
+
+TERM = re.compile(r'[a-z0-9]{2,}')
+
+ENCODINGSAMPLE = 65536  # Bytes read by detect_encoding().
+HIGHRUN = re.compile(rb'[\x80-\xff]+')
+CP437ART = frozenset(range(0xb0, 0xe0))  # CP437 box drawing & block characters.
+QUAKECHARS = bytes.maketrans(  # Quake console glyphs below 0x20 with a readable ASCII stand-in.
+    bytes([0x10, 0x11, 0x1c, 0x1d, 0x1e, 0x1f] + list(range(0x12, 0x1c))),
+    b'[].---' + b'0123456789')
+_readme_index = None  # See load_readme_index().
+_readme_lock = threading.RLock()
+
+SMOKEARGS = '-dedicated 1 +map {map} +quit'  # Arguments of a smoke test launch, {map} & {bsp} are the map name.
+SMOKEJOBS = 4  # Engines running at once.
+SMOKETIMEOUT = 30  # Seconds before a launch is stopped and marked 'timeout'.
+SMOKEFAIL = re.compile(r"Host_Error|Sys_Error|Couldn't spawn server|wrong version number|Hunk_Alloc: failed|Z_Malloc: failed")
+SMOKEREPORTFILE = os.path.join(RSRC, 'qrsmoke.json')  # Last smoke test of the Quake Runner window.
+
+TIMEDEMOARGS = '-nosound +timedemo {demo}'  # Arguments of a timedemo launch, {demo} is the demo name.
+TIMEDEMOTIMEOUT = 300  # Seconds before a timedemo launch is stopped.
+TIMEDEMORESULT = re.compile(r'(\d+)\s+frames\s+([\d.]+)\s+seconds\s+([\d.]+)\s+fps')  # ex. 969 frames 3.2 seconds 302.8 fps
+TIMEDEMOFILE = os.path.join(RSRC, 'qrtimedemo.json')  # Earlier timedemo runs, see save_timedemo().
+TIMEDEMOHISTORY = 100  # Runs kept in TIMEDEMOFILE.
+
+PREWARMSTRIDE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096  # Bytes between the touched bytes of a mapped file, one per page.
+
+ARCHIVEEXTENSIONS = '.zip', '.pk3'  # Mod archives listed from the drop folder, see get_archives().
+ARCHIVEPREFIX = '_qr_'  # Base directory folders of the extracted archives, ex. _qr_mymod.
+ARCHIVEMARKER = 'qrarchive.json'  # Source archive & size of an extracted folder, its mtime is the last launch.
+ARCHIVECACHESIZE = 2048  # MB, least recently played extracted archives are removed above this size.
+
+HASHFILE = os.path.join(RSRC, 'qrhashes.json')  # Content digests of the game files keyed by path/size/mtime.
+HASHVERSION = 1
+HASHPARTIAL = 64 * 1024  # Bytes hashed at the start & at the end of a file, the full hash only confirms a match.
+HASHJOBS = 4  # Files hashed at once.
+_hashes = None  # See load_hashes().
+_hash_lock = threading.Lock()
+
+PAKDIGESTFILE = os.path.join(RSRC, 'qrpakdigest.json')  # md5 of the id1 pak files keyed by path/size/mtime.
+PAKDIGESTVERSION = 1
+PAKDIGESTCHUNK = 1024 * 1024  # Bytes read at a time by pak_digest().
+KNOWNPAKS = {  # md5 -> (pak file, size, release). More digests can be added with known_paks in qrconfig.json.
+    '5906e5998fc3d896ddaf5e6a62e03abb': ('pak0.pak', 18689235, "Quake 1.06 pak0 (shareware & registered)"),
+    'd76b3e5678f0b64ac74ce5e340e6a685': ('pak1.pak', 34257856, "Quake 1.06 pak1 (registered)"),
+}
+_pak_digests = None  # path -> [size, mtime_ns, md5], see pak_digest().
+_pak_digest_lock = threading.Lock()
 
 def engine_check(filepath):
     """
@@ -38,7 +197,8 @@ def engine_check(filepath):
             is_engine = filepath.endswith('.exe') and os.path.isfile(filepath) and os.access(filepath, os.X_OK)
     return is_engine
 
-def id1_check(folder):
+@foo.timed()
+def id1_check(folder, scan=None):
     """
     Check if 'id1' folder exists as a subdirectory. Required to run Quake.
     Check for valid game file 'pak0.pak'. Required to run Quake. The remastered 'pak0.pak' does not have a 'pak1.pak' file.
@@ -47,90 +207,58 @@ def id1_check(folder):
     Check for '*.bsp' files in the maps folder. Also not required. Information is used for id1_maps combobox.
 
     :param folder: Selected path & folder.
+    :param scan: Result of scan_library() for folder. If None only the id1 folder is scanned.
     :return: BOOL dictionary for each category.
     """
-    kys = 'id1_folder', 'id1_pak0', 'id1_pak1', 'id1_maps', 'id1_bsp'
-    id1 = {ky:False for ky in kys}
-
-    id1_fldr = os.path.join(folder, 'id1')
-    id1['id1_folder'] = os.path.isdir(id1_fldr)
-    if id1['id1_folder']:
-        contents = os.listdir(id1_fldr)
-        id1['id1_pak0'] = any('pak0.pak' == c.lower() for c in contents)
-        id1['id1_pak1'] = any('pak1.pak' == c.lower() for c in contents)
-
-        id1_maps = os.path.join(id1_fldr, 'maps')
-        id1['id1_maps'] = os.path.isdir(id1_maps)
-        if id1['id1_maps']:
-            contents = os.listdir(id1_maps)
-            id1['id1_bsp'] = any('.bsp' in c.lower() for c in contents)
-    return id1
+    if scan is not None and scan['basedir'] == os.path.abspath(folder):
+        return dict(scan['id1'])
+    return _id1_status(_record(os.path.join(folder, 'id1')))
 
-def game_check(path):
+@foo.timed()
+def game_check(path, scan=None):
     """
     Test a single folder for game data in the form of pak0.pak, progs.dat or .bsp files in the maps folder.
-    Used primarily as an internal function for the get_game_folders() function.
 
     :param path: Folder path.
+    :param scan: Result of scan_library() for the parent folder. If None the folder record is taken from the index.
     :return: Results for a given folder.
     """
-    game_pak0 = False
-    game_progs = False
-    game_maps = False
-    game_bsp = False
-
-    if os.path.isdir(path):
-        contents = os.listdir(path)
-        game_pak0 = any('pak0.pak' == c.lower() for c in contents)
-        game_progs = any('progs.dat' == c.lower() for c in contents)
-
-        game_maps = os.path.join(path, 'maps')
-        if os.path.isdir(game_maps):
-            contents = os.listdir(game_maps)
-            game_bsp = any('.bsp' in c.lower() for c in contents)
+    record = _record(path, scan)
+    return bool(record) and _has_game_data(record)
 
-    return game_pak0 or game_progs or game_bsp
-
-def get_game_folders(path):
+@foo.timed()
+def get_game_folders(path, rebuild=False, scan=None):
     """
     Used as the primary function to test a folder for game data in the form of file types, pak0.pak, progs.dat or bsp files in the maps folder.
-    Uses the game_check() function
+    Uses the library index, only folders that changed since the last scan are revisited.
 
-    :param path:
-    :return:
+    :param path: Base directory.
+    :param rebuild: BOOL Ignore the index and rescan every folder.
+    :param scan: Result of scan_library() for path. If None the base directory is scanned.
+    :return: List of mod folders.
     """
-    contents = os.listdir(path)
-    cwd = os.getcwd()
-    os.chdir(path)
-    folders = [c for c in contents if os.path.isdir(c) and c != 'id1']
-    game_fldrs = [f for f in folders if game_check(f)]
-    os.chdir(cwd)
-
-    return game_fldrs
+    if scan is None or scan['basedir'] != os.path.abspath(path):
+        scan = scan_library(path, rebuild=rebuild)
+    return list(scan['mods'])
 
-def get_maps(path):
+@foo.timed()
+def get_maps(path, rebuild=False, scan=None, packed=True):
     """
     Get list of bsp files in maps directory of source folder.
 
     :param path: Source folder ex. /Quake/Engine/id1
+    :param rebuild: BOOL Ignore the index and rescan the folder.
+    :param scan: Result of scan_library() for the parent folder. If None the folder record is taken from the index.
+    :param packed: BOOL Include the maps packed in the pak files of the folder.
     :return: List of maps
     """
-    if os.path.exists(path):
-        cwd = os.getcwd()
-        os.chdir(path)
-        if os.path.exists('maps') and os.path.isdir('maps'):
-            contents = os.listdir('maps')
-            if contents:
-                os.chdir('maps')
-                maps = [c for c in contents if os.path.isfile(c) and c.endswith('.bsp')]
-                os.chdir('..')
-            else:
-                maps = False
-        else:
-            maps = False
-        os.chdir(cwd)
+    record = _record(path, scan, rebuild=rebuild)
+    if record:
+        maps = merge_maps(record['maps'], record['pak_maps'] if packed else [])
     else:
         maps = False
+    if not maps:
+        maps = False
 
     return maps
 
@@ -148,26 +276,2231 @@ def set_config_dflt():
         "mods_rdobtn": "games",
         "skill_chkbtn": False,
         "skill_cbobox": "Normal",
-        "maps_chkbtn": False
+        "maps_chkbtn": False,
+        "log_lines": 10000,
+        "smoke_args": SMOKEARGS,
+        "smoke_jobs": SMOKEJOBS,
+        "smoke_timeout": SMOKETIMEOUT,
+        "bench_engines": [],
+        "bench_repeat": 3,
+        "timedemo_args": TIMEDEMOARGS,
+        "timedemo_timeout": TIMEDEMOTIMEOUT,
+        "sample_sessions": False,
+        "sample_interval": 1.0,
+        "prewarm": False,
+        "watch_folders": True,
+        "archive_dir": "",
+        "archive_cache_mb": ARCHIVECACHESIZE,
+        "hash_jobs": HASHJOBS,
+        "known_paks": {}
     }
 
-def get_readme(path):
+def _command_args(engine, basedir, skill=None, game=None, mapname=None, opsys=None):
+    """
+    Command-line arguments to launch Quake, see build_command().
+
+    :return: List of arguments.
+    """
+    args = list()
+    if not (engine and basedir):
+        return args
+
+    mac_app = (opsys or platform.system()) == 'Darwin' and engine.endswith('.app')
+    if mac_app:  # Mac command prefix. Prefix not required for Windows.
+        args += ['open', '-a']
+    if os.path.exists(engine):
+        args.append(engine)  # Add engine path and executable.
+    if mac_app:
+        args.append('--args')  # Mac executable suffix.
+
+    if os.path.exists(basedir):
+        args += ['-basedir', basedir]  # Add base directory (-basedir) command-line argument.
+    if skill is not None:
+        args += ['+skill', str(SKILLS.index(skill) if skill in SKILLS else int(skill))]
+    if game:
+        args += ['-game', game]
+    if mapname:
+        args += ['+map', mapname]
+    return args
+
+@foo.timed()
+def build_command(engine, basedir, skill=None, game=None, mapname=None, opsys=None):
+    """
+    Build the command-line to launch Quake. Shared by the Quake Runner window and the headless mode, the
+    arguments are added in the order expected by the engines.
+
+    :param engine: Path to the Quake engine executable or mac app.
+    :param basedir: Base directory with the id1 folder.
+    :param skill: None to leave out, skill name ex. 'Hard' or level 0-3.
+    :param game: Mod folder in the base directory, None for id1.
+    :param mapname: Map to start ex. e1m1.bsp.
+    :param opsys: platform.system() value, None for the current platform.
+    :return: str() of the command, empty if the engine or the base directory is missing.
+    """
+    return ' '.join(_command_args(engine, basedir, skill, game, mapname, opsys))
+
+def headless(argv=None):
+    """
+    Command-line mode, ex. QuakeRunner.py --headless --game ad --map ad_e1m1 --skill 2 --run
+    The engine, the base directory and the skill default to the values of qrconfig.json. Only this module is
+    imported, tkinter and PIL are never loaded. --smoke loads every map of the mod once, see smoke_test().
+    --timedemo benchmarks the engines on the demos of the mod and id1, see timedemo(). --duplicates lists the
+    identical game files across the mods, see find_duplicates(). --verify checks the id1 pak files, see verify_id1().
+    --requires lists the classnames of --map the mod cannot spawn and the mods that can, see map_requirements().
+
+    :param argv: List of command-line arguments, None for sys.argv.
+    :return: Exit code, with --run the exit code of the engine, with --smoke 0 if every map passed, with --timedemo
+             0 if every run gave a result, with --duplicates 0, with --verify 0 for a known or unmodified install, with --requires 0 if the mod can spawn every entity of the map, 2 if it has no valid
+             progs.dat.
+    """
+    import sys
+    import argparse
+    import subprocess
+
+    parser = argparse.ArgumentParser(prog='QuakeRunner.py --headless',
+                                     description="Print or run a Quake launch command without the window.")
+    parser.add_argument('--headless', action='store_true', help="Run without the window.")
+    parser.add_argument('--config', default=CONFIGFILE, help="Quake Runner configuration file.")
+    parser.add_argument('--engine', help="Quake engine, default from the configuration file.")
+    parser.add_argument('--basedir', help="Base directory, default from the configuration file.")
+    parser.add_argument('--game', help="Mod folder in the base directory or archive in the drop folder, id1 if omitted.")
+    parser.add_argument('--map', dest='mapname', help="Map to start ex. e1m1.")
+    parser.add_argument('--skill', choices=[str(n) for n in range(len(SKILLS))] + list(SKILLS),
+                        help="Skill level or name, default from the configuration file.")
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument('--print', dest='run', action='store_false', help="Print the command (default).")
+    action.add_argument('--run', dest='run', action='store_true', help="Launch the engine and wait for it.")
+    action.add_argument('--smoke', action='store_true', help="Load every map of the mod, or --map, once and quit.")
+    parser.add_argument('--jobs', type=int, help="Smoke test engines or files hashed at once, default from the configuration file.")
+    parser.add_argument('--timeout', type=float, help="Smoke test seconds per map or timedemo seconds per run, default from the configuration file.")
+    parser.add_argument('--template', help=f"Smoke test or timedemo arguments, default from the configuration file ex. '{SMOKEARGS}' or '{TIMEDEMOARGS}'.")
+    parser.add_argument('--report', help="Smoke test or duplicates json report file.")
+    action.add_argument('--timedemo', action='store_true', help="Run +timedemo for every engine x demo x --repeat.")
+    parser.add_argument('--engines', nargs='+', help="Timedemo engines, default from the configuration file or --engine.")
+    parser.add_argument('--demos', nargs='+', help="Timedemo demos, default every demo of the mod and id1.")
+    parser.add_argument('--repeat', type=int, help="Timedemo runs of each engine & demo, default from the configuration file.")
+    action.add_argument('--duplicates', action='store_true', help="List the identical game files across the mods.")
+    action.add_argument('--verify', action='store_true', help="Check the id1 pak files against the known releases.")
+    action.add_argument('--requires', action='store_true', help="List the entities of --map the mod cannot spawn and the mods that can.")
+    parser.add_argument('--prewarm', action='store_true', default=None,
+                        help="With --run, read the pak, progs.dat & map files into the page cache first.")
+    parser.set_defaults(run=False)
+    args = parser.parse_args(argv)
+
+    cfg = foo.readConfig(args.config)
+    cfg = {**set_config_dflt(), **(cfg if isinstance(cfg, dict) else dict())}
+    engine = args.engine or cfg['engine']
+    basedir = args.basedir or cfg['basedir']
+    skill = args.skill
+    if skill is None and cfg['skill_chkbtn']:
+        skill = cfg['skill_cbobox']
+
+    if args.duplicates:  # No engine needed.
+        if not (basedir and os.path.isdir(basedir)):
+            parser.error(f"Base directory not found: {basedir or 'not set'}")
+        result = find_duplicates(basedir, args.jobs or cfg['hash_jobs'])
+        print(duplicate_table(result))
+        if args.report:
+            saved = foo.writeConfig(args.report, result)
+            if saved is not True:
+                print(f"Report not saved: {saved}", file=sys.stderr)
+        return 0
+
+    if args.verify:
+        if not (basedir and os.path.isdir(basedir)):
+            parser.error(f"Base directory not found: {basedir or 'not set'}")
+        result = verify_id1(basedir, cfg['known_paks'])
+        for name, entry in result['paks'].items():
+            print(f"{name}  {entry['size']:>11}  {entry['md5'] or '-':<32}  {entry['status']:<8}  {entry['release'] or ''}".rstrip())
+        print(result['message'])
+        return 0 if result['label'] in ('registered', 'shareware', 'remastered') else 1
+
+    engines = (args.engines or cfg['bench_engines'] or [engine]) if args.timedemo else [] if args.requires else [engine]
+    for engine_path in engines:
+        if not engine_path or not os.path.exists(engine_path):
+            parser.error(f"Quake engine not found: {engine_path or 'not set'}")
+    id1 = id1_check(basedir) if basedir else dict()
+    if not (id1.get('id1_folder') and id1.get('id1_pak0')):
+        parser.error(f"id1 Folder and pak0.pak file not detected in the base directory: {basedir or 'not set'}")
+
+    game = args.game
+    info = None
+    if game and game.lower().endswith(ARCHIVEEXTENSIONS):  # Mod archive, extracted unless only printing.
+        archive = os.path.join(cfg['archive_dir'], game)
+        info = archive_info(archive)
+        if not info:
+            parser.error(f"Mod archive not found: {archive}")
+        game = archive_folder(archive)
+        if args.run or args.smoke or args.timedemo:
+            result = extract_archive(archive, basedir, cfg['archive_cache_mb'])
+            if result['extracted']:
+                print(f"Extracted {archive} to {game}, {result['bytes'] / 2**20:.1f} MB in {result['seconds']:.2f}s.",
+                      file=sys.stderr, flush=True)
+    folder = os.path.join(basedir, game or 'id1')
+    unpacked = not info or os.path.isdir(folder)  # A printed archive is extracted by its first --run.
+    if game and unpacked and not game_check(folder):
+        parser.error(f"No game data in {folder}")
+
+    mapname = args.mapname
+    if mapname:
+        target = mapname.lower().removesuffix('.bsp') + '.bsp'
+        maps = (get_maps(folder) or []) if unpacked else info['maps']
+        mapname = next((m for m in maps if m.lower() == target), None)
+        if not mapname:
+            parser.error(f"Map not found in {folder}: {args.mapname}")
+
+    if args.requires:
+        if not mapname:
+            parser.error("--requires needs --map")
+        result = map_requirements(folder, mapname, basedir)
+        if result['missing'] is None:
+            print(f"{mapname}: no valid progs.dat in {f'{game} or id1' if game else 'id1'}, can't tell which entities can be spawned.")
+            return 2
+        if not result['missing']:
+            print(f"{mapname}: every entity can be spawned by {game or 'id1'}.")
+            return 0
+        print(f"{mapname}: {game or 'id1'} cannot spawn {', '.join(result['missing'])}")
+        print(f"Mods that can: {', '.join(result['mods']) or 'none found'}")
+        return 1
+
+    if args.smoke:
+        template = args.template or cfg['smoke_args']
+        results = list()
+        for result in smoke_test(engine, basedir, game, [mapname] if mapname else None, template,
+                                 args.jobs or cfg['smoke_jobs'], args.timeout or cfg['smoke_timeout']):
+            results.append(result)
+            print(f"{result['status'].upper():<9} {result['map']}", file=sys.stderr, flush=True)  # Progress.
+        print(smoke_table(results))
+        if args.report:
+            saved = foo.writeConfig(args.report, smoke_report(results, engine, basedir, game, template))
+            if saved is not True:
+                print(f"Report not saved: {saved}", file=sys.stderr)
+        return 0 if results and all(r['status'] == 'pass' for r in results) else 1
+
+    if args.timedemo:
+        template, repeat = args.template or cfg['timedemo_args'], args.repeat or cfg['bench_repeat']
+        results = list()
+        for result in timedemo(engines, basedir, args.demos, game, repeat, template, args.timeout or cfg['timedemo_timeout']):
+            results.append(result)
+            fps = f"{result['fps']:.1f} fps" if result['status'] == 'ok' else f"{result['status'].upper()} {result['reason']}"
+            print(f"{result['engine']} {result['demo']} #{result['run']}: {fps}", file=sys.stderr, flush=True)  # Progress.
+        report = timedemo_report(results, basedir, game, template, repeat)
+        print(timedemo_table(report['summary'], load_timedemo()))
+        if results:
+            saved = save_timedemo(report)
+            if saved is not True:
+                print(f"Results not saved: {saved}", file=sys.stderr)
+        return 0 if results and all(r['status'] == 'ok' for r in results) else 1
+
+    cmd = _command_args(engine, basedir, skill, game, mapname)
+    if not args.run:
+        print(' '.join(cmd))
+        return 0
+    if args.prewarm or (args.prewarm is None and cfg['prewarm']):
+        result = prewarm(launch_files(cmd))
+        print(f"Prewarmed {result['files']} files, {result['bytes'] / 2**20:.1f} MB in {result['seconds']:.2f}s.",
+              file=sys.stderr, flush=True)
+    return subprocess.run(cmd).returncode
+
+@foo.timed()
+def get_readme(path, scan=None):
     """
     Get readme text file list.
 
     :param path: Path to mod folder.
+    :param scan: Result of scan_library() for the parent folder. If None the folder record is taken from the index.
     :return: List of text files.
     """
-    if os.path.exists(path):
-        contents = os.listdir(path)
-        readme = [c for c in contents if c.endswith('.txt')]
-        if not readme:
-            readme = False
+    record = _record(path, scan)
+    if record and record['readme']:
+        readme = list(record['readme'])
     else:
         readme = False
     return readme
 
 
+def _stamp(path):
+    """
+    Metadata used to detect a changed folder. Adding, removing or renaming a file changes the folder mtime.
+
+    :param path: Folder path or os.DirEntry. The DirEntry inode is free on POSIX, the stat result is cached.
+    :return: [inode, mtime_ns] or None if the folder does not exist.
+    """
+    try:
+        if isinstance(path, os.DirEntry):
+            return [path.inode(), path.stat().st_mtime_ns]
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_ino, st.st_mtime_ns]
+
+def _has_game_data(record):
+    return 'pak0.pak' in (p.lower() for p in record['paks']) or record['progs'] or bool(record['maps'])
+
+def _id1_status(record):
+    kys = 'id1_folder', 'id1_pak0', 'id1_pak1', 'id1_maps', 'id1_bsp'
+    id1 = {ky:False for ky in kys}
+    if record:
+        paks = [p.lower() for p in record['paks']]
+        id1['id1_folder'] = True
+        id1['id1_pak0'] = 'pak0.pak' in paks
+        id1['id1_pak1'] = 'pak1.pak' in paks
+        id1['id1_maps'] = record['maps_stamp'] is not None
+        id1['id1_bsp'] = bool(record['maps'] or record['pak_maps'])
+    return id1
+
+def _record(path, scan=None, rebuild=False):
+    basedir, name = os.path.split(os.path.abspath(path))
+    if scan is not None and scan['basedir'] == basedir and not rebuild:
+        return scan['records'].get(name)
+    return index_mod(path, rebuild=rebuild)
+
+@foo.timed()
+def scan_mod(path, stamp=None):
+    """
+    Scan a single mod folder (or id1) for game data with one os.scandir() pass, plus one for the maps folder.
+    File types come from the directory entries, no per-file stat calls.
+
+    :param path: Mod folder path or os.DirEntry.
+    :param stamp: Folder stamp if already known, see _stamp().
+    :return: Record of the detected resources or None if path is not a folder.
+        'stamp', 'maps_stamp' - [inode, mtime_ns] of the mod and maps folders, maps_stamp is None without a maps folder.
+        'paks' - pak files, 'progs' - BOOL progs.dat present, 'maps' - bsp files, 'readme' - text files.
+        'archive' - BOOL extracted from a mod archive, see extract_archive().
+        'demos' - dem files, 'pak_stamps' - pak file -> [size, mtime_ns], 'pak_maps' - bsp files packed in the pak
+        files, 'pak_demos' - dem files packed in the pak files.
+    """
+    if stamp is None:
+        stamp = _stamp(path)
+    try:
+        with foo.timeBlock('scan_mod.scandir'), os.scandir(path) as it:
+            entries = list(it)
+    except OSError:
+        return None
+
+    paks = []
+    progs = False
+    archive = False
+    readme = []
+    demos = []
+    maps_entry = None
+    for entry in entries:
+        name = entry.name
+        lower = name.lower()
+        if entry.is_dir():
+            if lower == 'maps':
+                maps_entry = entry
+        elif entry.is_file():
+            if lower.endswith('.pak'):
+                paks.append(name)
+            elif lower == 'progs.dat':
+                progs = True
+            elif lower == ARCHIVEMARKER:
+                archive = True
+            elif name.endswith('.txt'):
+                readme.append(name)
+            elif lower.endswith('.dem'):
+                demos.append(name)
+
+    maps_stamp = None
+    maps = []
+    if maps_entry is not None:
+        maps_stamp = _stamp(maps_entry)
+        try:
+            with foo.timeBlock('scan_mod.scandir'), os.scandir(maps_entry.path) as it:
+                maps = [entry.name for entry in it if entry.name.lower().endswith('.bsp') and entry.is_file()]
+        except OSError:
+            pass
+
+    folder = path.path if isinstance(path, os.DirEntry) else path
+    paks = sorted(paks, key=str.lower)
+    return {
+        'stamp': stamp,
+        'maps_stamp': maps_stamp,
+        'paks': paks,
+        'progs': progs,
+        'archive': archive,
+        'maps': sorted(maps),
+        'readme': sorted(readme),
+        'demos': sorted(demos, key=str.lower),
+        'pak_stamps': {pak: _file_stamp(os.path.join(folder, pak)) for pak in paks},
+        'pak_maps': get_pak_maps(folder, paks),
+        'pak_demos': get_pak_demos(folder, paks),
+    }
+
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+def _is_current(path, record, stamp=None):
+    if not record:
+        return False
+    if stamp is None:
+        stamp = _stamp(path)
+    if record['stamp'] != stamp or record['maps_stamp'] != _stamp(os.path.join(path, 'maps')):
+        return False
+    return all(_file_stamp(os.path.join(path, pak)) == pak_stamp for pak, pak_stamp in record['pak_stamps'].items())
+
+@foo.timed()
+def load_index(file=None):
+    """
+    Load the library index. A missing, unreadable or outdated index file starts a new index.
+
+    :param file: Path and file of the index, defaults to INDEXFILE.
+    :return: Index dictionary.
+    """
+    global _index
+    index = foo.readConfig(file or INDEXFILE)
+    if isinstance(index, Exception) or index.get('version') != INDEXVERSION:
+        index = {'version': INDEXVERSION, 'basedirs': {}}
+    with _index_lock:
+        _index = index
+    return _index
+
+@foo.timed()
+def save_index(file=None):
+    """
+    Write the library index to disk.
+
+    :param file: Path and file of the index, defaults to INDEXFILE.
+    :return: Exception or True if no issues.
+    """
+    global _index_dirty
+    with _index_lock:
+        if _index is None:
+            return True
+        _index_dirty = False
+        return foo.writeConfig(file=file or INDEXFILE, settings=_index)
+
+def _save_index_later():
+    """
+    Mark the index changed and write it INDEXSAVEDELAY seconds later, a burst of index_mod() updates is one write.
+    """
+    global _index_dirty, _index_timer
+    with _index_lock:
+        _index_dirty = True
+        if _index_timer is None:
+            _index_timer = threading.Timer(INDEXSAVEDELAY, flush_index)
+            _index_timer.daemon = True
+            _index_timer.start()
+
+@atexit.register
+def flush_index():
+    """
+    Write the index if index_mod() changed it since the last save_index(). Runs at exit too.
+
+    :return: Exception or True if no issues.
+    """
+    global _index_timer
+    with _index_lock:
+        if _index_timer is not None:
+            _index_timer.cancel()
+            _index_timer = None
+        return save_index() if _index_dirty else True
+
+def _basedir_entry(basedir):
+    if _index is None:
+        load_index()
+    return _index['basedirs'].setdefault(os.path.abspath(basedir), {'stamp': None, 'mods': {}})
+
+@foo.timed()
+def index_mod(path, rebuild=False):
+    """
+    Get the index record of a single mod folder. The folder is only rescanned if its metadata changed, the index is
+    written once after a burst of rescans, see flush_index().
+
+    :param path: Mod folder path ex. /Quake/pakmod/id1
+    :param rebuild: BOOL Rescan the folder regardless of the index.
+    :return: Record of the detected resources or None if path is not a folder.
+    """
+    basedir, name = os.path.split(os.path.abspath(path))
+    with _index_lock:
+        record = _basedir_entry(basedir)['mods'].get(name)
+    if not rebuild and _is_current(path, record):
+        return record
+
+    record = scan_mod(path)  # Filesystem access outside the lock, other threads keep using the index.
+    with _index_lock:
+        mods = _basedir_entry(basedir)['mods']
+        if record is None:
+            mods.pop(name, None)
+        else:
+            mods[name] = record
+        _save_index_later()
+    return record
+
+@foo.timed()
+def iter_library(basedir, rebuild=False, cancel=None):
+    """
+    Generator behind update_index(). Yields each folder of the base directory as soon as its record is known so a
+    caller can show progress, id1 comes first and the mod folders follow in alphabetical order. The base directory
+    is only listed again if its own metadata changed, each known folder is rescanned only if its metadata changed.
+
+    :param basedir: Base directory with the id1 and mod folders.
+    :param rebuild: BOOL Discard the index of the base directory and rescan every folder.
+    :param cancel: threading.Event, stop scanning when set. Records found so far are kept in the index.
+    :return: Yields tuple(done, total, folder name, record).
+    """
+    with _index_lock:
+        entry = _basedir_entry(basedir)
+        known = {} if rebuild else dict(entry['mods'])
+        old_stamp = None if rebuild else entry['stamp']
+
+    base_stamp = _stamp(basedir)
+    if base_stamp is None:
+        folders = []
+    elif old_stamp != base_stamp:  # Folders added or removed, list the base directory once.
+        try:
+            with os.scandir(basedir) as it:
+                folders = [(e.name, e) for e in it if e.is_dir()]
+        except OSError:
+            folders = []
+    else:
+        folders = [(name, os.path.join(basedir, name)) for name in known]
+    folders.sort(key=lambda f: (f[0].lower() != 'id1', f[0].lower()))
+
+    records = {}
+    changed = old_stamp != base_stamp
+    complete = False
+    total = len(folders)
+    try:
+        for done, (name, folder) in enumerate(folders, 1):
+            if cancel is not None and cancel.is_set():
+                return
+            path = os.path.join(basedir, name)
+            stamp = _stamp(folder)
+            record = known.get(name)
+            if not _is_current(path, record, stamp):
+                record = scan_mod(folder, stamp)
+                changed = True
+                if record is None:
+                    continue
+            records[name] = record
+            yield done, total, name, record
+        complete = True
+    finally:
+        with _index_lock:
+            entry = _basedir_entry(basedir)
+            if complete:  # Replace the base directory entry, drops folders removed since the last scan.
+                entry['stamp'] = base_stamp
+                entry['mods'] = records
+            else:  # Cancelled, keep what was scanned but list the base directory again next time.
+                entry['mods'].update(records)
+            if changed or _index_dirty:
+                save_index()
+
+def update_index(basedir, rebuild=False, cancel=None):
+    """
+    Bring the index of a base directory up to date, see iter_library().
+
+    :param basedir: Base directory with the id1 and mod folders.
+    :param rebuild: BOOL Discard the index of the base directory and rescan every folder.
+    :param cancel: threading.Event, stop scanning when set, the folders scanned so far are returned.
+    :return: Dictionary of mod folder name -> record.
+    """
+    return {name: record for _, _, name, record in iter_library(basedir, rebuild=rebuild, cancel=cancel)}
+
+def library_result(basedir, records):
+    """
+    Assemble the scan_library() result from the folder records of a base directory.
+
+    :param basedir: Base directory with the id1 and mod folders.
+    :param records: Dictionary of folder name -> record, see scan_mod().
+    :return: See scan_library().
+    """
+    id1 = next((name for name in records if name.lower() == 'id1'), None)
+    mods = [name for name, record in records.items() if name != id1 and _has_game_data(record) and not record['archive']]
+
+    return {
+        'basedir': os.path.abspath(basedir),
+        'id1': _id1_status(records.get(id1)),
+        'mods': sorted(mods, key=str.lower),
+        'records': records,
+    }
+
+@foo.timed()
+def scan_library(basedir, rebuild=False):
+    """
+    Scan a base directory for the id1 and mod folders. This is the single traversal shared by id1_check(),
+    game_check(), get_game_folders(), get_maps() and get_readme(), pass the result as their scan argument.
+
+    :param basedir: Base directory with the id1 and mod folders.
+    :param rebuild: BOOL Ignore the library index and rescan every folder.
+    :return: Dictionary
+        'basedir' - absolute path of the base directory.
+        'id1' - id1 status, see id1_check().
+        'mods' - sorted list of mod folders with game data.
+        'records' - folder name -> record, see scan_mod().
+    """
+    return library_result(basedir, update_index(basedir, rebuild=rebuild))
+
+
+@foo.timed()
+def read_pak(path):
+    """
+    Read the directory of a Quake pak file. The file is memory mapped and only the header and the directory are
+    touched, file bodies are never read. Directories are cached by the pak size/mtime.
+
+    :param path: Path & name of the pak file.
+    :return: Dictionary of file name -> (offset, length). Empty if the file is not a valid pak or can't be read.
+    """
+    import mmap
+    stamp = _file_stamp(path)
+    if stamp is None:
+        return dict()
+    with _pak_lock:
+        cached = _pak_cache.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    directory = dict()
+    size = stamp[0]
+    if size >= PAKHEADER.size:
+        try:
+            with foo.timeBlock('read_pak.mmap'), open(path, 'rb') as in_file, mmap.mmap(in_file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                ident, dirofs, dirlen = PAKHEADER.unpack_from(mm, 0)
+                if ident == b'PACK' and dirofs >= PAKHEADER.size and dirlen >= 0 and dirlen % PAKENTRY.size == 0 and dirofs + dirlen <= size:
+                    for i in range(dirlen // PAKENTRY.size):
+                        name, filepos, filelen = PAKENTRY.unpack_from(mm, dirofs + i * PAKENTRY.size)
+                        name = name.split(b'\0', 1)[0].decode('latin-1')
+                        if name and 0 <= filepos and filepos + filelen <= size:
+                            directory[name] = (filepos, filelen)
+        except ValueError:  # Not mappable, left empty as an invalid pak.
+            pass
+        except OSError:  # Permissions or a failing disk, not cached so the next call reads the file again.
+            return dict()
+
+    with _pak_lock:
+        _pak_cache[path] = (stamp, directory)
+    return directory
+
+@foo.timed()
+def get_pak_maps(path, paks=None):
+    """
+    List the bsp maps packed in the pak files of a folder. Brush models of the items (maps/b_*.bsp) are skipped.
+
+    :param path: Folder path ex. /Quake/pakmod/id1
+    :param paks: List of pak files in the folder. If None the folder is listed.
+    :return: Sorted list of map files ex. e1m1.bsp
+    """
+    if paks is None:
+        try:
+            paks = [c for c in os.listdir(path) if c.lower().endswith('.pak')]
+        except OSError:
+            paks = []
+
+    maps = set()
+    for pak in paks:
+        for name in read_pak(os.path.join(path, pak)):
+            folder, _, file = name.lower().rpartition('/')
+            if folder == 'maps' and file.endswith('.bsp') and not file.startswith('b_'):
+                maps.add(name.rpartition('/')[2])
+    return sorted(maps)
+
+def get_pak_demos(path, paks):
+    """
+    List the demos packed at the root of the pak files of a folder, ex. demo1.dem in id1/pak0.pak.
+
+    :param path: Folder path ex. /Quake/id1
+    :param paks: List of pak files in the folder.
+    :return: Sorted list of dem files.
+    """
+    demos = set()
+    for pak in paks:
+        demos.update(name for name in read_pak(os.path.join(path, pak)) if '/' not in name and name.lower().endswith('.dem'))
+    return sorted(demos, key=str.lower)
+
+@foo.timed()
+def get_demos(path, rebuild=False, scan=None):
+    """
+    Get list of the demos of a mod folder, loose dem files and those packed in the pak files.
+
+    :param path: Mod folder ex. /Quake/id1
+    :param rebuild: BOOL Ignore the index and rescan the folder.
+    :param scan: Result of scan_library() for the parent folder. If None the folder record is taken from the index.
+    :return: Sorted list of dem files, empty if none.
+    """
+    record = _record(path, scan, rebuild=rebuild)
+    if not record:
+        return []
+    return merge_maps(record['demos'], record['pak_demos'])
+
+def merge_maps(loose, packed):
+    """
+    Merge the loose bsp files of a maps folder with the maps packed in pak files. A loose file takes precedence
+    over a packed map of the same name, as it does in the Quake engine.
+
+    :param loose: List of bsp files from the maps folder.
+    :param packed: List of bsp files from the pak files.
+    :return: Sorted list of maps.
+    """
+    names = {m.lower() for m in loose}
+    return sorted(list(loose) + [m for m in packed if m.lower() not in names], key=str.lower)
+
+
+@foo.timed()
+def map_source(path, mapname, record=None):
+    """
+    Locate a map in a mod folder. A loose bsp file in the maps folder takes precedence over the pak files, a higher
+    numbered pak file takes precedence over a lower one.
+
+    :param path: Mod folder path ex. /Quake/pakmod/id1
+    :param mapname: bsp file ex. e1m1.bsp
+    :param record: Folder record, see scan_mod(). If None the record is taken from the index.
+    :return: tuple(file, offset, length) or None if the map is not found.
+    """
+    if record is None:
+        record = index_mod(path)
+    if not record:
+        return None
+
+    for loose in record['maps']:
+        if loose.lower() == mapname.lower():
+            file = os.path.join(path, 'maps', loose)
+            stamp = _file_stamp(file)
+            return (file, 0, stamp[0]) if stamp else None
+
+    name = 'maps/' + mapname.lower()
+    for pak in sorted(record['paks'], key=str.lower, reverse=True):
+        file = os.path.join(path, pak)
+        for entry, (offset, length) in read_pak(file).items():
+            if entry.lower() == name:
+                return file, offset, length
+    return None
+
+def parse_entities(text):
+    """
+    Parse the entity lump of a bsp file.
+
+    :param text: bytes of the entity lump.
+    :return: List of dictionaries of key -> value (str).
+    """
+    entities = []
+    entity = None
+    key = None
+    for match in ENTITYTOKEN.finditer(text):
+        token = match.group(0)
+        if token == b'{':
+            entity = dict()
+            key = None
+        elif token == b'}':
+            if entity is not None:
+                entities.append(entity)
+            entity = None
+        elif entity is not None:
+            value = match.group(1).decode('latin-1')
+            if key is None:
+                key = value
+            else:
+                entity[key] = value
+                key = None
+    return entities
+
+def _quake_text(text):
+    """
+    Map the Quake "gold" characters (high bit set) to plain ASCII and collapse the escaped newlines of a message.
+    """
+    text = ''.join(chr(ord(c) & 0x7f) if ord(c) >= 0x80 else c for c in text)
+    text = text.replace('\\n', ' ')
+    return ' '.join(''.join(c if c.isprintable() else ' ' for c in text).split())
+
+def _entity_stats(entities):
+    monsters = [0, 0, 0]  # Easy, normal, hard/nightmare.
+    title = ''
+    secrets = 0
+    items = 0
+    for entity in entities:
+        classname = entity.get('classname', '')
+        if classname == 'worldspawn':
+            title = _quake_text(entity.get('message', ''))
+        elif classname.startswith('monster_'):
+            try:
+                spawnflags = int(float(entity.get('spawnflags', 0)))
+            except ValueError:
+                spawnflags = 0
+            for skill, flag in enumerate(SKILLFLAGS):
+                if not spawnflags & flag:
+                    monsters[skill] += 1
+        elif classname == 'trigger_secret':
+            secrets += 1
+        elif classname.startswith(('item_', 'weapon_')):
+            items += 1
+    classnames = sorted({entity['classname'] for entity in entities if entity.get('classname')})
+    return {'title': title, 'monsters': monsters, 'secrets': secrets, 'items': items, 'classnames': classnames}
+
+def _bsp_lumps(mm, offset, length):
+    """
+    Validate the bsp header at offset and return the version and list of (offset, length) lumps relative to offset.
+    """
+    if length < BSPLUMPS.size:
+        return None, None
+    header = BSPLUMPS.unpack_from(mm, offset)
+    if header[0] not in BSPVERSIONS:
+        return None, None
+    lumps = [(header[1 + 2 * i], header[2 + 2 * i]) for i in range(15)]
+    if any(ofs < 0 or size < 0 or ofs + size > length for ofs, size in lumps):
+        return None, None
+    return header[0], lumps
+
+@foo.timed()
+def bsp_info(file, offset=0, length=None):
+    """
+    Map title & gameplay stats of a bsp file. The file is memory mapped and only the header and the entity lump are
+    read. Results are cached by the file size/mtime, see save_map_info().
+
+    :param file: Path & name of a bsp file or a pak file.
+    :param offset: Offset of the bsp in the file, see map_source().
+    :param length: Length of the bsp, None for the rest of the file.
+    :return: Dictionary 'title' - worldspawn message, 'monsters' - [easy, normal, hard] count, 'secrets', 'items',
+             'classnames' - sorted entity classnames, 'vis' - BOOL visibility data present. None if the file is not a
+             valid bsp.
+    """
+    import mmap
+    global _map_info
+    stamp = _file_stamp(file)
+    if stamp is None:
+        return None
+    key = f"{file}|{offset}"
+    with _map_info_lock:
+        if _map_info is None:
+            _map_info = _load_map_info()
+        cached = _map_info.get(key)
+    if cached and cached[0] == stamp and (cached[1] is None or 'classnames' in cached[1]):  # Older entries lack classnames.
+        return cached[1]
+
+    info = None
+    if length is None:
+        length = stamp[0] - offset
+    if offset + length <= stamp[0]:
+        try:
+            with foo.timeBlock('bsp_info.mmap'), open(file, 'rb') as in_file, mmap.mmap(in_file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                version, lumps = _bsp_lumps(mm, offset, length)
+                if version is not None:
+                    ent_ofs, ent_len = lumps[LUMP_ENTITIES]
+                    info = _entity_stats(parse_entities(mm[offset + ent_ofs:offset + ent_ofs + ent_len]))
+                    info['vis'] = lumps[LUMP_VISIBILITY][1] > 0
+        except (OSError, ValueError, struct.error):
+            info = None
+
+    with _map_info_lock:
+        _map_info[key] = [stamp, info]
+    return info
+
+def map_info(path, mapname, record=None):
+    """
+    bsp_info() of a map in a mod folder, loose or packed.
+
+    :param path: Mod folder path ex. /Quake/pakmod/id1
+    :param mapname: bsp file ex. e1m1.bsp
+    :param record: Folder record, see scan_mod(). If None the record is taken from the index.
+    :return: See bsp_info().
+    """
+    source = map_source(path, mapname, record)
+    if source is None:
+        return None
+    return bsp_info(*source)
+
+@foo.timed()
+def iter_map_info(path, maps, cancel=None):
+    """
+    Generator of map_info() for the maps of a mod folder, the cache is saved when done.
+
+    :param path: Mod folder path ex. /Quake/pakmod/id1
+    :param maps: List of bsp files, see get_maps().
+    :param cancel: threading.Event, stop when set.
+    :return: Yields tuple(map, info).
+    """
+    record = index_mod(path)
+    try:
+        for mapname in maps:
+            if cancel is not None and cancel.is_set():
+                return
+            yield mapname, map_info(path, mapname, record)
+    finally:
+        save_map_info()
+
+def _load_map_info():
+    cache = foo.readConfig(MAPINFOFILE)
+    return dict() if isinstance(cache, Exception) else cache
+
+@foo.timed()
+def save_map_info(file=None):
+    """
+    Write the map info cache to disk.
+
+    :param file: Path and file of the cache, defaults to MAPINFOFILE.
+    :return: Exception or True if no issues.
+    """
+    with _map_info_lock:
+        if _map_info is None:
+            return True
+        return foo.writeConfig(file=file or MAPINFOFILE, settings=_map_info)
+
+
+@foo.timed()
+def bsp_preview(file, offset=0, length=None, size=THUMBSIZE):
+    """
+    Rasterize a top-down wireframe of a bsp from the vertex & edge lumps. Projection and line drawing are NumPy
+    array operations over all edges at once, edges are shaded by height with the highest drawn on top.
+
+    :param file: Path & name of a bsp file or a pak file.
+    :param offset: Offset of the bsp in the file, see map_source().
+    :param length: Length of the bsp, None for the rest of the file.
+    :param size: Width & height of the image in pixels.
+    :return: numpy.ndarray (size, size, 3) of uint8 or None if the file is not a valid bsp.
+    """
+    import mmap
+    import numpy as np  # Optional dependency, only needed for map previews.
+
+    stamp = _file_stamp(file)
+    if stamp is None:
+        return None
+    if length is None:
+        length = stamp[0] - offset
+    if offset + length > stamp[0]:
+        return None
+
+    with open(file, 'rb') as in_file, mmap.mmap(in_file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        version, lumps = _bsp_lumps(mm, offset, length)
+        if version is None:
+            return None
+        vert_ofs, vert_len = lumps[LUMP_VERTEXES]
+        edge_ofs, edge_len = lumps[LUMP_EDGES]
+        edge_type = '<u2' if version == BSPVERSIONS[0] else '<u4'  # BSP2 uses 32 bit vertex indices.
+        verts = np.frombuffer(mm[offset + vert_ofs:offset + vert_ofs + vert_len - vert_len % 12], dtype='<f4').reshape(-1, 3)
+        edge_size = 2 * np.dtype(edge_type).itemsize
+        edges = np.frombuffer(mm[offset + edge_ofs:offset + edge_ofs + edge_len - edge_len % edge_size], dtype=edge_type).reshape(-1, 2)
+
+    edges = edges[(edges < len(verts)).all(axis=1)].astype(np.int64)
+    image = np.zeros((size, size, 3), dtype=np.uint8)
+    image[:] = (24, 20, 16)
+    if not len(edges):
+        return image
+
+    used = verts[np.unique(edges)]
+    lo = used.min(axis=0)
+    span = used.max(axis=0) - lo
+    margin = 4
+    scale = (size - 1 - 2 * margin) / max(float(span[0]), float(span[1]), 1.0)
+    centre = (size - 1 - np.array([span[0], span[1]]) * scale) / 2
+
+    px = (verts[:, 0] - lo[0]) * scale + centre[0]
+    py = (size - 1) - ((verts[:, 1] - lo[1]) * scale + centre[1])  # Screen y grows downwards.
+    height = (verts[edges, 2].mean(axis=1) - lo[2]) / max(float(span[2]), 1.0)
+
+    order = np.argsort(height)  # Draw low edges first so higher geometry ends on top.
+    edges = edges[order]
+    height = height[order]
+
+    x0, y0 = px[edges[:, 0]], py[edges[:, 0]]
+    dx, dy = px[edges[:, 1]] - x0, py[edges[:, 1]] - y0
+    steps = np.ceil(np.maximum(np.abs(dx), np.abs(dy))).astype(np.int64) + 1
+    idx = np.repeat(np.arange(len(edges)), steps)
+    start = np.repeat(np.cumsum(steps) - steps, steps)
+    t = (np.arange(len(idx)) - start) / np.maximum(np.repeat(steps - 1, steps), 1)
+    xs = np.clip(np.rint(x0[idx] + dx[idx] * t), 0, size - 1).astype(np.int64)
+    ys = np.clip(np.rint(y0[idx] + dy[idx] * t), 0, size - 1).astype(np.int64)
+
+    shade = (90 + 165 * height[idx])[:, None]
+    image[ys, xs] = (shade * np.array([1.0, 0.8, 0.55])).astype(np.uint8)  # Quake brown to gold by height.
+    return image
+
+def _write_png(file, image):
+    """
+    Write an RGB uint8 array as a png file with zlib, no imaging library required.
+    """
+    import zlib
+    height, width = image.shape[:2]
+    rows = b''.join(b'\0' + image[y].tobytes() for y in range(height))
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+    with open(file, 'wb') as out_file:
+        out_file.write(b'\x89PNG\r\n\x1a\n')
+        out_file.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+        out_file.write(chunk(b'IDAT', zlib.compress(rows, 6)))
+        out_file.write(chunk(b'IEND', b''))
+
+def _evict_thumbnails(folder, limit, keep=None):
+    """
+    Remove the least recently used previews until the cache folder is below limit bytes. The keep file is never
+    removed.
+    """
+    try:
+        with os.scandir(folder) as it:
+            files = [(e.stat().st_mtime_ns, e.stat().st_size, e.path) for e in it if e.name.endswith('.png') and e.is_file()]
+    except OSError:
+        return
+    total = sum(f[1] for f in files)
+    for _, size, path in sorted(files):
+        if total <= limit:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+@foo.timed()
+def map_thumbnail(path, mapname, size=THUMBSIZE, record=None, cache_dir=None, cache_size=THUMBCACHESIZE):
+    """
+    png preview of a map. Previews are rendered once with bsp_preview() and kept in the cache folder, a cache hit
+    touches the file mtime so eviction removes the least recently used previews first.
+
+    :param path: Mod folder path ex. /Quake/pakmod/id1
+    :param mapname: bsp file ex. e1m1.bsp
+    :param size: Width & height of the preview in pixels.
+    :param record: Folder record, see scan_mod(). If None the record is taken from the index.
+    :param cache_dir: Cache folder, defaults to THUMBDIR.
+    :param cache_size: Cache limit in bytes.
+    :return: Path of the png file or None if the map is not found or is not a valid bsp.
+    :raise ImportError: NumPy is not installed and the preview is not cached.
+    """
+    import hashlib
+    source = map_source(path, mapname, record)
+    if source is None:
+        return None
+    file, offset, length = source
+    stamp = _file_stamp(file)
+    if stamp is None:
+        return None
+
+    cache_dir = cache_dir or THUMBDIR
+    key = f"{file}|{offset}|{length}|{stamp[0]}|{stamp[1]}|{size}"
+    thumb = os.path.join(cache_dir, hashlib.sha1(key.encode('utf-8', 'surrogateescape')).hexdigest() + '.png')
+    if os.path.isfile(thumb):
+        try:
+            os.utime(thumb)
+        except OSError:
+            pass
+        return thumb
+
+    image = bsp_preview(file, offset, length, size)
+    if image is None:
+        return None
+    os.makedirs(cache_dir, exist_ok=True)
+    _write_png(thumb + '.tmp', image)
+    os.replace(thumb + '.tmp', thumb)
+    _evict_thumbnails(cache_dir, cache_size, keep=thumb)
+    return thumb
+
+
+@foo.timed()
+def load_readme_index(file=None):
+    """
+    Load the readme search index. The file holds the term counts of every readme, the inverted index of
+    term -> {mod folder: count} is built from them in memory.
+
+    :param file: Path and file of the index, defaults to READMEINDEXFILE.
+    :return: Index dictionary.
+    """
+    global _readme_index
+    index = foo.readConfig(file or READMEINDEXFILE)
+    if isinstance(index, Exception) or index.get('version') != READMEINDEXVERSION:
+        index = {'version': READMEINDEXVERSION, 'files': {}}
+    with _readme_lock:
+        _readme_index = index
+        _readme_index['terms'] = dict()
+        _readme_index['vocabulary'] = None
+        for path, entry in index['files'].items():
+            _add_readme_terms(path, entry)
+    return _readme_index
+
+@foo.timed()
+def save_readme_index(file=None):
+    """
+    Write the readme search index to disk, only the per file term counts are stored.
+
+    :param file: Path and file of the index, defaults to READMEINDEXFILE.
+    :return: Exception or True if no issues.
+    """
+    with _readme_lock:
+        if _readme_index is None:
+            return True
+        settings = {'version': READMEINDEXVERSION, 'files': _readme_index['files']}
+        return foo.writeConfig(file=file or READMEINDEXFILE, settings=settings)
+
+def _readme_mod(path):
+    return os.path.dirname(path)
+
+def _add_readme_terms(path, entry, sign=1):
+    terms = _readme_index['terms']
+    mod = _readme_mod(path)
+    for term, count in entry['terms'].items():
+        mods = terms.setdefault(term, dict())
+        mods[mod] = mods.get(mod, 0) + sign * count
+        if mods[mod] <= 0:
+            del mods[mod]
+            if not mods:
+                del terms[term]
+    _readme_index['vocabulary'] = None
+
+def _readme_terms(path):
+    counts = dict()
+    with open(path, 'rb') as in_file:
+        text = in_file.read().decode('latin-1').lower()
+    for term in TERM.findall(text):
+        counts[term] = counts.get(term, 0) + 1
+    return counts
+
+@foo.timed()
+def iter_readme_index(basedir, cancel=None):
+    """
+    Generator that brings the readme index of a base directory up to date. Only the mod folders of library_result()
+    and the extracted archives are indexed, not id1 or folders without game data. Only readme files that are new or
+    whose size/mtime changed are read again, readme files that are gone are dropped. The index is saved when done.
+
+    :param basedir: Base directory with the mod folders.
+    :param cancel: threading.Event, stop when set. Files indexed so far are kept.
+    :return: Yields tuple(done, total, mod folder name).
+    """
+    with _readme_lock:
+        if _readme_index is None:
+            load_readme_index()
+    basedir = os.path.abspath(basedir)
+    records = update_index(basedir, cancel=cancel)
+    if cancel is not None and cancel.is_set():
+        return
+    mods = set(library_result(basedir, records)['mods'])
+    mods.update(name for name, record in records.items() if record['archive'] and _has_game_data(record))
+    readmes = [(name, os.path.join(basedir, name, readme)) for name, record in sorted(records.items())
+               if name in mods for readme in record['readme']]
+
+    changed = False
+    try:
+        for done, (name, path) in enumerate(readmes, 1):
+            if cancel is not None and cancel.is_set():
+                return
+            stamp = _file_stamp(path)
+            with _readme_lock:
+                entry = _readme_index['files'].get(path)
+            if stamp and (entry is None or entry['stamp'] != stamp):
+                try:
+                    new_entry = {'stamp': stamp, 'terms': _readme_terms(path)}
+                except OSError:
+                    continue
+                with _readme_lock:
+                    if entry is not None:
+                        _add_readme_terms(path, entry, sign=-1)
+                    _readme_index['files'][path] = new_entry
+                    _add_readme_terms(path, new_entry)
+                changed = True
+            yield done, len(readmes), name
+
+        current = {path for _, path in readmes}
+        with _readme_lock:
+            prefix = basedir + os.sep
+            for path in [p for p in _readme_index['files'] if p.startswith(prefix) and p not in current]:
+                _add_readme_terms(path, _readme_index['files'].pop(path), sign=-1)
+                changed = True
+    finally:
+        if changed:
+            save_readme_index()
+
+@foo.timed()
+def search_readmes(query, basedir=None):
+    """
+    Rank the mods by the keyword hits of a query in their readme files. A query word also matches the longer words
+    it starts, ex. grap matches grapple & grappling. Mods matching more of the query words rank first, then by the
+    total number of hits.
+
+    :param query: Search text.
+    :param basedir: Only rank the mods of this base directory, None for all.
+    :return: List of tuple(mod folder name, words matched, hits) best first.
+    """
+    words = TERM.findall(query.lower())
+    if not words:
+        return []
+    prefix = os.path.abspath(basedir) + os.sep if basedir else None
+    with _readme_lock:
+        if _readme_index is None:
+            load_readme_index()
+        terms = _readme_index['terms']
+        if _readme_index['vocabulary'] is None:
+            _readme_index['vocabulary'] = sorted(terms)
+        vocabulary = _readme_index['vocabulary']
+
+        scores = dict()  # Mod path -> [words matched, hits].
+        for word in words:
+            lo = bisect.bisect_left(vocabulary, word)
+            hi = bisect.bisect_left(vocabulary, word + '\uffff', lo)
+            hits = dict()
+            for term in vocabulary[lo:hi]:
+                for mod, count in terms.get(term, {}).items():
+                    hits[mod] = hits.get(mod, 0) + count
+            for mod, count in hits.items():
+                score = scores.setdefault(mod, [0, 0])
+                score[0] += 1
+                score[1] += count
+
+    ranked = [(os.path.basename(mod), matched, hits) for mod, (matched, hits) in scores.items()
+              if prefix is None or mod.startswith(prefix)]
+    return sorted(ranked, key=lambda r: (-r[1], -r[2], r[0].lower()))
+
+
+@foo.timed()
+def detect_encoding(sample):
+    """
+    Guess the encoding of a text file from a sample of its first bytes.
+    utf-8 - the sample decodes as UTF-8, this includes plain ASCII.
+    quake - varied runs of high-bit bytes that read as words once the high bit is cleared, Quake's "gold" characters.
+    cp437 - high-bit bytes mostly in the CP437 box drawing & block range, DOS ANSI art.
+    latin-1 - anything else, isolated accented characters.
+
+    :param sample: bytes, ex. the first ENCODINGSAMPLE bytes of the file.
+    :return: Encoding name for decode_runs().
+    """
+    try:
+        sample.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError as err:
+        if err.start >= len(sample) - 3 and err.reason == 'unexpected end of data':  # Sample cut inside a character.
+            return 'utf-8'
+
+    gold = art = accents = 0
+    for run in HIGHRUN.finditer(sample):
+        chars = run.group(0)
+        if len(chars) >= 3 and max(chars.count(c) for c in set(chars)) < 0.4 * len(chars):  # Not a line of art.
+            masked = bytes(c & 0x7f for c in chars).decode('ascii')
+            if sum(c.isalnum() or c == ' ' for c in masked) >= 0.6 * len(chars):
+                gold += len(chars)
+                continue
+        in_art = sum(c in CP437ART for c in chars)
+        art += in_art
+        accents += len(chars) - in_art
+
+    if gold > art and gold > accents:
+        return 'quake'
+    if art > accents:
+        return 'cp437'
+    return 'latin-1'
+
+def decode_runs(data, encoding):
+    """
+    Decode text for display. For the quake encoding the high-bit "gold" characters are shown as their ASCII
+    counterparts in runs tagged 'gold', the console glyphs below 0x20 get an ASCII stand-in.
+
+    :param data: bytes to decode.
+    :param encoding: See detect_encoding().
+    :return: List of tuple(text, tag), tag is None for plain text.
+    """
+    if encoding != 'quake':
+        return [(data.decode(encoding, errors='replace'), None)]
+
+    runs = []
+    pos = 0
+    for run in HIGHRUN.finditer(data):
+        if run.start() > pos:
+            runs.append((data[pos:run.start()].translate(QUAKECHARS).decode('latin-1'), None))
+        gold = bytes(c & 0x7f for c in run.group(0)).translate(QUAKECHARS)
+        runs.append((gold.decode('latin-1'), 'gold'))
+        pos = run.end()
+    if pos < len(data):
+        runs.append((data[pos:].translate(QUAKECHARS).decode('latin-1'), None))
+    return runs
+
+def _launch(cmd, timeout, cancel=None, stop=None):
+    """
+    Launch an engine and collect its console output, see smoke_test() & timedemo(). On POSIX the engine leads its
+    own process group so a kill also stops its helper processes.
+
+    :param cmd: List of command-line arguments, see build_command().
+    :param timeout: Seconds before the engine is killed.
+    :param cancel: threading.Event, kills the engine.
+    :param stop: Compiled regex, the engine is killed once a line of its output matches.
+    :return: tuple(status, returncode, output), status 'exited', 'stopped', 'timeout', 'cancelled' or 'error'.
+    """
+    import subprocess
+    try:
+        with foo.timeBlock('run_command.spawn'):
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+                                    text=True, errors='replace', bufsize=1, start_new_session=os.name == 'posix')
+    except OSError as err:
+        return 'error', None, str(err)
+
+    lines = []
+    matched = threading.Event()
+
+    def read():
+        for line in iter(proc.stdout.readline, ''):
+            lines.append(line)
+            if stop and stop.search(line):
+                matched.set()
+        proc.stdout.close()
+
+    reader = threading.Thread(target=read, daemon=True)
+    reader.start()
+    deadline = time.monotonic() + timeout
+    status = 'exited'
+    while proc.poll() is None:
+        if matched.is_set():
+            status = 'stopped'
+        elif cancel and cancel.is_set():
+            status = 'cancelled'
+        elif time.monotonic() >= deadline:
+            status = 'timeout'
+        if status != 'exited':
+            try:
+                if os.name == 'posix':
+                    os.killpg(proc.pid, 9)  # SIGKILL, the engine and its helper processes.
+                else:
+                    proc.kill()
+            except OSError:
+                pass
+            break
+        matched.wait(0.1)
+    proc.wait()
+    reader.join(1)
+    return status, proc.returncode, ''.join(lines)
+
+@foo.timed()
+def smoke_test(engine, basedir, game=None, maps=None, template=SMOKEARGS, jobs=SMOKEJOBS, timeout=SMOKETIMEOUT, cancel=None):
+    """
+    Launch the engine once per map with a "load then quit" argument template, jobs engines at a time. A map passes
+    if the engine exits with code 0 and its console output has no error line, see SMOKEFAIL. Engines still running
+    after timeout seconds are killed.
+
+    :param engine: Path to the Quake engine executable, ex. a dedicated server build or a stand-in script.
+    :param basedir: Base directory with the id1 folder.
+    :param game: Mod folder in the base directory, None for id1.
+    :param maps: List of bsp files, None for get_maps() of the mod.
+    :param template: Arguments added after -basedir & -game, {map} is the map name, {bsp} the bsp file.
+    :param jobs: Engines running at once.
+    :param timeout: Seconds per map.
+    :param cancel: threading.Event, stops the launches and kills the running engines.
+    :return: Generator of result dictionaries in order of completion, 'map', 'status' - pass, fail, timeout or
+             cancelled, 'returncode', 'seconds', 'reason' - error line or exit code, 'command'.
+    """
+    import concurrent.futures
+    if maps is None:
+        maps = get_maps(os.path.join(basedir, game or 'id1')) or []
+    base = _command_args(engine, basedir, None, game, None)
+
+    def run(bsp):
+        args = template.format(map=bsp.removesuffix('.bsp'), bsp=bsp).split()
+        if cancel and cancel.is_set():
+            return {'map': bsp, 'status': 'cancelled', 'returncode': None, 'seconds': 0.0, 'reason': '', 'command': ' '.join(base + args)}
+        start = time.perf_counter()
+        status, returncode, output = _launch(base + args, timeout, cancel)
+        error = SMOKEFAIL.search(output)
+        match status:
+            case 'exited' if error:
+                status, reason = 'fail', output[error.start():].split('\n', 1)[0].strip()
+            case 'exited':
+                status, reason = 'pass' if returncode == 0 else 'fail', f"exit code {returncode}"
+            case 'error':
+                status, reason = 'fail', output.strip()  # Launch error.
+            case 'timeout':
+                reason = f"no exit after {timeout} s"
+            case _:
+                reason = ''
+        return {'map': bsp, 'status': status, 'returncode': returncode, 'seconds': time.perf_counter() - start,
+                'reason': reason, 'command': ' '.join(base + args)}
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        for future in concurrent.futures.as_completed([pool.submit(run, bsp) for bsp in maps]):
+            yield future.result()
+
+def smoke_report(results, engine, basedir, game, template):
+    """
+    json report of a smoke test, see smoke_test().
+
+    :return: Dictionary of the settings, the time and the results.
+    """
+    return {'time': time.time(), 'engine': engine, 'basedir': basedir, 'game': game or 'id1', 'template': template,
+            'counts': {status: sum(r['status'] == status for r in results) for status in ('pass', 'fail', 'timeout', 'cancelled')},
+            'results': sorted(results, key=lambda r: r['map'].lower())}
+
+def smoke_table(results):
+    """
+    Text table of smoke_test() results, failures first.
+
+    :param results: List of smoke_test() result dictionaries.
+    :return: str()
+    """
+    order = {'fail': 0, 'timeout': 1, 'cancelled': 2, 'pass': 3}
+    rows = sorted(results, key=lambda r: (order.get(r['status'], 0), r['map'].lower()))
+    width = max([len(r['map']) for r in rows] + [3])
+    lines = [f"{'Map':<{width}}  {'Result':<9}  {'Time':>7}  Reason"]
+    lines += [f"{r['map']:<{width}}  {r['status'].upper():<9}  {r['seconds']:>6.1f}s  {r['reason']}" for r in rows]
+    counts = {status: sum(r['status'] == status for r in results) for status in order}
+    lines.append(', '.join(f"{count} {status}" for status, count in counts.items() if count) or "No maps.")
+    return '\n'.join(lines)
+
+@foo.timed()
+def timedemo(engines, basedir, demos=None, game=None, repeat=3, template=TIMEDEMOARGS, timeout=TIMEDEMOTIMEOUT, cancel=None):
+    """
+    Run +timedemo for every engine x demo x repetition. The runs are sequential so the engines never compete for
+    the CPU & GPU, an engine is stopped as soon as it prints the timedemo result line, see TIMEDEMORESULT. The
+    engines must write their console to stdout, as QuakeSpasm, Ironwail and vkQuake do on Mac & Linux.
+
+    :param engines: List of paths to the Quake engines.
+    :param basedir: Base directory with the id1 folder.
+    :param demos: List of dem files, None for the demos of the mod and id1, see get_demos().
+    :param game: Mod folder in the base directory, None for id1.
+    :param repeat: Runs of each engine & demo.
+    :param template: Arguments added after -basedir & -game, {demo} is the demo name.
+    :param timeout: Seconds per run.
+    :param cancel: threading.Event, stops the runs and kills the running engine.
+    :return: Generator of result dictionaries, 'engine', 'demo', 'run', 'status' - ok, fail or timeout, 'frames',
+             'seconds', 'fps', 'reason', 'command'.
+    """
+    if demos is None:
+        demos = merge_maps(get_demos(os.path.join(basedir, game)) if game else [], get_demos(os.path.join(basedir, 'id1')))
+    demos = [demo if demo.lower().endswith('.dem') else demo + '.dem' for demo in demos]  # Same key as the found demos.
+
+    for engine in engines:
+        base = _command_args(engine, basedir, None, game, None)
+        for demo in demos:
+            cmd = base + template.format(demo=demo.removesuffix('.dem')).split()
+            for run in range(1, repeat + 1):
+                if cancel and cancel.is_set():
+                    return
+                status, returncode, output = _launch(cmd, timeout, cancel, stop=TIMEDEMORESULT)
+                if status == 'cancelled':
+                    return
+                result = {'engine': engine, 'demo': demo, 'run': run, 'status': 'ok', 'frames': None, 'seconds': None,
+                          'fps': None, 'reason': '', 'command': ' '.join(cmd)}
+                found = TIMEDEMORESULT.findall(output)
+                if found:
+                    frames, seconds, fps = found[-1]
+                    result.update(frames=int(frames), seconds=float(seconds), fps=float(fps))
+                elif status == 'timeout':
+                    result.update(status='timeout', reason=f"no result after {timeout} s")
+                else:
+                    lines = output.strip().splitlines()
+                    result.update(status='fail', reason=lines[-1] if lines else f"exit code {returncode}")
+                yield result
+
+def timedemo_summary(results):
+    """
+    fps statistics of timedemo() results per engine & demo.
+
+    :param results: List of timedemo() result dictionaries.
+    :return: List of dictionaries 'engine', 'demo', 'runs', 'failed', 'fps_mean', 'fps_stddev', 'fps_min', 'fps_max'.
+    """
+    import statistics
+    groups = dict()
+    for result in results:
+        groups.setdefault((result['engine'], result['demo']), []).append(result)
+
+    summary = list()
+    for (engine, demo), runs in groups.items():
+        fps = [run['fps'] for run in runs if run['status'] == 'ok']
+        summary.append({'engine': engine, 'demo': demo, 'runs': len(fps), 'failed': len(runs) - len(fps),
+                        'fps_mean': statistics.fmean(fps) if fps else None,
+                        'fps_stddev': statistics.stdev(fps) if len(fps) > 1 else 0.0 if fps else None,
+                        'fps_min': min(fps, default=None), 'fps_max': max(fps, default=None)})
+    return summary
+
+def timedemo_report(results, basedir, game, template, repeat):
+    """
+    json record of a timedemo run, see save_timedemo().
+
+    :return: Dictionary of the settings, the time, the summary and the results.
+    """
+    return {'time': time.time(), 'basedir': basedir, 'game': game or 'id1', 'template': template, 'repeat': repeat,
+            'summary': timedemo_summary(results), 'results': results}
+
+def load_timedemo(file=None):
+    """
+    Earlier timedemo runs, oldest first.
+
+    :param file: Path and file of the history, defaults to TIMEDEMOFILE.
+    :return: List of timedemo_report() dictionaries.
+    """
+    history = foo.readConfig(file or TIMEDEMOFILE)
+    return history if isinstance(history, list) else []
+
+def save_timedemo(report, file=None):
+    """
+    Add a timedemo run to the history, the oldest runs above TIMEDEMOHISTORY are dropped.
+
+    :param report: See timedemo_report().
+    :param file: Path and file of the history, defaults to TIMEDEMOFILE.
+    :return: Exception or True if no issues.
+    """
+    history = load_timedemo(file) + [report]
+    return foo.writeConfig(file or TIMEDEMOFILE, history[-TIMEDEMOHISTORY:])
+
+def timedemo_table(summary, history=()):
+    """
+    Text table of a timedemo summary. The change is against the last earlier run of the same engine & demo.
+
+    :param summary: See timedemo_summary().
+    :param history: See load_timedemo(), without the run of the summary.
+    :return: str()
+    """
+    previous = dict()
+    for report in history:
+        for row in report.get('summary', []):
+            if row.get('fps_mean') is not None:
+                previous[(row['engine'], row['demo'])] = row['fps_mean']
+
+    def engine_name(engine):
+        return os.path.join(os.path.basename(os.path.dirname(engine)), os.path.basename(engine))
+
+    rows = [[engine_name(row['engine']), row['demo'], f"{row['runs']}" + (f" ({row['failed']} failed)" if row['failed'] else ''),
+             f"{row['fps_mean']:.1f} +/- {row['fps_stddev']:.1f}" if row['fps_mean'] is not None else '-',
+             f"{row['fps_min']:.1f} - {row['fps_max']:.1f}" if row['fps_mean'] is not None else '-',
+             f"{(row['fps_mean'] / previous[(row['engine'], row['demo'])] - 1) * 100:+.1f}%"
+             if row['fps_mean'] is not None and previous.get((row['engine'], row['demo'])) else 'new']
+            for row in summary]
+    header = ['Engine', 'Demo', 'Runs', 'fps', 'Range', 'Change']
+    widths = [max(len(line[n]) for line in rows + [header]) for n in range(len(header))]
+    return '\n'.join('  '.join(cell.ljust(width) for cell, width in zip(line, widths)).rstrip() for line in [header] + rows)
+
+def launch_files(cmd):
+    """
+    The files a launch command will read at startup: the pak files and progs.dat of id1 and of the -game mod, and
+    the +map bsp file when it is not packed. The command is parsed rather than rebuilt from its parts, a command
+    edited by hand is followed too.
+
+    :param cmd: str() or list of the command-line arguments, see build_command().
+    :return: List of file paths, existing files only.
+    """
+    args = cmd.split(' ') if isinstance(cmd, str) else list(cmd)
+    options = dict()
+    for option, value in zip(args, args[1:]):
+        if option.lower() in ('-basedir', '-game', '+map'):
+            options[option.lower()] = value
+    basedir = options.get('-basedir')
+    if not basedir:
+        return []
+
+    files = []
+    folders = [os.path.join(basedir, 'id1')]
+    if options.get('-game') and options['-game'].lower() != 'id1':
+        folders.append(os.path.join(basedir, options['-game']))
+    for folder in folders:
+        record = index_mod(folder)
+        if not record:
+            continue
+        files += [os.path.join(folder, pak) for pak in record['paks']]
+        if record['progs']:
+            files.append(os.path.join(folder, 'progs.dat'))
+
+    mapname = options.get('+map')
+    if mapname:
+        mapname = mapname.lower().removesuffix('.bsp') + '.bsp'
+        for folder in reversed(folders):  # The mod map overrides the id1 map.
+            source = map_source(folder, mapname)
+            if source:
+                if source[0] not in files:
+                    files.append(source[0])
+                break
+    return [file for file in files if os.path.isfile(file)]
+
+@foo.timed()
+def prewarm(files, cancel=None):
+    """
+    Read files ahead into the page cache on a background thread so the engine starts from memory, not from a cold
+    disk or network share. posix_fadvise(WILLNEED) queues the read-ahead of every file at once where available,
+    then every page of each file is touched through mmap, which waits for the reads without copying the data.
+
+    :param files: List of file paths, see launch_files().
+    :param cancel: threading.Event, stops between files.
+    :return: Dictionary 'files', 'bytes', 'seconds', 'method', 'errors' - list of (file, message).
+    """
+    import mmap
+    start = time.perf_counter()
+    fadvise = hasattr(os, 'posix_fadvise')
+    result = {'files': 0, 'bytes': 0, 'seconds': 0.0, 'method': 'fadvise+mmap' if fadvise else 'mmap', 'errors': []}
+    if fadvise:
+        for file in files:
+            try:
+                fd = os.open(file, os.O_RDONLY)
+                try:
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+                finally:
+                    os.close(fd)
+            except OSError:
+                pass  # Reported by the mmap pass below.
+
+    for file in files:
+        if cancel and cancel.is_set():
+            break
+        try:
+            with open(file, 'rb') as in_file:
+                size = os.fstat(in_file.fileno()).st_size
+                if size:
+                    with mmap.mmap(in_file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        for offset in range(0, size, PREWARMSTRIDE):
+                            mm[offset]  # Page fault, the page is read unless already cached.
+        except (OSError, ValueError) as err:
+            result['errors'].append((file, str(err)))
+            continue
+        result['files'] += 1
+        result['bytes'] += size
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+def get_archives(folder):
+    """
+    List the mod archives of a drop folder, shown as mods next to the base directory folders.
+
+    :param folder: Drop folder, see the archive_dir setting.
+    :return: Sorted list of archive file names, empty if the folder does not exist.
+    """
+    try:
+        with os.scandir(folder) as it:
+            return sorted((e.name for e in it if e.name.lower().endswith(ARCHIVEEXTENSIONS) and e.is_file()), key=str.lower)
+    except (OSError, TypeError):
+        return []
+
+def _archive_root(names):
+    """
+    Folder of the game data inside an archive. Archives hold the mod at the top, in a folder named after the mod or
+    deeper ex. Quake/mymod/pak0.pak. The shallowest folder with a pak file, progs.dat or a maps folder is the root.
+    """
+    roots = set()
+    for name in names:
+        parts = name.lower().split('/')
+        if 'maps' in parts[:-1]:
+            roots.add('/'.join(name.split('/')[:parts.index('maps')]))
+        elif parts[-1] == 'progs.dat' or (parts[-1].startswith('pak') and parts[-1].endswith('.pak')):
+            roots.add('/'.join(name.split('/')[:-1]))
+    return min(roots, key=lambda root: (root.count('/'), len(root)), default='')
+
+@foo.timed()
+def archive_info(path):
+    """
+    Game data of a mod archive. Only the central directory at the end of the zip file is read, the files are not
+    decompressed. Cached by the archive size/mtime.
+
+    :param path: Path & name of the zip or pk3 file.
+    :return: Dictionary 'root' - folder of the game data in the archive, 'files' - number of files, 'bytes' -
+             uncompressed size, 'paks', 'progs', 'maps' - loose bsp files, 'readme'. None if not a valid archive.
+    """
+    import zipfile
+    stamp = _file_stamp(path)
+    if stamp is None:
+        return None
+    with _archive_lock:
+        cached = _archive_cache.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    try:
+        with zipfile.ZipFile(path) as archive:
+            entries = [info for info in archive.infolist() if not info.is_dir()]
+    except (OSError, zipfile.BadZipFile, ValueError):
+        entries = None
+    info = None
+    if entries is not None:
+        root = _archive_root([entry.filename for entry in entries])
+        prefix = root + '/' if root else ''
+        names = [entry.filename[len(prefix):] for entry in entries if entry.filename.startswith(prefix)]
+        info = {
+            'root': root,
+            'files': len(entries),
+            'bytes': sum(entry.file_size for entry in entries),
+            'paks': sorted((n for n in names if '/' not in n and n.lower().endswith('.pak')), key=str.lower),
+            'progs': any(n.lower() == 'progs.dat' for n in names),
+            'maps': sorted(n[5:] for n in names if n.lower().startswith('maps/') and n.lower().endswith('.bsp') and n.count('/') == 1),
+            'readme': sorted(os.path.basename(entry.filename) for entry in entries if entry.filename.lower().endswith('.txt')),
+        }
+    with _archive_lock:
+        _archive_cache[path] = (stamp, info)
+    return info
+
+def archive_folder(archive):
+    """
+    :param archive: Archive file name or path ex. mymod.zip
+    :return: Folder name in the base directory ex. _qr_mymod
+    """
+    return ARCHIVEPREFIX + os.path.splitext(os.path.basename(archive))[0].replace(' ', '_')
+
+@foo.timed()
+def extract_archive(path, basedir, cache_size=ARCHIVECACHESIZE, keep=(), cancel=None):
+    """
+    Extract a mod archive into its folder of the base directory, see archive_folder(), the first time it is launched
+    or after the archive changed. The game data root becomes the mod folder, the text files elsewhere in the archive
+    go next to it. The folder marker is written first, an interrupted extraction is never listed as a mod and is
+    redone at the next launch. Other extracted archives are then evicted down to cache_size, see evict_archives().
+
+    :param path: Path & name of the zip or pk3 file.
+    :param basedir: Base directory.
+    :param cache_size: MB of extracted archives kept in the base directory.
+    :param keep: Folder names never evicted besides this archive, ex. those of the running engines.
+    :param cancel: threading.Event, stops between files.
+    :return: Dictionary 'folder' - folder name for -game, 'extracted' - BOOL False if already extracted, 'bytes',
+             'seconds', 'evicted' - list of the removed folders.
+    """
+    import shutil
+    import zipfile
+    start = time.perf_counter()
+    info = archive_info(path)
+    if info is None:
+        raise ValueError(f"Not a valid archive: {path}")
+    name = archive_folder(path)
+    folder = os.path.join(basedir, name)
+    marker = os.path.join(folder, ARCHIVEMARKER)
+    source = {'archive': os.path.abspath(path), 'stamp': _file_stamp(path), 'bytes': info['bytes']}
+
+    current = foo.readConfig(marker) if os.path.isfile(marker) else None
+    extracted = current != source
+    if extracted:
+        shutil.rmtree(folder, ignore_errors=True)
+        os.makedirs(folder)
+        foo.writeConfig(marker, {**source, 'stamp': None})  # Incomplete until the stamp is written.
+        prefix = info['root'] + '/' if info['root'] else ''
+        target = os.path.realpath(folder)
+        with zipfile.ZipFile(path) as archive:
+            for entry in archive.infolist():
+                if cancel is not None and cancel.is_set():
+                    raise InterruptedError("Extraction cancelled.")
+                if entry.is_dir():
+                    continue
+                if entry.filename.startswith(prefix):
+                    relative = entry.filename[len(prefix):]
+                elif entry.filename.lower().endswith('.txt'):
+                    relative = os.path.basename(entry.filename)
+                else:
+                    continue
+                out_path = os.path.realpath(os.path.join(target, relative))
+                if not out_path.startswith(target + os.sep):  # Absolute or ../ names.
+                    continue
+                os.makedirs(os.path.dirname(out_path), exist_ok=True)
+                with archive.open(entry) as in_file, open(out_path, 'wb') as out_file:
+                    shutil.copyfileobj(in_file, out_file, 1024 * 1024)
+        foo.writeConfig(marker, source)
+    os.utime(marker)  # Last launch, see evict_archives().
+    evicted = evict_archives(basedir, cache_size * 1024 * 1024, keep={name, *keep})
+    return {'folder': name, 'extracted': extracted, 'bytes': info['bytes'], 'seconds': time.perf_counter() - start,
+            'evicted': evicted}
+
+def evict_archives(basedir, limit, keep=None):
+    """
+    Remove the least recently launched extracted archives until they use less than limit bytes. The keep folders are
+    never removed.
+
+    :param basedir: Base directory.
+    :param limit: Bytes.
+    :param keep: Set of folder names.
+    :return: List of the removed folder names.
+    """
+    import shutil
+    folders = []
+    try:
+        with os.scandir(basedir) as it:
+            for entry in it:
+                marker = os.path.join(entry.path, ARCHIVEMARKER)
+                if entry.name.startswith(ARCHIVEPREFIX) and entry.is_dir() and os.path.isfile(marker):
+                    source = foo.readConfig(marker)
+                    size = source.get('bytes', 0) if isinstance(source, dict) else 0
+                    folders.append((os.stat(marker).st_mtime_ns, size, entry.name))
+    except OSError:
+        return []
+    total = sum(f[1] for f in folders)
+    evicted = []
+    for _, size, name in sorted(folders):
+        if total <= limit:
+            break
+        if keep and name in keep:
+            continue
+        shutil.rmtree(os.path.join(basedir, name), ignore_errors=True)
+        total -= size
+        evicted.append(name)
+    return evicted
+
+def load_hashes(file=None):
+    """
+    Load the content digest cache. A missing, unreadable or outdated file starts an empty cache.
+
+    :param file: Path and file of the cache, defaults to HASHFILE.
+    :return: Dictionary of path -> [size, mtime_ns, partial digest, full digest or None].
+    """
+    global _hashes
+    cache = foo.readConfig(file or HASHFILE)
+    if isinstance(cache, Exception) or cache.get('version') != HASHVERSION:
+        cache = {'version': HASHVERSION, 'files': {}}
+    with _hash_lock:
+        _hashes = cache['files']
+    return _hashes
+
+@foo.timed()
+def save_hashes(file=None):
+    """
+    Write the content digest cache to disk.
+
+    :param file: Path and file of the cache, defaults to HASHFILE.
+    :return: Exception or True if no issues.
+    """
+    with _hash_lock:
+        if _hashes is None:
+            return True
+        return foo.writeConfig(file=file or HASHFILE, settings={'version': HASHVERSION, 'files': _hashes})
+
+def content_files(basedir, records):
+    """
+    The game files of the mod folders that are worth comparing: pak files, progs.dat, loose bsp & dem files.
+    Extracted archives are skipped, evict_archives() removes them on its own and the archive is their real copy.
+
+    :param basedir: Base directory.
+    :param records: Dictionary of folder name -> record, see update_index().
+    :return: List of tuple(folder name, path).
+    """
+    files = []
+    for name, record in records.items():
+        if record['archive']:
+            continue
+        folder = os.path.join(basedir, name)
+        files += [(name, os.path.join(folder, pak)) for pak in record['paks']]
+        if record['progs']:
+            files.append((name, os.path.join(folder, 'progs.dat')))
+        files += [(name, os.path.join(folder, 'maps', bsp)) for bsp in record['maps']]
+        files += [(name, os.path.join(folder, dem)) for dem in record['demos']]
+    return files
+
+def _digest(path, size, full):
+    """
+    blake2b of a file, the first & last HASHPARTIAL bytes unless full. A small file is always hashed whole.
+    """
+    import hashlib
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as in_file:
+        if full or size <= 2 * HASHPARTIAL:
+            for chunk in iter(lambda: in_file.read(1024 * 1024), b''):
+                digest.update(chunk)
+        else:
+            digest.update(in_file.read(HASHPARTIAL))
+            in_file.seek(size - HASHPARTIAL)
+            digest.update(in_file.read(HASHPARTIAL))
+    return digest.hexdigest()
+
+@foo.timed()
+def find_duplicates(basedir, jobs=HASHJOBS, cancel=None):
+    """
+    Find the identical game files across the mod folders of a base directory. Only files of the same size are
+    hashed, first the start & the end of the file, then the whole file for the partial matches. Files are hashed
+    jobs at a time, the digests are cached by path/size/mtime so a rescan only hashes new or changed files. Hard
+    links of one file are counted once.
+
+    :param basedir: Base directory.
+    :param jobs: Files hashed at once.
+    :param cancel: threading.Event, stops between files. The digests read so far are kept in memory only, the cache
+                   file is not written.
+    :return: None if cancelled, the groups would be incomplete. Otherwise a dictionary 'basedir', 'files' - files
+             compared, 'hashed' - files read this run, 'hashed_bytes', 'seconds',
+             'groups' - list of 'size', 'digest', 'keep' - path of the copy kept (id1 first), 'copies' - other paths,
+             'reclaimable' - folder name -> bytes of its copies, 'total' - reclaimable bytes.
+    """
+    import concurrent.futures
+    start = time.perf_counter()
+    basedir = os.path.abspath(basedir)  # Cache keys are absolute paths.
+    if _hashes is None:
+        load_hashes()
+    files = dict()  # path -> (folder name, size, mtime_ns)
+    inodes = set()
+    for name, path in content_files(basedir, update_index(basedir, cancel=cancel)):
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        if st.st_size and (st.st_dev, st.st_ino) not in inodes:
+            inodes.add((st.st_dev, st.st_ino))
+            files[path] = (name, st.st_size, st.st_mtime_ns)
+
+    sizes = dict()
+    for path, (_, size, _) in files.items():
+        sizes.setdefault(size, []).append(path)
+    stats = {'hashed': 0, 'hashed_bytes': 0}
+
+    def digests(paths, full):
+        """
+        Digest of each path, cached ones first then the others hashed in parallel.
+        """
+        result = dict()
+        todo = []
+        with _hash_lock:
+            for path in paths:
+                _, size, mtime = files[path]
+                entry = _hashes.get(path)
+                if entry and entry[:2] == [size, mtime] and (entry[3] if full else entry[2]):
+                    result[path] = entry[3] if full else entry[2]
+                else:
+                    todo.append(path)
+
+        def run(path):
+            if cancel is not None and cancel.is_set():
+                return path, None
+            try:
+                return path, _digest(path, files[path][1], full)
+            except OSError:
+                return path, None
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            for path, digest in pool.map(run, todo):
+                if digest is None:
+                    continue
+                _, size, mtime = files[path]
+                small = size <= 2 * HASHPARTIAL  # The partial hash already covers the whole file.
+                stats['hashed'] += 1
+                stats['hashed_bytes'] += size if full or small else 2 * HASHPARTIAL
+                with _hash_lock:
+                    entry = _hashes.get(path)
+                    if not entry or entry[:2] != [size, mtime]:
+                        entry = _hashes[path] = [size, mtime, None, None]
+                    entry[3 if full else 2] = digest
+                    if small:
+                        entry[2] = entry[3] = digest
+                result[path] = digest
+        return result
+
+    partial = digests([path for paths in sizes.values() if len(paths) > 1 for path in paths], full=False)
+    if cancel is not None and cancel.is_set():
+        return None
+    candidates = dict()
+    for path, digest in partial.items():
+        candidates.setdefault((files[path][1], digest), []).append(path)
+    full = digests([path for paths in candidates.values() if len(paths) > 1 for path in paths], full=True)
+    if cancel is not None and cancel.is_set():
+        return None
+    matches = dict()
+    for path, digest in full.items():
+        matches.setdefault((files[path][1], digest), []).append(path)
+
+    groups = []
+    reclaimable = dict()
+    for (size, digest), paths in matches.items():
+        if len(paths) < 2:
+            continue
+        paths.sort(key=lambda path: (files[path][0].lower() != 'id1', path.lower()))
+        groups.append({'size': size, 'digest': digest, 'keep': paths[0], 'copies': paths[1:]})
+        for path in paths[1:]:
+            reclaimable[files[path][0]] = reclaimable.get(files[path][0], 0) + size
+    groups.sort(key=lambda group: group['size'] * len(group['copies']), reverse=True)
+
+    prefix = os.path.join(basedir, '')
+    with _hash_lock:  # Forget the files of this base directory that are gone.
+        gone = [path for path in _hashes if path.startswith(prefix) and path not in files]
+        for path in gone:
+            del _hashes[path]
+    if stats['hashed'] or gone:
+        save_hashes()
+    return {'basedir': basedir, 'files': len(files), **stats, 'seconds': time.perf_counter() - start,
+            'groups': groups, 'reclaimable': dict(sorted(reclaimable.items(), key=lambda item: -item[1])),
+            'total': sum(reclaimable.values())}
+
+def duplicate_table(result, limit=20):
+    """
+    Text table of a find_duplicates() result, the reclaimable bytes per mod and the largest duplicate groups.
+
+    :param result: See find_duplicates().
+    :param limit: Groups listed.
+    :return: str()
+    """
+    lines = [f"{len(result['groups'])} duplicate groups in {result['files']} files, "
+             f"{result['total'] / 2**20:.1f} MB reclaimable ({result['hashed']} files hashed in {result['seconds']:.1f}s)."]
+    if result['reclaimable']:
+        width = max(len(name) for name in result['reclaimable'])
+        lines += [''] + [f"{name.ljust(width)}  {size / 2**20:10.1f} MB" for name, size in result['reclaimable'].items()]
+    basedir = result['basedir']
+    for group in result['groups'][:limit]:
+        lines += ['', f"{group['size'] / 2**20:.1f} MB x {len(group['copies']) + 1}  keep {os.path.relpath(group['keep'], basedir)}"]
+        lines += [f"    {os.path.relpath(path, basedir)}" for path in group['copies']]
+    return '\n'.join(lines)
+
+@foo.timed()
+def pak_digest(path, cancel=None):
+    """
+    md5 of a pak file, read PAKDIGESTCHUNK bytes at a time so a large remastered pak0 never sits in memory. The
+    digest is cached in PAKDIGESTFILE by size/mtime, the file is only read again after it changed.
+
+    :param path: Path & name of the pak file.
+    :param cancel: threading.Event, stops between chunks with InterruptedError.
+    :return: Hex digest, None if the file is missing. OSError is raised if the file cannot be read.
+    """
+    import hashlib
+    global _pak_digests
+    stamp = _file_stamp(path)
+    if stamp is None:
+        return None
+    with _pak_digest_lock:
+        if _pak_digests is None:
+            cache = foo.readConfig(PAKDIGESTFILE)
+            valid = isinstance(cache, dict) and cache.get('version') == PAKDIGESTVERSION
+            _pak_digests = cache['digests'] if valid else dict()
+        cached = _pak_digests.get(path)
+    if cached and cached[:2] == stamp:
+        return cached[2]
+
+    digest = hashlib.md5(usedforsecurity=False)
+    buffer = bytearray(PAKDIGESTCHUNK)
+    view = memoryview(buffer)
+    with open(path, 'rb', buffering=0) as in_file:
+        while length := in_file.readinto(buffer):
+            if cancel is not None and cancel.is_set():
+                raise InterruptedError("Verification cancelled.")
+            digest.update(view[:length])
+    with _pak_digest_lock:
+        _pak_digests[path] = stamp + [digest.hexdigest()]
+        foo.writeConfig(PAKDIGESTFILE, {'version': PAKDIGESTVERSION, 'digests': _pak_digests})
+    return digest.hexdigest()
+
+@foo.timed()
+def verify_id1(basedir, known=None, cancel=None):
+    """
+    Verify the pak files of id1 beyond their names, see id1_check(). A pak without a valid directory is truncated or
+    not a pak, a pak of a known size with another digest is damaged or modified. The install is labelled from the
+    digests and, for releases without a known digest, from the maps in pak0.
+
+    :param basedir: Base directory with the id1 folder.
+    :param known: Dictionary of md5 -> (pak file, size, release) added to KNOWNPAKS.
+    :param cancel: threading.Event, stops the hashing.
+    :return: Dictionary 'label' - registered, shareware, remastered, modified, damaged, unreadable or missing,
+             'message', 'paks' - pak file -> 'size', 'md5', 'status' (known, unknown, modified, damaged or
+             unreadable), 'release', 'error' - read error of an unreadable pak.
+    """
+    known = {**KNOWNPAKS, **{ky: tuple(val) for ky, val in (known or dict()).items()}}
+    sizes = {(name, size) for name, size, _ in known.values()}
+    folder = os.path.join(basedir, 'id1')
+    record = index_mod(folder)
+    paks = {pak.lower(): pak for pak in record['paks']} if record else dict()
+
+    result = dict()
+    for name in 'pak0.pak', 'pak1.pak':
+        if name not in paks:
+            continue
+        path = os.path.join(folder, paks[name])
+        stamp = _file_stamp(path)
+        if stamp is None:
+            continue
+        entry = {'size': stamp[0], 'md5': None, 'status': 'unknown', 'release': None, 'error': None}
+        result[name] = entry
+        try:  # Hashed first, read_pak() can't tell an unreadable file from one that is not a pak.
+            entry['md5'] = pak_digest(path, cancel)
+        except InterruptedError:  # Cancelled, a subclass of OSError.
+            raise
+        except OSError as err:  # Permissions or a failing disk.
+            entry['status'], entry['error'] = 'unreadable', err.strerror or str(err)
+            continue
+        if entry['md5'] is None:  # Removed while reading.
+            entry['status'] = 'unreadable'
+            continue
+        if not read_pak(path):  # No header or the directory at the end of the file is cut off.
+            entry['status'] = 'damaged'
+            continue
+        if entry['md5'] in known:
+            entry['status'], entry['release'] = 'known', known[entry['md5']][2]
+        elif (name, stamp[0]) in sizes:
+            entry['status'] = 'modified'
+        else:
+            entry['status'] = 'unknown'
+
+    statuses = {entry['status'] for entry in result.values()}
+    releases = sorted({release.split(' pak')[0] for _, _, release in known.values()})
+    unknown = f"digest not in the known releases ({', '.join(releases)}, more can be added as known_paks)"
+    pak0 = result.get('pak0.pak')
+    if not pak0:
+        label, message = 'missing', "id1/pak0.pak not found."
+    elif 'unreadable' in statuses:
+        label = 'unreadable'
+        unreadable = [f"{n} ({e['error'] or 'removed'})" for n, e in result.items() if e['status'] == 'unreadable']
+        message = f"Unreadable pak file: {', '.join(unreadable)}, check the permissions and the disk."
+    elif 'damaged' in statuses:
+        label = 'damaged'
+        message = f"Damaged pak file: {', '.join(n for n, e in result.items() if e['status'] == 'damaged')}, download it again."
+    elif 'modified' in statuses:
+        label = 'modified'
+        message = f"Modified pak file: {', '.join(n for n, e in result.items() if e['status'] == 'modified')}, the size matches a release but not the content, {unknown}."
+    elif 'pak1.pak' in result:
+        label = 'registered'
+        message = "Registered Quake, pak0 & pak1." if statuses == {'known'} else f"Registered Quake, {unknown}."
+    elif {'e2m1.bsp', 'e4m1.bsp'} <= set(m.lower() for m in get_pak_maps(folder, [paks['pak0.pak']])):
+        label = 'remastered'
+        message = "Remastered Quake, every episode in pak0." if statuses == {'known'} else f"Remastered Quake (every episode in pak0), {unknown}."
+    else:
+        label = 'shareware'
+        message = "Shareware Quake, episode 1 only." if statuses == {'known'} else f"Shareware Quake, {unknown}."
+    return {'label': label, 'message': message, 'paks': result}
+
+def progs_source(path, record=None):
+    """
+    Locate the progs.dat of a mod folder. A loose progs.dat takes precedence over the pak files, a higher numbered
+    pak file takes precedence over a lower one, as in the engine.
+
+    :param path: Mod folder path ex. /Quake/pakmod
+    :param record: Folder record, see scan_mod(). If None the record is taken from the index.
+    :return: tuple(file, offset, length) or None if the folder has no progs.dat.
+    """
+    if record is None:
+        record = index_mod(path)
+    if not record:
+        return None
+    if record['progs']:
+        file = os.path.join(path, 'progs.dat')
+        stamp = _file_stamp(file)
+        return (file, 0, stamp[0]) if stamp else None
+    for pak in sorted(record['paks'], key=str.lower, reverse=True):
+        file = os.path.join(path, pak)
+        for entry, (offset, length) in read_pak(file).items():
+            if entry.lower() == 'progs.dat':
+                return file, offset, length
+    return None
+
+def _progs_string(mm, view, start, end, ofs):
+    """
+    NUL terminated string at ofs of the progs.dat string table between start & end of the mapped file, decoded
+    straight from the memoryview.
+    """
+    if not 0 <= ofs < end - start:
+        return ''
+    stop = mm.find(b'\0', start + ofs, end)
+    with view[start + ofs:stop if stop >= 0 else end] as name:
+        return str(name, 'latin-1')
+
+@foo.timed()
+def read_progs(file, offset=0, length=None):
+    """
+    Read the header, the function, field & global definition tables of a progs.dat. The file is memory mapped and
+    the tables are unpacked from memoryview slices, only the names are copied out of the string table. Results are
+    cached by the file size/mtime, see save_progs_info(). A cache file of another PROGSINFOVERSION is discarded.
+
+    :param file: Path & name of a progs.dat or a pak file.
+    :param offset: Offset of the progs.dat in the file, see progs_source().
+    :param length: Length of the progs.dat, None for the rest of the file.
+    :return: Dictionary 'version', 'crc', 'functions', 'globals' - number of definitions, 'fields' - sorted entity
+             field names, 'classnames' - sorted names of the QuakeC functions without parameters, the functions the
+             engine can call to spawn an entity of that classname. None if the file is not a valid progs.dat.
+             The progs.dat has no list of spawn functions, the engine calls the function named after the classname
+             of an entity. Think & touch functions take no parameters either, so the list is a superset: a classname
+             missing from it can't be spawned, one in it is only likely to be.
+    """
+    import mmap
+    global _progs_info, _progs_changed
+    stamp = _file_stamp(file)
+    if stamp is None:
+        return None
+    key = f"{file}|{offset}"
+    with _progs_lock:
+        if _progs_info is None:
+            cache = foo.readConfig(PROGSINFOFILE)
+            valid = isinstance(cache, dict) and cache.get('version') == PROGSINFOVERSION
+            _progs_info = cache['files'] if valid else dict()
+        cached = _progs_info.get(key)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    info = None
+    if length is None:
+        length = stamp[0] - offset
+    if PROGSHEADER.size <= length and offset + length <= stamp[0]:
+        try:
+            with foo.timeBlock('read_progs.mmap'), open(file, 'rb') as in_file, mmap.mmap(in_file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                info = _parse_progs(mm, offset, length)
+        except (OSError, ValueError, struct.error):
+            info = None
+
+    with _progs_lock:
+        _progs_info[key] = [stamp, info]
+        _progs_changed = True
+    return info
+
+def _parse_progs(mm, offset, length):
+    with memoryview(mm) as view, view[offset:offset + length] as progs:
+        (version, crc, _, _, ofs_globals, num_globals, ofs_fields, num_fields, ofs_functions, num_functions,
+         ofs_strings, num_strings, _, _, _) = PROGSHEADER.unpack_from(progs, 0)
+        tables = ((ofs_globals, num_globals * PROGSDEF.size), (ofs_fields, num_fields * PROGSDEF.size),
+                  (ofs_functions, num_functions * PROGSFUNCTION.size), (ofs_strings, num_strings))
+        if version not in PROGSVERSIONS or any(ofs < 0 or size < 0 or ofs + size > length for ofs, size in tables):
+            return None
+        start, end = offset + ofs_strings, offset + ofs_strings + num_strings
+
+        classnames = set()
+        with progs[ofs_functions:ofs_functions + num_functions * PROGSFUNCTION.size] as functions:
+            for first_statement, _, _, _, s_name, _, num_parms, *_ in PROGSFUNCTION.iter_unpack(functions):
+                if first_statement > 0 and num_parms == 0:  # QuakeC, not a builtin.
+                    classnames.add(_progs_string(mm, view, start, end, s_name))
+        with progs[ofs_fields:ofs_fields + num_fields * PROGSDEF.size] as fields:
+            field_names = {_progs_string(mm, view, start, end, s_name) for _, _, s_name in PROGSDEF.iter_unpack(fields)}
+    classnames.discard('')
+    field_names.discard('')
+    return {'version': version, 'crc': crc, 'functions': num_functions, 'globals': num_globals,
+            'fields': sorted(field_names), 'classnames': sorted(classnames)}
+
+def mod_classnames(path, basedir=None):
+    """
+    Classnames a mod can spawn, the parameterless QuakeC functions of its progs.dat, see read_progs(). A mod
+    without a progs.dat runs the id1 progs.dat, as in the engine.
+
+    :param path: Mod folder path ex. /Quake/pakmod
+    :param basedir: Base directory of id1, defaults to the parent folder of path.
+    :return: Set of classnames. None if no progs.dat is found or it is not valid, the classnames are unknown.
+    """
+    source = progs_source(path)
+    if source is None:
+        source = progs_source(os.path.join(basedir or os.path.dirname(os.path.abspath(path)), 'id1'))
+    info = read_progs(*source) if source else None
+    return set(info['classnames']) if info else None
+
+@foo.timed()
+def save_progs_info(file=None):
+    """
+    Write the progs.dat cache to disk, only if read_progs() parsed a progs.dat since the last save.
+
+    :param file: Path and file of the cache, defaults to PROGSINFOFILE.
+    :return: Exception or True if no issues.
+    """
+    global _progs_changed
+    with _progs_lock:
+        if _progs_info is None or not _progs_changed:
+            return True
+        settings = {'version': PROGSINFOVERSION, 'files': _progs_info}
+        saved = foo.writeConfig(file=file or PROGSINFOFILE, settings=settings)
+        _progs_changed = saved is not True
+        return saved
+
+@foo.timed()
+def map_requirements(path, mapname, basedir=None, mods=None, cancel=None):
+    """
+    Compare the entity classnames of a map with the classnames its mod can spawn, ex. a standalone map in id1/maps
+    using monster_gug needs a mod with that monster. Every mod of the base directory with its own progs.dat is
+    checked for the missing classnames, the progs.dat files are only parsed once, see read_progs().
+
+    :param path: Mod folder of the map ex. /Quake/id1
+    :param mapname: bsp file ex. e1m1.bsp
+    :param basedir: Base directory, defaults to the parent folder of path.
+    :param mods: List of mod folder names to check, None for every folder of the base directory.
+    :param cancel: threading.Event, stops checking the mods.
+    :return: Dictionary 'map', 'classnames' - of the map, 'missing' - classnames the mod cannot spawn, None if the
+             mod and id1 have no valid progs.dat, 'mods' - mod folders that can spawn every missing classname.
+             None if the map is not found.
+    """
+    basedir = basedir or os.path.dirname(os.path.abspath(path))
+    info = map_info(path, mapname)
+    if info is None:
+        return None
+    classnames = set(info['classnames']) - COMPILERCLASSES
+    spawnable = mod_classnames(path, basedir)
+    if spawnable is None:
+        save_progs_info()
+        return {'map': mapname, 'classnames': sorted(classnames), 'missing': None, 'mods': []}
+    missing = classnames - spawnable
+    candidates = []
+    if missing:
+        records = update_index(basedir) if mods is None else {name: index_mod(os.path.join(basedir, name)) for name in mods}
+        folder = os.path.basename(os.path.abspath(path))
+        for name, record in sorted(records.items(), key=lambda item: item[0].lower()):
+            if cancel is not None and cancel.is_set():
+                break
+            if not record or name == folder or name.lower() == 'id1':
+                continue
+            source = progs_source(os.path.join(basedir, name), record)
+            progs = read_progs(*source) if source else None
+            if progs and missing <= set(progs['classnames']):
+                candidates.append(name)
+    save_progs_info()
+    return {'map': mapname, 'classnames': sorted(classnames), 'missing': sorted(missing), 'mods': candidates}
+
+
 # Test Code #
 if __name__ == '__main__':
     engine_no_id1 = r'MacOS or Windows/Test/Path/to_engine/without_id1_folder'
@@ -11,14 +11,28 @@ Support Files: foo.py - various non-tkinter related functions.
                tkfoo.py - custom tkinter class of the tk.Text widget with scrollbars, printing to the Text widget and
                           execution of the instructions to launch the Quake game.
                QuakeFoo.py - various Quake Runner specific functions to process game data.
+               QuakeBench.py - synthetic Quake library generator and benchmark of the QuakeFoo scanner.
                rsrc - resource folder.
                |_ qrconfig.json - Quake Runner configuration file with settings for the app.
+               |_ qrindex.json - Library index of the mod folders, see QuakeFoo.update_index().
+               |_ qrmapinfo.json - Map titles & stats cache, see QuakeFoo.bsp_info().
+               |_ qrreadme.json - Readme search index, see QuakeFoo.iter_readme_index().
+               |_ thumbs - Map preview png cache, see QuakeFoo.map_thumbnail().
+               |_ qrsmoke.json - Last map smoke test report, see QuakeFoo.smoke_test().
+               |_ qrtimedemo.json - Timedemo results of the earlier runs, see QuakeFoo.save_timedemo().
+               |_ qrpakdigest.json - md5 of the id1 pak files, see QuakeFoo.verify_id1().
+               |_ qrprogs.json - Spawnable classnames of the progs.dat files, see QuakeFoo.read_progs().
+               |_ qrhashes.json - Content digests of the game files, see QuakeFoo.find_duplicates().
+               |_ sessions - csv cpu & memory samples of the launched engines, see tkFoo.ResourceSampler.
+               |_ imgcache - Resized copies of the images below, see foo.cachedImageTk().
                |_ qrimage1.png - Refresh button image, ouroborus surrounding the Quake symbol.
                |_ qrimage2.png - Quake Runner image, Quake symbol + title + Quake ranger.
                |_ qrimage3.png - Help button image, Quake symbol with red cross.
                |_ quakerunner.icns - Quake Runner MacOS icon.
                |_ quakerunner.ico - Quake Runner Windows icon.
                |_ quakerunner.png - Quake Runner png file for the tkinter window and dialogs.
+Headless: QuakeRunner.py --headless [--game GAME] [--map MAP] [--skill SKILL] [--print | --run]
+          Build the launch command from qrconfig.json without the window, see QuakeFoo.headless().
 
 Purpose: Python script to assist in the creation of command-line arguments to launch id Software's Quake game with
          fan baseds mods, maps and associated Quake engine options.
@@ -26,14 +40,21 @@ Purpose: Python script to assist in the creation of command-line arguments to la
 """
 
 import os
+import sys
+import time
 import platform
 
+STARTTIME = time.perf_counter()  # Start of the imports, see Main.publishStartup().
+
+if __name__ == '__main__' and '--headless' in sys.argv:  # Command-line mode, see QuakeFoo.headless().
+    import QuakeFoo as qf
+    sys.exit(qf.headless(sys.argv[1:]))
+
 import tkinter as tk
 import tkinter.ttk as ttk
 import tkinter.font as tkf
 import tkinter.filedialog as tfd
 import tkinter.messagebox as tmb
-import idlelib.tooltip as it
 
 from tkinter.constants import *
 
@@ -49,11 +70,16 @@ REFRESHBTNPNG = 'rsrc/qrimage1.png'
 QUAKERUNNERIMGPNG = 'rsrc/qrimage2.png'
 QUAKEHELP = 'rsrc/qrimage3.png'
 CONFIGFILE = 'rsrc/qrconfig.json'
+IMGCACHE = 'rsrc/imgcache'  # Resized button & title images, see foo.cachedImageTk().
+SESSIONDIR = 'rsrc/sessions'  # Resource samples of the launched engines, see processRun().
 MODWDGTKYS = 'dflt_dir', 'engine', 'basedir', 'mods_chkbtn', 'mods_rdobtn', 'skill_chkbtn', 'skill_cbobox', 'maps_chkbtn'  # , 'id1mps_rdobtn', 'games_rdobtn'
 COMBOBOXES = 'id1mps_cbobox', 'games_cbobox', 'maps_cbobox', 'readme_cbobox'
+GOLD = '#b88a2e'  # Text color of Quake's high-bit "gold" characters in the readme viewer.
 
 class Main(tk.Tk, tf.ScrollBarText):
     def __init__(self):
+        self.startPhases = [('start', STARTTIME)]  # (phase, end time), see publishStartup().
+        self.startPhase('imports')
         tf.ScrollBarText.__init__(self)
         super().__init__()
         self.title(TITLE)
@@ -68,16 +94,53 @@ class Main(tk.Tk, tf.ScrollBarText):
 
         img = tk.PhotoImage(file=PNG)  # Image icon for the window and dialogs.
         self.iconphoto(True, img)
+        self.startPhase('tk')
 
         self.qr_cfg = foo.readConfig(CONFIGFILE)
         if isinstance(self.qr_cfg, Exception):  # If no config file then use defaults.
             self.qr_cfg = qf.set_config_dflt()
+        else:  # Defaults for settings added since the config file was saved.
+            self.qr_cfg = {**qf.set_config_dflt(), **self.qr_cfg}
+        self.startPhase('config')
 
-        self.refresh_img = foo.pilImageTk(REFRESHBTNPNG, 36)
-        self.help_img = foo.pilImageTk(QUAKEHELP, 36)
-        self.quakerunner_img = foo.pilImageTk(QUAKERUNNERIMGPNG, 256)
+        self.refresh_img = foo.cachedImageTk(REFRESHBTNPNG, 36, IMGCACHE)
+        self.help_img = foo.cachedImageTk(QUAKEHELP, 36, IMGCACHE)
+        self.quakerunner_img = foo.cachedImageTk(QUAKERUNNERIMGPNG, 256, IMGCACHE)
+        self.startPhase('images')
 
         self.init_dir = ''  # Set initial directory to empty string for file/folder dialog boxes.
+        self.scanWorker = None  # Background scan of the base directory, see processGameFolders().
+        self.modWorker = None  # Background scan of the selected mod folder, see processGameMapCboBox().
+        self.scanRecords = dict()
+        self.scanId1 = None
+        self.scanProgress = 0
+        self.mapWorkers = dict()  # Background map info readers per maps combobox, see loadMapCboBox().
+        self.mapLists = dict()  # Maps combobox -> (folder, list of bsp files).
+        self.mapInfo = dict()  # bsp path -> map title & stats, see QuakeFoo.bsp_info().
+        self.watchWorker = None  # Base directory & maps folder watcher, see startWatcher().
+        self.watchPending = set()  # New folders without game data yet, ex. a mod being unzipped.
+        self.watchBoolVar = tk.BooleanVar(value=self.qr_cfg['watch_folders'])
+        self.archiveDir = self.qr_cfg['archive_dir']  # Drop folder of the zip & pk3 mod archives.
+        self.archives = list()  # Archive file names listed after the mod folders, see gameValues().
+        self.archiveWorker = None  # Background archive extraction, see processArchive().
+        self.duplicateWorker = None  # Background content hashing, see processDuplicates().
+        self.verifyWorker = None  # Background id1 pak verification, see processVerify().
+        self.requiresWorker = None  # Background map/mod compatibility check, see processRequirements().
+        self.previewWorker = None  # Background map preview renderer, see processPreview().
+        self.preview_img = tk.PhotoImage(width=qf.THUMBSIZE, height=qf.THUMBSIZE)  # Blank until a map is selected.
+        self.previewWarned = False
+        self.readmeWorker = None  # Background readme search index update, see processReadmeIndex().
+        self.sessions = list()  # tf.SessionTab of every launched engine, see processRun().
+        self.sessionCount = 0
+        self.smokeWorker = None  # Background map smoke test, see processSmokeTest().
+        self.smokeResults = list()
+        self.benchWorker = None  # Background timedemo runs, see benchDialog().
+        self.benchResults = list()
+        self.benchEngines = list(self.qr_cfg['bench_engines'])
+        self.benchRepeat = self.qr_cfg['bench_repeat']
+        self.sampleBoolVar = tk.BooleanVar(value=self.qr_cfg['sample_sessions'])  # Sample cpu & memory of sessions.
+        self.prewarmBoolVar = tk.BooleanVar(value=self.qr_cfg['prewarm'])  # Read the game files ahead of a launch.
+        self.prewarmWorker = None  # Background page cache prewarm, see processRun().
         self.entryStrVar = {ky:tk.StringVar() for ky in ('engine', 'basedir', 'command')}
         self.comboboxStrVar = {ky: tk.StringVar(value='SELECT') for ky in COMBOBOXES}
 
@@ -98,17 +161,55 @@ class Main(tk.Tk, tf.ScrollBarText):
         self.inputWidgets(rootFrame)
         self.cboboxDict = self.modWidgets(rootFrame)  # keys = 'id1_maps', 'skill_cbobox', 'games', 'map_chkbtn', 'maps'
         self.commandWidgets(rootFrame)
-        self.scbText(rootFrame, " Log ")
+        self.sessionTabs = ttk.Notebook(rootFrame)  # Log tab followed by a tab per launched engine.
+        self.sessionTabs.pack(expand=True, fill=BOTH)
+        logTab = tk.Frame(self.sessionTabs)
+        self.sessionTabs.add(logTab, text=" Log ")
+        self.scbText(logTab, " Log ", maxlines=self.qr_cfg['log_lines'])
         self.buttonWidgets(rootFrame)
-
-        self.init_config()
+        self.startPhase('widgets')
 
         self.update_idletasks()
         w = self.winfo_width()
         h = self.winfo_height()
         self.minsize(width=w, height=h)
+        self.bind('<Map>', self.processMap)  # Scan the library once the window is on screen.
+        self.protocol('WM_DELETE_WINDOW', lambda: self.processUI('quit'))  # Window close reaps the sessions too.
         self.mainloop()
 
+    def startPhase(self, phase):
+        self.startPhases.append((phase, time.perf_counter()))
+
+    def processMap(self, event):
+        if event.widget is self:  # The root bindings also receive the events of the child widgets.
+            self.unbind('<Map>')
+            self.after(0, self.startConfig)
+
+    def startConfig(self):
+        """
+        Apply the configuration after the first paint, the base directory scan runs on a worker thread.
+
+        :return: None
+        """
+        self.update_idletasks()
+        self.startPhase('paint')
+        self.init_config()
+        self.startPhase('init_config')
+        self.publishStartup()
+
+    def publishStartup(self):
+        """
+        Publish the time of each startup phase, from the first import to the end of init_config().
+
+        :return: None
+        """
+        phases = list()
+        for (_, start), (phase, end) in zip(self.startPhases, self.startPhases[1:]):
+            foo.recordTime(f"startup.{phase}", end - start)
+            phases.append(f"{phase} {(end - start) * 1000:.0f} ms")
+        total = (self.startPhases[-1][1] - self.startPhases[0][1]) * 1000
+        self.publish(f"Startup: {', '.join(phases)}, total {total:.0f} ms.")
+
     def init_config(self):
         # Set or get initial directory for file/folder dialogs. #
         if self.qr_cfg['dflt_dir']:
@@ -140,11 +241,25 @@ class Main(tk.Tk, tf.ScrollBarText):
         settings = tk.Menu(root, tearoff=False)
         settings.add_command(label="Save Settings", command=self.saveSettings)
         settings.add_command(label="Default Directory", command=lambda: self.processUI('ask_dfltdir'))
+        settings.add_command(label="Archive Drop Folder", command=lambda: self.processUI('ask_archivedir'))
+        settings.add_command(label="Rebuild Library Index", command=lambda: self.processUI('rebuild'))
+        settings.add_checkbutton(label="Sample Session Resources", variable=self.sampleBoolVar,
+                                 state=NORMAL if tf.ResourceSampler.available() else DISABLED)
+        settings.add_checkbutton(label="Prewarm Files Before Launch", variable=self.prewarmBoolVar)
+        settings.add_checkbutton(label="Watch Folders For Changes", variable=self.watchBoolVar, command=self.startWatcher)
 
         ui_help = tk.Menu(root, tearoff=False)
+        ui_help.add_command(label="Search Readmes", command=self.searchDialog)
+        ui_help.add_command(label="Diagnostics", command=self.diagnosticsDialog)
         ui_help.add_command(label="About", command=lambda: tmb.showinfo(self, message="Quake Runner\nVersion 1.0"))
 
+        tools = tk.Menu(root, tearoff=False)
+        tools.add_command(label="Smoke Test Maps", command=self.processSmokeTest)
+        tools.add_command(label="Timedemo Benchmark", command=self.benchDialog)
+        tools.add_command(label="Find Duplicate Files", command=self.processDuplicates)
+
         root.add_cascade(label="Settings", menu=settings)
+        root.add_cascade(label="Tools", menu=tools)
         root.add_cascade(label="Help", menu=ui_help)
 
         self.config(menu=root)
@@ -168,20 +283,20 @@ class Main(tk.Tk, tf.ScrollBarText):
         engineLabel.grid(row=r, column=0, sticky=E)
         engineEntry = tk.Entry(frame, textvariable=self.entryStrVar['engine'])
         engineEntry.grid(row=r, column=1, sticky=EW, padx=5)
-        it.Hovertip(engineEntry, text="Path+File to Quake Engine")
+        tf.Hovertip(engineEntry, text="Path+File to Quake Engine")
         fileButton = tk.Button(frame, width=w, text="...", command=lambda: self.processUI('ask_file'))
         fileButton.grid(row=r, column=2, sticky=W)
-        it.Hovertip(fileButton, text="File Selection Dialog")
+        tf.Hovertip(fileButton, text="File Selection Dialog")
 
         r = 1  # Row.
         basedirLabel = tk.Label(frame, text="Base Directory:")
         basedirLabel.grid(row=r, column=0, sticky=E)
         basedirEntry = tk.Entry(frame, textvariable=self.entryStrVar['basedir'])
         basedirEntry.grid(row=r, column=1, sticky=EW, padx=5)
-        it.Hovertip(basedirEntry, text="Path to id1 sub-folder & mods")
+        tf.Hovertip(basedirEntry, text="Path to id1 sub-folder & mods")
         folderButton = tk.Button(frame, width=w, text="...", command=lambda: self.processUI('ask_folder'))
         folderButton.grid(row=r, column=2, sticky=W, pady=5)
-        it.Hovertip(folderButton, text="Folder Selection Dialog")
+        tf.Hovertip(folderButton, text="Folder Selection Dialog")
 
     def modWidgets(self, root):
         """
@@ -209,53 +324,58 @@ class Main(tk.Tk, tf.ScrollBarText):
 
         modChkBtn = tk.Checkbutton(modFrame, text="Use Mods", variable=self.modChkBtnBoolVar, command=self.processModChkBtn)
         modChkBtn.grid(row=0, column=0, sticky=E)
-        it.Hovertip(modChkBtn, text="Enable/Disable Mod Options")
+        tf.Hovertip(modChkBtn, text="Enable/Disable Mod Options")
 
         cboboxDict['id1mps_rdobtn'] = tk.Radiobutton(modFrame, text="id1 Maps", value="id1_maps", variable=self.radiobtnStrVar, command=self.processRadioBtns)
         cboboxDict['id1mps_rdobtn'].grid(row=1, column=0, sticky=E)
-        it.Hovertip(cboboxDict['id1mps_rdobtn'], text="Enable id1 maps Selections")
-        cboboxDict['id1mps_cbobox'] = ttk.Combobox(modFrame, textvariable=self.comboboxStrVar['id1mps_cbobox'])
+        tf.Hovertip(cboboxDict['id1mps_rdobtn'], text="Enable id1 maps Selections")
+        cboboxDict['id1mps_cbobox'] = tf.FilterCombobox(modFrame, key=self.mapName, textvariable=self.comboboxStrVar['id1mps_cbobox'])
         cboboxDict['id1mps_cbobox'].grid(row=1, column=1, sticky=EW, pady=5, padx=5)
-        cboboxDict['id1mps_cbobox'].bind('<<ComboboxSelected>>', self.buildCommand)
-        it.Hovertip(cboboxDict['id1mps_cbobox'], text="id1 maps Dropdown List")
+        cboboxDict['id1mps_cbobox'].bind('<<ComboboxSelected>>', lambda event: self.processMapCboBox('id1mps_cbobox'))
+        tf.Hovertip(cboboxDict['id1mps_cbobox'], text="id1 maps Dropdown List, type to filter")
 
         skillCheckbtn = tk.Checkbutton(modFrame, text="Skill", variable=self.skillChkBtnBoolVar, command=self.processSkillChkBtn)
         skillCheckbtn.grid(row=2, column=0, sticky=E)
-        it.Hovertip(skillCheckbtn, text="Enable/Disable Skill Selection")
+        tf.Hovertip(skillCheckbtn, text="Enable/Disable Skill Selection")
         cboboxDict['skill_cbobox'] = ttk.Combobox(modFrame, values=skill, textvariable=self.skillCbBoxStrVar)
         cboboxDict['skill_cbobox'].grid(row=2, column=1, sticky=EW, pady=5, padx=5)
         cboboxDict['skill_cbobox'].bind('<<ComboboxSelected>>', self.buildCommand)
 
         cboboxDict['games_rdobtn'] = tk.Radiobutton(modFrame, text="Game Mods", value='games', variable=self.radiobtnStrVar, command=self.processRadioBtns)
         cboboxDict['games_rdobtn'].grid(row=1, column=2, sticky=E)
-        it.Hovertip(cboboxDict['games_rdobtn'], text="Enable mod Selections")
-        cboboxDict['games_cbobox'] = ttk.Combobox(modFrame, textvariable=self.comboboxStrVar['games_cbobox'])
+        tf.Hovertip(cboboxDict['games_rdobtn'], text="Enable mod Selections")
+        cboboxDict['games_cbobox'] = tf.FilterCombobox(modFrame, textvariable=self.comboboxStrVar['games_cbobox'])
         cboboxDict['games_cbobox'].grid(row=1, column=3, sticky=EW, pady=5, padx=5)
         cboboxDict['games_cbobox'].bind('<<ComboboxSelected>>', self.processGameMapCboBox)
-        it.Hovertip(cboboxDict['games_cbobox'], text="mod Dropdown List")
+        tf.Hovertip(cboboxDict['games_cbobox'], text="mod Dropdown List, type to filter")
 
         cboboxDict['maps_chkbtn'] = tk.Checkbutton(modFrame, text="Game Maps", variable=self.mapChkBtnBoolVar, command=self.processMapChkBtn)
         cboboxDict['maps_chkbtn'].grid(row=2, column=2, sticky=E)
-        it.Hovertip(cboboxDict['maps_chkbtn'], text="Enable/Disable mod maps Selections")
-        cboboxDict['maps_cbobox'] = ttk.Combobox(modFrame, textvariable=self.comboboxStrVar['maps_cbobox'])
+        tf.Hovertip(cboboxDict['maps_chkbtn'], text="Enable/Disable mod maps Selections")
+        cboboxDict['maps_cbobox'] = tf.FilterCombobox(modFrame, key=self.mapName, textvariable=self.comboboxStrVar['maps_cbobox'])
         cboboxDict['maps_cbobox'].grid(row=2, column=3, sticky=EW, pady=5, padx=5)
-        cboboxDict['maps_cbobox'].bind('<<ComboboxSelected>>', self.buildCommand)
-        it.Hovertip(cboboxDict['maps_cbobox'], text="mod maps Dropdown List")
+        cboboxDict['maps_cbobox'].bind('<<ComboboxSelected>>', lambda event: self.processMapCboBox('maps_cbobox'))
+        tf.Hovertip(cboboxDict['maps_cbobox'], text="mod maps Dropdown List, type to filter")
 
         readmeLabel = tk.Label(modFrame, text="Mod Info")
         readmeLabel.grid(row=3, column=2, sticky=E)
         cboboxDict['readme_cbobox'] = ttk.Combobox(modFrame, textvariable=self.comboboxStrVar['readme_cbobox'])
         cboboxDict['readme_cbobox'].grid(row=3, column=3, sticky=EW, pady=5, padx=5)
-        it.Hovertip(cboboxDict['readme_cbobox'], text="Read Me File(s)")
+        tf.Hovertip(cboboxDict['readme_cbobox'], text="Read Me File(s)")
 
         refreshButton = tk.Button(modFrame, text="R", image=self.refresh_img, command=lambda: self.processUI('refresh'))
         refreshButton.grid(row=1, column=4, sticky=EW, rowspan=2, padx=5)
-        it.Hovertip(refreshButton, text="Refresh Dropdown Lists")
+        tf.Hovertip(refreshButton, text="Refresh Dropdown Lists")
 
         #refreshButton.update_idletasks()
         readButton = tk.Button(modFrame, text="Help", image=self.help_img, command=self.readerDialog)
         readButton.grid(row=3, column=4, sticky=EW, pady=5, padx=5)
 
+        previewFrame = tk.LabelFrame(frame, text=" Preview ")  # Top-down wireframe of the selected map.
+        previewFrame.grid(row=0, column=2, sticky=N, padx=5)
+        self.previewLabel = tk.Label(previewFrame, width=qf.THUMBSIZE, height=qf.THUMBSIZE, image=self.preview_img)
+        self.previewLabel.grid(row=0, column=0, pady=5, padx=5)
+
         return cboboxDict
 
     def commandWidgets(self, root):
@@ -276,7 +396,7 @@ class Main(tk.Tk, tf.ScrollBarText):
         r = 0  # Row.
         commandEntry = tk.Entry(frame, textvariable=self.entryStrVar['command'], xscrollcommand=scbx.set)
         commandEntry.grid(row=r, column=0, sticky=EW, padx=5)
-        it.Hovertip(commandEntry, text="Commands & Arguments to Run Quake")
+        tf.Hovertip(commandEntry, text="Commands & Arguments to Run Quake")
 
         scbx['command'] = commandEntry.xview
 
@@ -314,6 +434,12 @@ class Main(tk.Tk, tf.ScrollBarText):
                 if dir:
                     self.publish(f"Selected default directory: {dir}")
                     self.init_dir = dir
+            case 'ask_archivedir':
+                dir = tfd.askdirectory(title="Select Mod Archive Drop Folder", initialdir=self.archiveDir or self.init_dir)
+                if dir:
+                    self.archiveDir = dir
+                    self.loadArchives()
+                    self.startWatcher()
             case 'ask_file':
                 file = tfd.askopenfilename(title="Selet Quake Engine", initialdir=self.init_dir)  # Get user selected Quake executable.
                 if file and qf.engine_check(file):
@@ -332,15 +458,337 @@ class Main(tk.Tk, tf.ScrollBarText):
                         # self.cboboxDict[ky].delete(0, END)
                         self.cboboxDict[ky]['values'] = ''
                         self.cboboxDict[ky].set("SELECT")
+                    self.publish("Refreshing mod drop-down lists.")
                     self.processGameFolders(folder)
-                    self.publish("Mod drop-down lists refreshed.")
+            case 'rebuild':
+                folder = self.entryStrVar['basedir'].get()
+                if folder:
+                    self.publish("Rebuilding library index.")
+                    self.processGameFolders(folder, rebuild=True)
             case 'run':
-                command = self.entryStrVar['command'].get()
-                self.run_command(command)
+                self.processRun()
             case 'quit':
+                workers = (self.scanWorker, self.readmeWorker, self.smokeWorker, self.benchWorker, self.prewarmWorker,
+                           self.watchWorker, self.archiveWorker, self.duplicateWorker, self.verifyWorker,
+                           self.requiresWorker)
+                for worker in workers:
+                    if worker:
+                        worker.cancel()
+                running = [tab.session for tab in self.sessions if tab.session.is_running()]
+                if running:
+                    self.publish(f"Stopping {len(running)} running session(s).")
+                    tf.Session.reap(running)
                 self.checkSettings()
                 self.destroy()
 
+    def processRun(self):
+        """
+        Launch the command as a new session with its own output tab. Sessions run side by side, ex. a listen server
+        and its clients. A mod archive is first extracted into the base directory, see processArchive().
+
+        :return: None
+        """
+        command = self.entryStrVar['command'].get()
+        if not command:
+            self.publish("No command to run.")
+            return
+        if self.prewarmWorker or self.archiveWorker:
+            self.publish("Launch in progress, the engine starts once the files are ready.")
+            return
+
+        game = self.cboboxDict['games_cbobox'].get()
+        label = game if self.radiobtnStrVar.get() == 'games' and game != 'SELECT' else 'id1'
+        if label in self.archives:
+            self.processArchive(command, label)
+        else:
+            self.prewarmSession(command, label)
+
+    def processArchive(self, command, archive):
+        """
+        Extract a mod archive of the drop folder on a worker thread, only at its first launch or after it changed,
+        then launch. The least recently played extracted archives are removed above archive_cache_mb, except those
+        of the running sessions, see QuakeFoo.extract_archive().
+
+        :param command: str() of the launch command.
+        :param archive: Archive file name in the drop folder.
+        :return: None
+        """
+        def items(results):
+            for result in results:
+                if result['extracted']:
+                    self.publish(f"Extracted {archive} to {result['folder']}, {result['bytes'] / 2**20:.1f} MB in "
+                                 f"{result['seconds']:.2f}s.")
+                for folder in result['evicted']:
+                    self.publish(f"Removed extracted archive {folder}, least recently played.")
+
+        def done(error):
+            self.archiveWorker = None
+            if error:
+                self.publish(f"Extraction of {archive} failed: {error}")
+            else:
+                self.prewarmSession(command, archive)
+
+        path = os.path.join(self.archiveDir, archive)
+        self.archiveWorker = tf.TkWorker(self, qf.extract_archive, path, self.entryStrVar['basedir'].get(),
+                                         self.qr_cfg['archive_cache_mb'], keep=self.runningFolders(),
+                                         on_items=items, on_done=done).start()
+
+    def runningFolders(self):
+        """
+        -game folders of the running sessions, an extracted archive in use is never evicted.
+        """
+        folders = set()
+        for tab in self.sessions:
+            if tab.session.is_running():
+                args = tab.session.cmd_str.split(' ')
+                folders.update(value for option, value in zip(args, args[1:]) if option.lower() == '-game')
+        return folders
+
+    def prewarmSession(self, command, label):
+        """
+        Start a session, with Prewarm Files Before Launch the pak, progs.dat & map files of the command are first
+        listed and read into the page cache on a worker thread, see QuakeFoo.launch_files() & QuakeFoo.prewarm().
+
+        :param command: str() of the launch command.
+        :param label: Session name after the session number, the mod name or id1.
+        :return: None
+        """
+        if not self.prewarmBoolVar.get():
+            self.startSession(command, label)
+            return
+
+        def items(results):
+            for result in results:
+                msg = f"Prewarmed {result['files']} files, {result['bytes'] / 2**20:.1f} MB in {result['seconds']:.2f}s"
+                self.publish(f"{msg} ({result['method']}).")
+                for file, error in result['errors']:
+                    self.publish(f"Prewarm skipped {file}: {error}")
+
+        def done(error):
+            self.prewarmWorker = None
+            if error:
+                self.publish(f"Prewarm failed: {error}")
+            self.startSession(command, label)
+
+        self.publish("Prewarming the game files.")
+        self.prewarmWorker = tf.TkWorker(self, lambda cancel: qf.prewarm(qf.launch_files(command), cancel),
+                                         on_items=items, on_done=done).start()
+
+    def startSession(self, command, label):
+        """
+        Start a session and open its output tab, see processRun().
+
+        :param command: str() of the launch command.
+        :param label: Session name after the session number, the mod name or id1.
+        :return: None
+        """
+        self.sessionCount += 1
+        interval = self.qr_cfg['sample_interval'] if self.sampleBoolVar.get() else 0
+        session = tf.Session(command, name=f"{self.sessionCount} {label}", sample_interval=interval,
+                             sample_dir=SESSIONDIR)
+        result = session.start()
+        if isinstance(result, Exception):
+            self.publish(f"Launch failed: {result}")
+            return
+
+        self.publish(f"Session {session.name} started, PID {session.pid}: {command}")
+        if session.sampler and session.sampler.csv_file:
+            self.publish(f"Sampling resources every {session.sampler.interval}s to {session.sampler.csv_file}")
+        self.sessions.append(tf.SessionTab(self.sessionTabs, session, maxlines=self.qr_cfg['log_lines'],
+                                           on_close=self.sessions.remove))
+
+    def processSmokeTest(self):
+        """
+        Load every map of the selected mod, or id1, once with the smoke test arguments of the configuration file,
+        see QuakeFoo.smoke_test(). A second selection of the menu stops a running test.
+
+        :return: None
+        """
+        if self.smokeWorker:
+            self.smokeWorker.cancel()
+            self.smokeWorker = None
+            self.publish("Smoke test stopped.")
+            return
+
+        engine = self.entryStrVar['engine'].get()
+        basedir = self.entryStrVar['basedir'].get()
+        if not (engine and basedir):
+            self.publish("Select a Quake Engine and a Base Directory to smoke test maps.")
+            return
+        game = self.cboboxDict['games_cbobox'].get()
+        game = self.gameFolder(game) if self.radiobtnStrVar.get() == 'games' and game and game != 'SELECT' else None
+
+        self.smokeResults = list()
+        template, jobs, timeout = self.qr_cfg['smoke_args'], self.qr_cfg['smoke_jobs'], self.qr_cfg['smoke_timeout']
+        self.publish(f"Smoke testing the {game or 'id1'} maps, {jobs} at a time: {template}")
+        self.smokeWorker = tf.TkWorker(self, qf.smoke_test, engine, basedir, game, None, template, jobs, timeout,
+                                       on_items=self.processSmokeItems,
+                                       on_done=lambda error: self.processSmokeDone(error, engine, basedir, game, template)).start()
+
+    def processSmokeItems(self, results):
+        self.smokeResults += results
+        for result in results:
+            self.publish(f"{result['status'].upper():<9} {result['map']}  {result['reason']}")
+
+    def processSmokeDone(self, error, engine, basedir, game, template):
+        self.smokeWorker = None
+        if error:
+            self.publish(f"Smoke test failed: {error}")
+            return
+        self.publish(qf.smoke_table(self.smokeResults))
+        saved = foo.writeConfig(qf.SMOKEREPORTFILE, qf.smoke_report(self.smokeResults, engine, basedir, game, template))
+        self.publish(f"Smoke test report: {qf.SMOKEREPORTFILE}" if saved is True else f"Smoke test report not saved: {saved}")
+
+    def processDuplicates(self):
+        """
+        Find the identical pak, progs.dat, bsp & dem files across the mods of the base directory on a worker thread
+        and publish the reclaimable space per mod, see QuakeFoo.find_duplicates(). Only new or changed files are
+        hashed after the first run. A second selection of the menu stops a running search.
+
+        :return: None
+        """
+        if self.duplicateWorker:
+            self.duplicateWorker.cancel()
+            self.duplicateWorker = None
+            self.publish("Duplicate search stopped.")
+            return
+
+        basedir = self.entryStrVar['basedir'].get()
+        if not basedir:
+            self.publish("Select a Base Directory to find duplicate files.")
+            return
+
+        def items(results):
+            for result in results:
+                self.publish(qf.duplicate_table(result) if result else "Duplicate search stopped, no result.")
+
+        def done(error):
+            self.duplicateWorker = None
+            if error:
+                self.publish(f"Duplicate search failed: {error}")
+
+        self.publish(f"Hashing the game files of {basedir}, {self.qr_cfg['hash_jobs']} at a time.")
+        self.duplicateWorker = tf.TkWorker(self, qf.find_duplicates, basedir, self.qr_cfg['hash_jobs'],
+                                           on_items=items, on_done=done).start()
+
+    def benchDialog(self):
+        """
+        Dialog to run +timedemo for the selected engines x demos x repetitions, see QuakeFoo.timedemo(). The demos
+        are those of id1 and the selected mod. Each run is published to the Log, the summary is compared with the
+        earlier runs and added to the history.
+
+        :return: None
+        """
+        basedir = self.entryStrVar['basedir'].get()
+        if not basedir:
+            self.publish("Select a Base Directory to run a timedemo benchmark.")
+            return
+        engine = self.entryStrVar['engine'].get()
+        if engine and engine not in self.benchEngines:
+            self.benchEngines.append(engine)
+        game = self.cboboxDict['games_cbobox'].get()
+        game = self.gameFolder(game) if self.radiobtnStrVar.get() == 'games' and game and game != 'SELECT' else None
+        demos = qf.merge_maps(qf.get_demos(os.path.join(basedir, game)) if game else [], qf.get_demos(os.path.join(basedir, 'id1')))
+
+        dialog = tk.Toplevel(self)
+        dialog.title(f"Timedemo Benchmark - {game or 'id1'}")
+        dialog.resizable(width=True, height=True)
+
+        engineFrame = tk.LabelFrame(dialog, text=" Engines ")
+        engineFrame.pack(expand=True, fill=BOTH, pady=5, padx=5)
+        engineList = tk.Listbox(engineFrame, selectmode=MULTIPLE, height=5, width=60, exportselection=False)
+        engineList.pack(expand=True, fill=BOTH, pady=5, padx=5)
+
+        def fill_engines():
+            engineList.delete(0, END)
+            for path in self.benchEngines:
+                engineList.insert(END, path)
+            engineList.selection_set(0, END)
+
+        def add_engine():
+            file = tfd.askopenfilename(parent=dialog, title="Select Quake Engine", initialdir=self.init_dir)
+            if file and file not in self.benchEngines:
+                self.benchEngines.append(file)
+                fill_engines()
+
+        def remove_engines():
+            for index in reversed(engineList.curselection()):
+                del self.benchEngines[index]
+            fill_engines()
+
+        engineButtons = tk.Frame(engineFrame)
+        engineButtons.pack(fill=X, padx=5, pady=(0, 5))
+        tk.Button(engineButtons, text="Add Engine", command=add_engine).pack(side=LEFT)
+        tk.Button(engineButtons, text="Remove Selected", command=remove_engines).pack(side=LEFT, padx=5)
+        fill_engines()
+
+        demoFrame = tk.LabelFrame(dialog, text=" Demos ")
+        demoFrame.pack(expand=True, fill=BOTH, pady=5, padx=5)
+        demoList = tk.Listbox(demoFrame, selectmode=MULTIPLE, height=6, exportselection=False)
+        demoList.pack(expand=True, fill=BOTH, pady=5, padx=5)
+        for demo in demos:
+            demoList.insert(END, demo)
+        demoList.selection_set(0, END)
+
+        runFrame = tk.Frame(dialog)
+        runFrame.pack(fill=X, pady=5, padx=5)
+        tk.Label(runFrame, text="Repetitions:").pack(side=LEFT)
+        repeatIntVar = tk.IntVar(value=self.benchRepeat)
+        tk.Spinbox(runFrame, from_=1, to=20, width=4, textvariable=repeatIntVar).pack(side=LEFT, padx=5)
+        statusLabel = tk.Label(runFrame, anchor=W, text=f"{len(demos)} demos found." if demos else "No demos found.")
+        statusLabel.pack(side=LEFT, expand=True, fill=X, padx=5)
+
+        def run():
+            if self.benchWorker:
+                self.benchWorker.cancel()
+                self.benchWorker = None
+                self.publish("Timedemo benchmark stopped.")
+                runButton['text'] = "Run"
+                return
+            engines = [self.benchEngines[index] for index in engineList.curselection()]
+            selected = [demos[index] for index in demoList.curselection()]
+            if not (engines and selected):
+                statusLabel['text'] = "Select at least one engine and one demo."
+                return
+            try:
+                self.benchRepeat = max(1, repeatIntVar.get())
+            except tk.TclError:
+                self.benchRepeat = 1
+
+            self.benchResults = list()
+            template = self.qr_cfg['timedemo_args']
+            total = len(engines) * len(selected) * self.benchRepeat
+            self.publish(f"Timedemo benchmark: {len(engines)} engines x {len(selected)} demos x {self.benchRepeat} runs.")
+
+            def on_items(results):
+                self.benchResults += results
+                for result in results:
+                    fps = f"{result['fps']:.1f} fps" if result['status'] == 'ok' else f"{result['status'].upper()} {result['reason']}"
+                    self.publish(f"{os.path.basename(result['engine'])} {result['demo']} #{result['run']}: {fps}")
+                if dialog.winfo_exists():
+                    statusLabel['text'] = f"{len(self.benchResults)} of {total} runs."
+
+            def on_done(error):
+                self.benchWorker = None
+                if dialog.winfo_exists():
+                    runButton['text'] = "Run"
+                if error:
+                    self.publish(f"Timedemo benchmark failed: {error}")
+                if self.benchResults:
+                    report = qf.timedemo_report(self.benchResults, basedir, game, template, self.benchRepeat)
+                    self.publish(qf.timedemo_table(report['summary'], qf.load_timedemo()))
+                    saved = qf.save_timedemo(report)
+                    if saved is not True:
+                        self.publish(f"Timedemo results not saved: {saved}")
+
+            self.benchWorker = tf.TkWorker(self, qf.timedemo, engines, basedir, selected, game, self.benchRepeat,
+                                           template, self.qr_cfg['timedemo_timeout'], on_items=on_items, on_done=on_done).start()
+            runButton['text'] = "Stop"
+
+        runButton = tk.Button(runFrame, text="Stop" if self.benchWorker else "Run", command=run)
+        runButton.pack(side=RIGHT)
+        tk.Button(runFrame, text="Close", command=dialog.destroy).pack(side=RIGHT, padx=5)
+
     def processQuakeEngine(self, file):
         self.publish(f"Executable or App file detected in {file}.", cls=True)
         self.entryStrVar['engine'].set(file)  # Display selected path & file.
@@ -348,9 +796,235 @@ class Main(tk.Tk, tf.ScrollBarText):
         folder = os.path.split(file)[0]  # Strip folder.
         self.processGameFolders(folder)  # Process folder for Quake game data.
 
-    def processGameFolders(self, folder):
+    def processGameFolders(self, folder, rebuild=False):
+        """
+        Scan the folder for id1 & mod folders on a worker thread. The dropdowns fill as the folders are scanned.
+        A newer scan cancels one that is still running.
+
+        :param folder: Base directory.
+        :param rebuild: BOOL Ignore the library index and rescan every folder.
+        :return: None
+        """
         self.clearComboBoxes()
-        resources = qf.id1_check(folder)  # Check folder for id1 game data.
+        if self.scanWorker:
+            self.scanWorker.cancel()
+        if self.watchWorker:
+            self.watchWorker.cancel()
+            self.watchWorker = None
+        self.watchPending.clear()
+        self.archives = qf.get_archives(self.archiveDir) if self.archiveDir else []
+        self.scanRecords = dict()
+        self.scanId1 = None
+        self.scanProgress = 0
+        self.publish(f"Scanning {folder} ...")
+        self.scanWorker = tf.TkWorker(self, qf.iter_library, folder, rebuild=rebuild,
+                                      on_items=lambda items: self.processScanItems(folder, items),
+                                      on_done=lambda error: self.processScanDone(folder, error)).start()
+
+    def processScanItems(self, folder, items):
+        for done, total, name, record in items:
+            self.scanRecords[name] = record
+        scan = qf.library_result(folder, self.scanRecords)
+        if self.scanId1 is None:  # id1 is always the first folder scanned.
+            self.scanId1 = self.processId1(folder, scan)
+        if self.scanId1 and scan['mods']:
+            self.cboboxDict['games_cbobox']['values'] = self.gameValues(scan['mods'])  # Load game combobox
+
+        progress = done * 10 // total  # Report every 10%.
+        if progress > self.scanProgress:
+            self.scanProgress = progress
+            self.publish(f"Scanned {done} of {total} folders.")
+
+    def processScanDone(self, folder, error):
+        self.scanWorker = None
+        if error:
+            self.publish(f"Scan of {folder} stopped: {error}")
+        scan = qf.library_result(folder, self.scanRecords)
+        if self.scanId1 is None:
+            self.scanId1 = self.processId1(folder, scan)
+        if self.scanId1 and scan['mods']:
+            self.publish("Game folders detected.")
+            self.processReadmeIndex(folder)
+        if self.scanId1 and self.archives:
+            self.cboboxDict['games_cbobox']['values'] = self.gameValues(scan['mods'])
+            self.publish(f"{len(self.archives)} mod archives detected in {self.archiveDir}.")
+        if self.scanId1:
+            self.startWatcher()
+
+    def processReadmeIndex(self, folder):
+        """
+        Update the readme search index of the base directory on a worker thread, only new or changed files are read.
+
+        :param folder: Base directory.
+        :return: None
+        """
+        if self.readmeWorker:
+            self.readmeWorker.cancel()
+        self.readmeWorker = tf.TkWorker(self, qf.iter_readme_index, folder, interval=250,
+                                        on_done=lambda error: self.processReadmeIndexDone(folder, error)).start()
+
+    def processReadmeIndexDone(self, folder, error):
+        self.readmeWorker = None
+        if error:
+            self.publish(f"Readme index of {folder} stopped: {error}")
+
+    def gameValues(self, mods):
+        """
+        Game combobox entries, the mod folders then the archives of the drop folder.
+        """
+        return list(mods) + [archive for archive in self.archives if archive not in mods]
+
+    def gameFolder(self, game):
+        """
+        Folder name of a game combobox entry, an archive is launched from its extracted folder.
+        """
+        return qf.archive_folder(game) if game in self.archives else game
+
+    def loadArchives(self):
+        """
+        List the archives of the drop folder again and update the game combobox, the selection is kept.
+
+        :return: None
+        """
+        archives = qf.get_archives(self.archiveDir) if self.archiveDir else []
+        if archives == self.archives:
+            return
+        for archive in sorted(set(archives) - set(self.archives), key=str.lower):
+            self.publish(f"Mod archive added: {archive}")
+        self.archives = archives
+        basedir = self.entryStrVar['basedir'].get()
+        if basedir and self.scanId1:
+            self.cboboxDict['games_cbobox']['values'] = self.gameValues(qf.library_result(basedir, self.scanRecords)['mods'])
+
+    def startWatcher(self):
+        """
+        Watch the base directory, id1/maps and the selected mod & its maps folder on a worker thread, see
+        foo.watchFolders(). Changes are applied to the dropdowns as deltas, the selections are kept and only the
+        changed folders are rescanned. Restarted when the selected mod changes, stopped by the Settings menu.
+
+        :return: None
+        """
+        if self.watchWorker:
+            self.watchWorker.cancel()
+            self.watchWorker = None
+        basedir = self.entryStrVar['basedir'].get()
+        if not (self.watchBoolVar.get() and basedir and self.scanId1):
+            return
+
+        folders = [basedir, os.path.join(basedir, 'id1', 'maps')]
+        game = self.gameFolder(self.comboboxStrVar['games_cbobox'].get())
+        if self.radiobtnStrVar.get() == 'games' and game and game != 'SELECT':
+            folders += [os.path.join(basedir, game), os.path.join(basedir, game, 'maps')]
+        folders += [os.path.join(basedir, name) for name in sorted(self.watchPending)]
+        if self.archiveDir:
+            folders.append(self.archiveDir)
+        self.watchWorker = tf.TkWorker(self, foo.watchFolders, folders, interval=250,
+                                       on_items=lambda items: self.processWatchItems(basedir, items)).start()
+
+    def processWatchItems(self, basedir, items):
+        """
+        Rescan the mod folders touched by a batch of watcher deltas on a worker thread, see qf.index_mod().
+
+        :param basedir: Base directory of the watcher.
+        :param items: List of tuple(folder, added names, removed names).
+        :return: None
+        """
+        names = set()
+        added = set()
+        for folder, new, removed in items:
+            if folder == self.archiveDir:
+                self.loadArchives()
+            elif folder == basedir:
+                names.update(new, removed)
+                added.update(new)
+            else:  # A mod folder or its maps folder.
+                mod = os.path.dirname(folder) if os.path.basename(folder).lower() == 'maps' else folder
+                names.add(os.path.basename(mod))
+        paths = [os.path.join(basedir, name) for name in sorted(names)]
+        if not paths:
+            return
+        tf.TkWorker(self, lambda cancel: [(os.path.basename(path), qf.index_mod(path)) for path in paths],
+                    on_items=lambda records: self.processWatchRecords(basedir, records, added)).start()
+
+    def processWatchRecords(self, basedir, records, added):
+        """
+        Apply rescanned mod folders to the dropdowns. A removed selection is reset, other selections are kept.
+
+        :param basedir: Base directory of the watcher.
+        :param records: List of tuple(folder name, record or None if removed).
+        :param added: Set of the folder names added to the base directory.
+        :return: None
+        """
+        if basedir != self.entryStrVar['basedir'].get():
+            return
+        old_mods = qf.library_result(basedir, self.scanRecords)['mods']
+        pending = set(self.watchPending)
+        for name, record in records:
+            if record is None:
+                self.scanRecords.pop(name, None)
+            else:
+                self.scanRecords[name] = record
+        scan = qf.library_result(basedir, self.scanRecords)
+        for name, record in records:
+            if record is None or name in scan['mods']:
+                self.watchPending.discard(name)
+            elif name in added:
+                self.watchPending.add(name)
+
+        mods = scan['mods']
+        if mods != old_mods:
+            self.cboboxDict['games_cbobox']['values'] = self.gameValues(mods)
+            for name in sorted(set(mods) - set(old_mods), key=str.lower):
+                self.publish(f"Mod added: {name}")
+            for name in sorted(set(old_mods) - set(mods), key=str.lower):
+                self.publish(f"Mod removed: {name}")
+
+        changed = {name for name, _ in records}
+        game = self.gameFolder(self.comboboxStrVar['games_cbobox'].get())
+        if game in changed and game not in mods and game not in self.scanRecords:  # The selected mod was removed.
+            self.comboboxStrVar['games_cbobox'].set('SELECT')
+            for ky in 'readme_cbobox', 'maps_cbobox':
+                self.cboboxDict[ky]['values'] = ''
+                self.comboboxStrVar[ky].set('SELECT')
+            self.mapLists.pop('maps_cbobox', None)
+            self.buildCommand()
+        elif game in changed:
+            path = os.path.join(basedir, game)
+            self.cboboxDict['readme_cbobox']['values'] = qf.get_readme(path, scan=scan) or ''
+            self.updateMapCboBox('maps_cbobox', path, qf.get_maps(path, scan=scan) or [])
+        id1 = next((name for name in changed if name.lower() == 'id1'), None)
+        if id1:
+            self.updateMapCboBox('id1mps_cbobox', os.path.join(basedir, id1), qf.get_maps(os.path.join(basedir, id1), scan=scan) or [])
+
+        if self.watchPending != pending:
+            self.startWatcher()
+
+    def updateMapCboBox(self, ky, folder, maps):
+        """
+        Apply a new list of maps to a maps combobox, the selected map is kept unless it was removed.
+
+        :param ky: 'id1mps_cbobox' or 'maps_cbobox'.
+        :param folder: Folder of the maps ex. /Quake/pakmod/id1
+        :param maps: List of bsp files.
+        :return: None
+        """
+        old_folder, old = self.mapLists.get(ky, (None, []))
+        if old_folder != folder:
+            old = []
+        if maps == old:
+            return
+        for mapname in sorted(set(maps) - set(old)):
+            self.mapInfo.pop(os.path.join(folder, mapname), None)  # A new or recompiled map, read its title again.
+            self.publish(f"Map added: {mapname}")
+        for mapname in sorted(set(old) - set(maps)):
+            self.publish(f"Map removed: {mapname}")
+        self.loadMapCboBox(ky, folder, maps)
+        if self.mapName(self.comboboxStrVar[ky].get()) not in maps:
+            self.comboboxStrVar[ky].set('SELECT')
+            self.buildCommand()
+
+    def processId1(self, folder, scan):
+        resources = qf.id1_check(folder, scan=scan)  # Check folder for id1 game data.
         if resources['id1_folder'] and resources['id1_pak0']:
             self.publish(f"id1 Folder and pak0.pak file detected in {folder}.")
             self.entryStrVar['basedir'].set(folder)
@@ -359,21 +1033,42 @@ class Main(tk.Tk, tf.ScrollBarText):
                 self.publish("pak1.pak File detected. Note: The original release of Quake requires this file.")
             else:
                 self.publish("pak1.pak File Not detected. Note: The remastered release of Quake does not require this file.")
+            self.processVerify(folder)
             if resources['id1_maps']:
                 self.publish("maps Folder detected.")
             if resources['id1_bsp']:
                 self.publish("bsp Files detected.")
                 id1_fldr = os.path.join(folder, 'id1')
-                id1_maps = qf.get_maps(id1_fldr)  # Get bsp files from id1 map folder
+                id1_maps = qf.get_maps(id1_fldr, scan=scan)  # Get bsp files from id1 map folder
                 if id1_maps:
-                    self.cboboxDict['id1mps_cbobox']['values'] = id1_maps
-
-            games = qf.get_game_folders(folder)
-            if games:
-                self.publish("Game folders detected.")
-                self.cboboxDict['games_cbobox']['values'] = games  # Load game combobox
+                    self.loadMapCboBox('id1mps_cbobox', id1_fldr, id1_maps)
+            return True
         else:
             self.publish(f"id1 Folder not detected in {folder}.")
+            return False
+
+    def processVerify(self, folder):
+        """
+        Check the id1 pak files against the digests of the known releases on a worker thread, see
+        QuakeFoo.verify_id1(). The pak files are only read the first time, or after they changed.
+
+        :param folder: Base directory.
+        :return: None
+        """
+        if self.verifyWorker:
+            self.verifyWorker.cancel()
+
+        def items(results):
+            for result in results:
+                self.publish(f"id1 check: {result['message']}")
+
+        def done(error):
+            self.verifyWorker = None
+            if error:
+                self.publish(f"id1 check stopped: {error}")
+
+        self.verifyWorker = tf.TkWorker(self, qf.verify_id1, folder, self.qr_cfg['known_paks'],
+                                        on_items=items, on_done=done).start()
 
     def processModChkBtn(self, event=None):
         widgets = 'id1mps_rdobtn', 'id1mps_cbobox', 'games_rdobtn', 'games_cbobox', 'maps_chkbtn', 'maps_cbobox'
@@ -403,6 +1098,7 @@ class Main(tk.Tk, tf.ScrollBarText):
                 self.comboboxStrVar['maps_cbobox'].set("SELECT")
                 # self.cboboxDict['maps_cbobox'].delete(0, END)
                 self.cboboxDict['maps_cbobox']['values'] = ''
+                self.mapLists.pop('maps_cbobox', None)
             case 'games':
                 self.cboboxDict['id1mps_cbobox']['state'] = DISABLED
                 self.cboboxDict['games_cbobox']['state'] = NORMAL
@@ -411,6 +1107,7 @@ class Main(tk.Tk, tf.ScrollBarText):
                     self.cboboxDict['maps_cbobox']['state'] = NORMAL
                 self.comboboxStrVar['id1mps_cbobox'].set("SELECT")
         self.buildCommand()
+        self.startWatcher()
 
     def processSkillChkBtn(self, event=None):
         if self.skillChkBtnBoolVar.get():
@@ -431,26 +1128,54 @@ class Main(tk.Tk, tf.ScrollBarText):
         basedir = self.entryStrVar['basedir'].get()
         game = self.comboboxStrVar['games_cbobox'].get()
         if basedir and game and game != 'SELECT':
-            path = os.path.join(basedir, game)
-
-            # Fill Readme ComboBox with text files from mod folder. #
-            readme = qf.get_readme(path)
-            if readme:
-                self.cboboxDict['readme_cbobox']['values'] = readme
+            path = os.path.join(basedir, self.gameFolder(game))
+            for ky in 'readme_cbobox', 'maps_cbobox':
+                self.cboboxDict[ky]['values'] = ''
+                self.comboboxStrVar[ky].set('SELECT')
+            self.mapLists.pop('maps_cbobox', None)
+
+            if self.modWorker:
+                self.modWorker.cancel()
+            if game in self.archives and not os.path.isdir(path):  # Not extracted yet, list the archive contents.
+                archive = os.path.join(self.archiveDir, game)
+                self.modWorker = tf.TkWorker(self, lambda cancel: qf.archive_info(archive),
+                                             on_items=lambda items: self.processArchiveInfo(items[-1]),
+                                             on_done=lambda error: self.processModDone(archive, error)).start()
             else:
-                # self.cboboxDict['readme_cbobox'].delete(0, END)
-                self.cboboxDict['readme_cbobox']['values'] = ''
-            self.comboboxStrVar['readme_cbobox'].set('SELECT')
-
-            # Fill Maps Combobox with the bsp maps form the mod folder. #
-            maps = qf.get_maps(path)
-            if maps:
-                self.cboboxDict['maps_cbobox']['values'] = maps
-            else:
-                # self.cboboxDict['maps_cbobox'].delete(0, END)
-                self.cboboxDict['maps_cbobox']['values'] = ''
-            self.comboboxStrVar['maps_cbobox'].set('SELECT')
+                self.modWorker = tf.TkWorker(self, lambda cancel: qf.index_mod(path),
+                                             on_items=lambda items: self.processModRecord(path, items[-1]),
+                                             on_done=lambda error: self.processModDone(path, error)).start()
             self.buildCommand()
+            self.startWatcher()
+
+    def processModRecord(self, path, record):
+        self.modWorker = None
+        basedir, game = os.path.split(path)
+        scan = qf.library_result(basedir, {game: record} if record else {})
+
+        # Fill Readme ComboBox with text files from mod folder. #
+        readme = qf.get_readme(path, scan=scan)
+        if readme:
+            self.cboboxDict['readme_cbobox']['values'] = readme
+
+        # Fill Maps Combobox with the bsp maps form the mod folder. #
+        maps = qf.get_maps(path, scan=scan)
+        if maps:
+            self.loadMapCboBox('maps_cbobox', path, maps)
+
+    def processModDone(self, path, error):
+        self.modWorker = None
+        if error:
+            self.publish(f"Scan of {path} stopped: {error}")
+
+    def processArchiveInfo(self, info):
+        """
+        Fill the maps combobox of an archive not extracted yet, the loose maps of its central directory. The map titles
+        and the readme files are available once it was launched.
+        """
+        self.modWorker = None
+        if info and info['maps']:
+            self.cboboxDict['maps_cbobox']['values'] = info['maps']
 
     def readerDialog(self):
         """
@@ -460,20 +1185,21 @@ class Main(tk.Tk, tf.ScrollBarText):
         """
 
         path = self.entryStrVar['basedir'].get()
-        mod_fldr = self.comboboxStrVar['games_cbobox'].get()
+        mod_fldr = self.gameFolder(self.comboboxStrVar['games_cbobox'].get())
         readme = self.comboboxStrVar['readme_cbobox'].get()
         if path and mod_fldr and readme:
             file_path = os.path.join(path, mod_fldr, readme)
             if os.path.isfile(file_path):
-                with open(file_path, errors='ignore') as in_file:
-                    file_text = in_file.read()
+                with open(file_path, 'rb') as in_file:  # Only a sample, the reader maps the file in chunks.
+                    encoding = qf.detect_encoding(in_file.read(qf.ENCODINGSAMPLE))
 
                 reader = tk.Toplevel(self)
                 reader.title("Mod Help")
                 reader.resizable(width=True, height=True)
 
-                readerText = tf.ScrollBarText()
-                readerText.scbText(parent=reader, title=" "+readme+" ")
+                readerText = tf.ChunkedText()
+                readerText.scbText(parent=reader, title=f" {readme} ({encoding}) ")
+                readerText.sbText.tag_configure('gold', foreground=GOLD)
 
                 closeButton = tk.Button(reader, text="Close", command=reader.destroy)
                 closeButton.pack(pady=5)
@@ -483,7 +1209,116 @@ class Main(tk.Tk, tf.ScrollBarText):
                 h = reader.winfo_height()
                 reader.minsize(width=w, height=h)
 
-                readerText.publish(file_text, end=False)
+                readerText.open_file(file_path, decode=lambda data: qf.decode_runs(data, encoding))
+
+    def searchDialog(self):
+        """
+        Dialog to search the readme files of all mods. Mods are ranked by keyword hits, selecting a result selects
+        the mod in the Game Mods dropdown.
+
+        :return: None
+        """
+        basedir = self.entryStrVar['basedir'].get()
+        if not basedir:
+            self.publish("Select a Base Directory to search the readme files.")
+            return
+
+        dialog = tk.Toplevel(self)
+        dialog.title("Search Readmes")
+        dialog.resizable(width=True, height=True)
+
+        queryStrVar = tk.StringVar()
+        queryEntry = tk.Entry(dialog, textvariable=queryStrVar)
+        queryEntry.pack(fill=X, pady=5, padx=5)
+        tf.Hovertip(queryEntry, text="Keywords, ex. grappling hook")
+
+        resultList = tk.Listbox(dialog, height=12, width=48)
+        resultList.pack(expand=True, fill=BOTH, pady=5, padx=5)
+        statusLabel = tk.Label(dialog, anchor=W)
+        statusLabel.pack(fill=X, padx=5)
+        results = list()
+
+        def search(event=None):
+            # Only entries of the Game Mods dropdown, an extracted archive is listed under its archive name.
+            games = {game: game for game in self.cboboxDict['games_cbobox']['values']}
+            games.update((qf.archive_folder(archive), archive) for archive in self.archives)
+            ranked = qf.search_readmes(queryStrVar.get(), basedir)
+            results[:] = [(games[mod], matched, hits) for mod, matched, hits in ranked if mod in games]
+            resultList.delete(0, END)
+            for mod, matched, hits in results:
+                resultList.insert(END, f"{mod}  ({hits} hits)")
+            status = "Indexing readme files, results may be incomplete. " if self.readmeWorker else ""
+            statusLabel['text'] = status + f"{len(results)} mods found."
+
+        def select(event=None):
+            selection = resultList.curselection()
+            if selection:
+                self.selectGame(results[selection[0]][0])
+
+        queryEntry.bind('<KeyRelease>', search)
+        resultList.bind('<<ListboxSelect>>', select)
+
+        closeButton = tk.Button(dialog, text="Close", command=dialog.destroy)
+        closeButton.pack(pady=5)
+        queryEntry.focus_set()
+
+    def diagnosticsDialog(self):
+        """
+        Dialog with the call count & times of the instrumented functions, see foo.timed(). The table can be saved as
+        json to attach to a report of a slow library.
+
+        :return: None
+        """
+        dialog = tk.Toplevel(self)
+        dialog.title("Diagnostics")
+        dialog.resizable(width=True, height=True)
+
+        columns = 'calls', 'total', 'mean', 'p95', 'max'
+        table = ttk.Treeview(dialog, columns=columns, height=16)
+        table.heading('#0', text="Function")
+        table.column('#0', width=220)
+        for column in columns:
+            table.heading(column, text=column if column == 'calls' else f"{column} ms")
+            table.column(column, width=80, anchor=E)
+        table.pack(expand=True, fill=BOTH, pady=5, padx=5)
+
+        def refresh():
+            table.delete(*table.get_children())
+            report = foo.timingReport()
+            for name, row in sorted(report.items(), key=lambda item: -item[1]['total']):  # Most time first.
+                table.insert('', END, text=name, values=[row['calls']] + [f"{row[ky] * 1000:.2f}" for ky in columns[1:]])
+
+        def reset():
+            foo.resetTimings()
+            refresh()
+
+        def save():
+            file = tfd.asksaveasfilename(parent=dialog, initialdir=self.init_dir, initialfile='qrtimings.json',
+                                         defaultextension='.json', filetypes=[("json", "*.json")])
+            if file:
+                result = foo.writeConfig(file, foo.timingReport())
+                self.publish(f"Diagnostics saved to {file}" if result is True else f"Diagnostics not saved: {result}")
+
+        buttonFrame = tk.Frame(dialog)
+        buttonFrame.pack(pady=5)
+        for text, command in (("Refresh", refresh), ("Reset", reset), ("Save JSON", save), ("Close", dialog.destroy)):
+            tk.Button(buttonFrame, text=text, command=command).pack(side=LEFT, padx=5)
+        refresh()
+
+    def selectGame(self, game):
+        """
+        Select a mod in the Game Mods dropdown as if picked by the user.
+
+        :param game: Mod folder name.
+        :return: None
+        """
+        self.modChkBtnBoolVar.set(True)
+        self.processModChkBtn()
+        self.radiobtnStrVar.set('games')
+        self.processRadioBtns()
+        self.comboboxStrVar['games_cbobox'].set(game)
+        self.processGameMapCboBox()
+        self.publish(f"Selected mod: {game}")
 
     def set_dfltdir(self):
         """
@@ -501,6 +1336,7 @@ class Main(tk.Tk, tf.ScrollBarText):
             self.publish("Use the Settings menu to select a Default Directory.")
             tmb.showwarning(title="WARNING!", message="Default Directory not Set.")
 
+    @foo.timed()
     def buildCommand(self, event=None):
         """
         Build the command to launch Quake. The code below is written in sequence for the correct order of commads.
@@ -509,56 +1345,154 @@ class Main(tk.Tk, tf.ScrollBarText):
         :return: None
         """
 
-        command = str()
         engine = self.entryStrVar['engine'].get()
         basedir = self.entryStrVar['basedir'].get()
+        if engine and basedir and not os.path.exists(engine):
+            self.publish("Issue with executable or app. Please re-enter.")
 
-        if  engine and basedir:
-            if self.opsys == 'Darwin' and engine.endswith('.app'):  # Mac command prefix. Prefix not required for Windows.
-                command = "open -a "
-
-            if engine and os.path.exists(engine):
-                command += engine  # Add engine path and executable.
-            else:
-                self.publish("Issue with executable or app. Please re-enter.")
-
-            if self.opsys == 'Darwin' and engine.endswith('.app'):
-                command += " --args"  # Mac executable suffix.
-
-            folder = self.entryStrVar['basedir'].get()
-            if folder and os.path.exists(folder):
-                command += " -basedir "  # Add base directory (-basedir) command-line argument.
-                command += folder  # Add base directory folder path.
-
-            # add skill level
-            skill = {ky:val for val, ky in enumerate(("Easy", "Normal", "Hard", "Nightmare"))}
-            if self.skillChkBtnBoolVar.get() and engine and basedir:
-                skl = self.cboboxDict['skill_cbobox'].get()
-                command += f" +skill {skill[skl]}"
-
-            mod_switch = self.modChkBtnBoolVar.get()
-            radiobtn_sel = self.radiobtnStrVar.get()
-            id1_map = self.cboboxDict['id1mps_cbobox'].get()  # Add user map selection.
-            mod_map = self.cboboxDict['maps_cbobox'].get()  # Add user map selection.
-            game = self.cboboxDict['games_cbobox'].get()  # Add game selection.
-            if mod_switch:
-                match radiobtn_sel:  # Add map or game command-line argument.
-                    case 'id1_maps':
-                        if id1_map and id1_map != 'SELECT':
-                            command += f" +map {id1_map}"
-                    case 'games':
-                        if game and game != 'SELECT':
-                            command += f" -game {game}"
-                        if self.mapChkBtnBoolVar.get() and mod_map and mod_map != 'SELECT':
-                            command += f" +map {mod_map}"
-
-            self.entryStrVar['command'].set(command)
+        skill = self.cboboxDict['skill_cbobox'].get() if self.skillChkBtnBoolVar.get() else None  # Add skill level.
+        game = mapname = None
+        if self.modChkBtnBoolVar.get():
+            match self.radiobtnStrVar.get():  # Add map or game command-line argument.
+                case 'id1_maps':
+                    mapname = self.mapName(self.cboboxDict['id1mps_cbobox'].get())  # Add user map selection.
+                case 'games':
+                    game = self.gameFolder(self.cboboxDict['games_cbobox'].get())  # Add game selection.
+                    if self.mapChkBtnBoolVar.get():
+                        mapname = self.mapName(self.cboboxDict['maps_cbobox'].get())  # Add user map selection.
+        game, mapname = (None if v == 'SELECT' else v for v in (game, mapname))
+
+        if engine and basedir:
+            self.entryStrVar['command'].set(qf.build_command(engine, basedir, skill, game, mapname, self.opsys))
 
     def clearComboBoxes(self):
         for ky in COMBOBOXES:
             # self.cboboxDict[ky].delete(0, END)
             self.cboboxDict[ky]['values'] = ''
             self.comboboxStrVar[ky].set("SELECT")
+        for worker in self.mapWorkers.values():
+            worker.cancel()
+        self.mapWorkers.clear()
+        self.mapLists.clear()
+
+    def loadMapCboBox(self, ky, folder, maps):
+        """
+        Fill a maps combobox with the bsp files at once, the map titles are read by a worker thread and added as
+        they arrive.
+
+        :param ky: 'id1mps_cbobox' or 'maps_cbobox'.
+        :param folder: Folder of the maps ex. /Quake/pakmod/id1
+        :param maps: List of bsp files.
+        :return: None
+        """
+        if ky in self.mapWorkers:
+            self.mapWorkers.pop(ky).cancel()
+        self.mapLists[ky] = (folder, maps)
+        self.cboboxDict[ky]['values'] = [self.mapLabel(folder, m) for m in maps]
+        todo = [m for m in maps if os.path.join(folder, m) not in self.mapInfo]
+        if todo:
+            self.mapWorkers[ky] = tf.TkWorker(self, qf.iter_map_info, folder, todo,
+                                              on_items=lambda items: self.processMapInfo(ky, folder, items)).start()
+
+    def processMapInfo(self, ky, folder, items):
+        for mapname, info in items:
+            self.mapInfo[os.path.join(folder, mapname)] = info
+        if self.mapLists.get(ky, (None,))[0] == folder:
+            self.cboboxDict[ky]['values'] = [self.mapLabel(folder, m) for m in self.mapLists[ky][1]]
+
+    def mapLabel(self, folder, mapname):
+        """
+        Combobox entry of a map, the bsp file followed by the map title when known.
+        """
+        info = self.mapInfo.get(os.path.join(folder, mapname))
+        if info and info['title']:
+            return f"{mapname} - {info['title']}"
+        return mapname
+
+    @staticmethod
+    def mapName(label):
+        """
+        bsp file of a maps combobox entry, see mapLabel(). Quake map names do not contain spaces.
+        """
+        return label.split(' ', 1)[0]
+
+    def processMapCboBox(self, ky):
+        """
+        Publish the title & stats of the selected map then update the command.
+
+        :param ky: 'id1mps_cbobox' or 'maps_cbobox'.
+        :return: None
+        """
+        mapname = self.mapName(self.comboboxStrVar[ky].get())
+        folder = self.mapLists.get(ky, (None,))[0]
+        info = self.mapInfo.get(os.path.join(folder, mapname)) if folder else None
+        if info:
+            monsters = '/'.join(str(n) for n in info['monsters'])
+            vis = "Yes" if info['vis'] else "No"
+            self.publish(f"{mapname}: {info['title'] or 'No title'} | Monsters (Easy/Normal/Hard): {monsters} | "
+                         f"Secrets: {info['secrets']} | Items: {info['items']} | VIS: {vis}")
+        if folder:
+            self.processPreview(folder, mapname)
+            self.processRequirements(folder, mapname)
+        self.buildCommand()
+
+    def processRequirements(self, folder, mapname):
+        """
+        Check on a worker thread that the progs.dat of the mod can spawn every entity of the map, ex. a standalone
+        map in id1/maps that uses the monsters of a mod. The missing classnames and the mods that have them are
+        published, see QuakeFoo.map_requirements().
+
+        :param folder: Mod folder of the map.
+        :param mapname: bsp file.
+        :return: None
+        """
+        if self.requiresWorker:
+            self.requiresWorker.cancel()
+        basedir = self.entryStrVar['basedir'].get()
+
+        def items(results):
+            for result in results:
+                if result and result['missing'] is None:
+                    self.publish(f"Can't check the entities of {mapname}: no valid progs.dat in {os.path.basename(folder)} or id1.")
+                elif result and result['missing']:
+                    self.publish(f"{mapname} uses entities {os.path.basename(folder)} cannot spawn: {', '.join(result['missing'])}. "
+                                 f"Mods that can: {', '.join(result['mods']) or 'none found'}.")
+
+        def done(error):
+            self.requiresWorker = None
+
+        self.requiresWorker = tf.TkWorker(self, qf.map_requirements, folder, mapname, basedir,
+                                          on_items=items, on_done=done).start()
+
+    def processPreview(self, folder, mapname):
+        """
+        Show the preview of a map. The png is taken from the thumbnail cache or rendered on a worker thread.
+
+        :param folder: Folder of the map ex. /Quake/pakmod/id1
+        :param mapname: bsp file.
+        :return: None
+        """
+        if self.previewWorker:
+            self.previewWorker.cancel()
+        self.previewWorker = tf.TkWorker(self, lambda cancel: qf.map_thumbnail(folder, mapname),
+                                         on_items=lambda items: self.showPreview(items[-1]),
+                                         on_done=self.processPreviewDone).start()
+
+    def showPreview(self, thumb):
+        if thumb:
+            image = foo.cachedImageTk(thumb, None, IMGCACHE)  # Thumbnails are rendered at size, no PIL needed.
+            if not isinstance(image, Exception):
+                self.preview_img = image
+                self.previewLabel['image'] = self.preview_img
+
+    def processPreviewDone(self, error):
+        self.previewWorker = None
+        if isinstance(error, ImportError):
+            if not self.previewWarned:  # Report a missing NumPy once per session.
+                self.previewWarned = True
+                self.publish("Map previews require NumPy (pip install numpy).")
+        elif error:
+            self.publish(f"Map preview failed: {error}")
 
     def checkSettings(self):
         """
@@ -575,8 +1509,14 @@ class Main(tk.Tk, tf.ScrollBarText):
         if self.qr_cfg['skill_chkbtn'] == self.skillChkBtnBoolVar.get(): state+=1  # Skill check button state.
         if self.qr_cfg['skill_cbobox'] == self.skillCbBoxStrVar.get(): state+=1
         if self.qr_cfg['maps_chkbtn'] == self.mapChkBtnBoolVar.get(): state+=1  # Map Check button state.
-
-        if state != 8:
+        if self.qr_cfg['bench_engines'] == self.benchEngines: state+=1  # Timedemo engines.
+        if self.qr_cfg['bench_repeat'] == self.benchRepeat: state+=1
+        if self.qr_cfg['sample_sessions'] == self.sampleBoolVar.get(): state+=1  # Session resource sampling.
+        if self.qr_cfg['prewarm'] == self.prewarmBoolVar.get(): state+=1
+        if self.qr_cfg['watch_folders'] == self.watchBoolVar.get(): state+=1  # Folder watcher.
+        if self.qr_cfg['archive_dir'] == self.archiveDir: state+=1  # Mod archive drop folder.
+
+        if state != 14:
             if tmb.askyesno(title="Save", message="Selection Changes Detected.\nSave Settings?"):
                 self.saveSettings()
 
@@ -589,6 +1529,12 @@ class Main(tk.Tk, tf.ScrollBarText):
         self.qr_cfg['skill_chkbtn'] = self.skillChkBtnBoolVar.get()  # Skill check button state.
         self.qr_cfg['skill_cbobox'] = self.skillCbBoxStrVar.get()
         self.qr_cfg['maps_chkbtn'] = self.mapChkBtnBoolVar.get()  # Map Check button state.
+        self.qr_cfg['bench_engines'] = list(self.benchEngines)  # Timedemo engines.
+        self.qr_cfg['bench_repeat'] = self.benchRepeat
+        self.qr_cfg['sample_sessions'] = self.sampleBoolVar.get()  # Session resource sampling.
+        self.qr_cfg['prewarm'] = self.prewarmBoolVar.get()
+        self.qr_cfg['watch_folders'] = self.watchBoolVar.get()  # Folder watcher.
+        self.qr_cfg['archive_dir'] = self.archiveDir  # Mod archive drop folder.
 
         status = foo.writeConfig(file=CONFIGFILE, settings=self.qr_cfg)
         if status:
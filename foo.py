@@ -7,15 +7,141 @@ Python 3.12.7
 foo.py - Support functions.
 Functions
     pilImageTk(file, size=None) - image manipulation for tkinter.
+    fitSize(image_size, size) - width & height of a resized image.
+    cachedImageTk(file, size, cache_dir) - tk.PhotoImage of an image resized once and kept on disk.
     readCOnfig(file) - read json file.
     writeCOnfig(file, settings) - write to json file.
+    recordTime(name, seconds) - record one duration under a name.
+    timed(name) - decorator recording the call count & time of a function, see timingReport().
+    timeBlock(name) - context manager recording the time of a block of code under a name.
+    timingReport() - call count, total, mean, p95 & max time of each timed name.
+    resetTimings() - clear the recorded times.
+    procTree(pid) - the pid and the pids of its descendants from /proc (Linux).
+    procStat(pid) - cpu ticks, rss & disk io counters of a process from /proc (Linux).
+    inotifyAvailable() - True if watchFolders() uses inotify, False if it polls.
+    watchFolders(folders, cancel, poll, settle) - generator of the names added to & removed from folders.
 
 """
 
+import os
 import json
-from PIL import Image, ImageTk
+import select
+import struct
+import time
+import bisect
+import functools
+import threading
+import contextlib
+import collections
 
+CO_GENERATOR = 0x20  # inspect.CO_GENERATOR, inspect is slow to import and only this flag is needed.
+INOTIFYEVENT = struct.Struct('iIII')  # Watch descriptor, mask, cookie, name length, followed by the name.
+IN_MOVED_FROM, IN_MOVED_TO, IN_CREATE, IN_DELETE = 0x40, 0x80, 0x100, 0x200
+IN_DELETE_SELF, IN_MOVE_SELF, IN_IGNORED, IN_ONLYDIR = 0x400, 0x800, 0x8000, 0x1000000
+WATCHMASK = IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+TIMINGSAMPLES = 1000  # Most recent durations kept per name for the p95 time.
+_timings = dict()  # name -> [calls, total seconds, max seconds, sorted recent samples, recent samples in call order]
+_timings_lock = threading.Lock()
 
+
+def recordTime(name, seconds):
+    """
+    Record one duration under a name, see timed() & timeBlock().
+
+    :param name: Name of the timed code ex. scan_mod.
+    :param seconds: Duration.
+    :return: None
+    """
+    with _timings_lock:
+        entry = _timings.get(name)
+        if entry is None:
+            entry = _timings[name] = [0, 0.0, 0.0, [], collections.deque()]
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+        ordered, recent = entry[3], entry[4]
+        if len(recent) >= TIMINGSAMPLES:
+            del ordered[bisect.bisect_left(ordered, recent.popleft())]
+        recent.append(seconds)
+        bisect.insort(ordered, seconds)
+
+@contextlib.contextmanager
+def timeBlock(name):
+    """
+    Context manager, record the time of a block of code ex. with timeBlock('scan_mod.scandir'): ...
+
+    :param name: Name of the block.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        recordTime(name, time.perf_counter() - start)
+
+def timed(name=None):
+    """
+    Decorator, record the call count & time of a function. For a generator function the time spent inside the
+    generator is recorded once it is exhausted or closed, the time of the caller between items is left out.
+
+    :param name: Name of the function in the report, defaults to its qualified name ex. Main.buildCommand.
+    :return: Decorator.
+    """
+    def decorator(func):
+        label = name or func.__qualname__
+
+        if getattr(func, '__code__', None) and func.__code__.co_flags & CO_GENERATOR:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                spent = 0.0
+                gen = func(*args, **kwargs)
+                try:
+                    while True:
+                        start = time.perf_counter()
+                        try:
+                            item = next(gen)
+                        finally:
+                            spent += time.perf_counter() - start
+                        yield item
+                except StopIteration as stop:
+                    return stop.value
+                finally:
+                    gen.close()
+                    recordTime(label, spent)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    recordTime(label, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+def timingReport():
+    """
+    Call count & times in seconds of each timed name. p95 is taken over the most recent TIMINGSAMPLES calls.
+
+    :return: Dictionary of name -> 'calls', 'total', 'mean', 'p95', 'max'.
+    """
+    with _timings_lock:
+        report = dict()
+        for name, (calls, total, longest, ordered, _) in _timings.items():
+            report[name] = {'calls': calls, 'total': total, 'mean': total / calls,
+                            'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 'max': longest}
+        return report
+
+def resetTimings():
+    """
+    Clear the recorded times.
+
+    :return: None
+    """
+    with _timings_lock:
+        _timings.clear()
+
+
+@timed()
 def pilImageTk(file, size=None):
     """
     PIL Image manipulation for tkinter.
@@ -26,28 +152,93 @@ def pilImageTk(file, size=None):
                  None, does not resize the image.
     :return: PIL Image Object for Tk.
     """
+    from PIL import Image, ImageTk  # Imported on first use, the headless mode does not need PIL.
+
     try:
         image = Image.open(file)
     except OSError as err:
         return err
 
+    size = fitSize(image.size, size)
+    image = image.resize(size=size, resample=Image.LANCZOS)
+
+    return ImageTk.PhotoImage(image)
+
+def fitSize(image_size, size=None):
+    """
+    Target size of a resized image, see pilImageTk().
+
+    :param image_size: tuple(width, height) of the image.
+    :param size: int, tuple(width, height) or None.
+    :return: tuple(width, height)
+    """
     if not size:  # Do not resize. Use existing image size
-        size = image.size
+        size = image_size
 
     elif type(size) == int:
-        if image.size[0] == image.size[1]:  # Resize image based on user input.
+        if image_size[0] == image_size[1]:  # Resize image based on user input.
             size = (size, size)  # Use the same value for width & height.
-        elif image.size[0] > image.size[1]:  # Calculate ratio if width > height.
-            ratio = image.size[1] / image.size[0]
+        elif image_size[0] > image_size[1]:  # Calculate ratio if width > height.
+            ratio = image_size[1] / image_size[0]
             size = (size, int(size * ratio))
-        elif image.size[0] < image.size[1]:  # Calculate ratio if wdith < height.
-            ratio = image.size[0] / image.size[1]
+        elif image_size[0] < image_size[1]:  # Calculate ratio if wdith < height.
+            ratio = image_size[0] / image_size[1]
             size = (int(size * ratio), size)
 
-    image = image.resize(size=size, resample=Image.LANCZOS)
+    return size
 
-    return ImageTk.PhotoImage(image)
+@timed()
+def cachedImageTk(file, size, cache_dir):
+    """
+    Image for tkinter resized once with PIL and kept as a png in cache_dir. The cached file is keyed by the mtime of
+    the source and the target size, a hit is read by tk.PhotoImage and PIL is only imported on a miss.
+
+    :param file: Path & name to image file.
+    :param size: See pilImageTk(). None, the source is read by tk.PhotoImage without resizing.
+    :param cache_dir: Folder of the resized images.
+    :return: tk.PhotoImage or exception.
+    """
+    import tkinter as tk
 
+    try:
+        if not size:
+            return tk.PhotoImage(file=file)
+        stamp = os.stat(file).st_mtime_ns
+    except (OSError, tk.TclError) as err:
+        return err
+
+    stem = os.path.splitext(os.path.basename(file))[0]
+    key = 'x'.join(map(str, size)) if type(size) == tuple else str(size)
+    cache = os.path.join(cache_dir, f"{stem}-{key}-{stamp}.png")
+    if os.path.isfile(cache):
+        try:
+            return tk.PhotoImage(file=cache)
+        except tk.TclError:
+            pass  # Damaged, written again below.
+
+    try:
+        from PIL import Image
+    except ImportError:  # Integer subsample without PIL.
+        try:
+            image = tk.PhotoImage(file=file)
+        except tk.TclError as err:
+            return err
+        width, height = fitSize((image.width(), image.height()), size)
+        return image.subsample(max(1, round(image.width() / width)), max(1, round(image.height() / height)))
+
+    try:
+        with Image.open(file) as image:
+            image = image.resize(size=fitSize(image.size, size), resample=Image.LANCZOS)
+        os.makedirs(cache_dir, exist_ok=True)
+        for old in os.listdir(cache_dir):  # Remove the entries of a previous source mtime.
+            if old.startswith(f"{stem}-{key}-"):
+                os.remove(os.path.join(cache_dir, old))
+        image.save(cache)
+        return tk.PhotoImage(file=cache)
+    except (OSError, tk.TclError) as err:
+        return err
+
+@timed()
 def readConfig(file):
     """
     Read json file for app configuration settings.
@@ -63,6 +254,7 @@ def readConfig(file):
     else:
         return settings
 
+@timed()
 def writeConfig(file, settings):
     """
     Write app configuration settings to a json file.
@@ -79,3 +271,200 @@ def writeConfig(file, settings):
     else:
         return True
 
+def procTree(pid):
+    """
+    The pid and the pids of its live descendants, from /proc/<pid>/task/<tid>/children or a scan of /proc when the
+    kernel does not provide the children files. Linux only.
+
+    :param pid: Process id.
+    :return: List of pids, empty if the process is gone or a zombie.
+    """
+    if procStat(pid, io=False) is None:
+        return []
+    pids = [pid]
+
+    if os.path.exists(f'/proc/{pid}/task/{pid}/children'):
+        for parent in pids:  # pids grows while walking the tree.
+            try:
+                tasks = os.listdir(f'/proc/{parent}/task')
+            except OSError:  # Exited during the walk.
+                continue
+            for task in tasks:
+                try:
+                    with open(f'/proc/{parent}/task/{task}/children') as in_file:
+                        pids += [int(child) for child in in_file.read().split()]
+                except OSError:
+                    pass
+        return pids
+
+    parents = dict()  # No children files, map every process to its parent.
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            stat = procStat(int(entry), io=False)
+            if stat:
+                parents.setdefault(stat['ppid'], []).append(int(entry))
+    for parent in pids:
+        pids += parents.get(parent, [])
+    return pids
+
+def procStat(pid, io=True):
+    """
+    Resource counters of a process from /proc/<pid>/stat, status & io. Linux only.
+
+    :param pid: Process id.
+    :param io: BOOL Read the disk io counters, they are 0 if /proc/<pid>/io is not readable.
+    :return: Dictionary 'ppid', 'ticks' - user + system cpu time in clock ticks, 'rss' - resident bytes,
+             'read_bytes' & 'write_bytes' - storage io. None if the process is gone or a zombie.
+    """
+    try:
+        with open(f'/proc/{pid}/stat', 'rb') as in_file:
+            stat = in_file.read()
+        fields = stat[stat.rindex(b')') + 2:].split()  # The command name may hold spaces & parentheses.
+        if fields[0] in (b'Z', b'X'):
+            return None
+        result = {'ppid': int(fields[1]), 'ticks': int(fields[11]) + int(fields[12]), 'rss': 0, 'read_bytes': 0, 'write_bytes': 0}
+        with open(f'/proc/{pid}/status') as in_file:
+            for line in in_file:
+                if line.startswith('VmRSS:'):
+                    result['rss'] = int(line.split()[1]) * 1024
+                    break
+    except (OSError, ValueError, IndexError):
+        return None
+
+    if io:
+        try:
+            with open(f'/proc/{pid}/io') as in_file:
+                for line in in_file:
+                    ky, _, value = line.partition(':')
+                    if ky in ('read_bytes', 'write_bytes'):
+                        result[ky] = int(value)
+        except (OSError, ValueError):
+            pass
+    return result
+
+def _libc():
+    import ctypes  # Loaded on first use like PIL.
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+    except OSError:
+        return None
+    return libc if hasattr(libc, 'inotify_init1') else None
+
+def inotifyAvailable():
+    return _libc() is not None
+
+def _listFolder(folder):
+    """
+    :return: tuple([inode, mtime_ns], set of names), (None, empty set) if the folder does not exist.
+    """
+    try:
+        st = os.stat(folder)
+        return [st.st_ino, st.st_mtime_ns], set(os.listdir(folder))
+    except OSError:
+        return None, set()
+
+def _pollFolders(folders, cancel, poll):
+    listings = {folder: _listFolder(folder) for folder in folders}
+    while not cancel.wait(poll):
+        for folder in folders:
+            stamp, names = listings[folder]
+            try:
+                st = os.stat(folder)
+                if [st.st_ino, st.st_mtime_ns] == stamp:
+                    continue  # Adding, removing or renaming a file changes the folder mtime, no listing needed.
+            except OSError:
+                if stamp is None:
+                    continue
+            listings[folder] = _listFolder(folder)
+            new_names = listings[folder][1]
+            if new_names != names:
+                yield folder, sorted(new_names - names), sorted(names - new_names)
+
+def _inotifyFolders(libc, folders, cancel, poll, settle):
+    fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    if fd < 0:
+        yield from _pollFolders(folders, cancel, poll)
+        return
+    watches = dict()  # Watch descriptor -> folder.
+    missing = list(folders)  # Folders not created yet or removed, retried every poll seconds.
+    known = {folder: set() for folder in folders}  # Names reported for a folder that disappears.
+    first = True
+    try:
+        while not cancel.is_set():
+            for folder in list(missing):
+                wd = libc.inotify_add_watch(fd, os.fsencode(folder), WATCHMASK)
+                if wd < 0:
+                    continue
+                watches[wd] = folder
+                missing.remove(folder)
+                _, names = _listFolder(folder)
+                known[folder] = names
+                if not first and names:  # Created after the start, every name is new.
+                    yield folder, sorted(names), []
+            first = False
+
+            if not select.select([fd], [], [], poll)[0]:
+                continue
+            cancel.wait(settle)  # Let a burst of events, ex. an unzip, arrive as one delta.
+            data = b''
+            while True:
+                try:
+                    chunk = os.read(fd, 65536)
+                except BlockingIOError:
+                    break
+                if not chunk:
+                    break
+                data += chunk
+
+            deltas = dict()  # folder -> (added, removed)
+            offset = 0
+            while offset + INOTIFYEVENT.size <= len(data):
+                wd, mask, _, length = INOTIFYEVENT.unpack_from(data, offset)
+                name = os.fsdecode(data[offset + INOTIFYEVENT.size:offset + INOTIFYEVENT.size + length].rstrip(b'\0'))
+                offset += INOTIFYEVENT.size + length
+                folder = watches.get(wd)
+                if folder is None:
+                    continue
+                added, removed = deltas.setdefault(folder, (set(), set()))
+                if mask & (IN_CREATE | IN_MOVED_TO) and name:
+                    removed.discard(name)
+                    added.add(name)
+                elif mask & (IN_DELETE | IN_MOVED_FROM) and name:
+                    if name in added:
+                        added.discard(name)
+                    else:
+                        removed.add(name)
+                elif mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):  # The folder itself is gone.
+                    if mask & IN_MOVE_SELF:
+                        libc.inotify_rm_watch(fd, wd)
+                    watches.pop(wd, None)
+                    if folder not in missing:
+                        missing.append(folder)
+                    removed.update(known[folder])
+                    added.clear()
+            for folder, (added, removed) in deltas.items():
+                known[folder] = (known[folder] | added) - removed
+                if added or removed:
+                    yield folder, sorted(added), sorted(removed)
+    finally:
+        os.close(fd)
+
+def watchFolders(folders, cancel=None, poll=1.0, settle=0.2):
+    """
+    Generator of the changes to a list of folders, the files & folders added or removed. inotify is used where
+    available (Linux), the folders are polled otherwise: the folder stamp is checked every poll seconds and the
+    folder is only listed again when its mtime changed. A folder that does not exist yet is picked up once created.
+
+    :param folders: List of folder paths, the paths are yielded as given.
+    :param cancel: threading.Event, stops the generator.
+    :param poll: Seconds between the checks of the cancel event, the polling interval without inotify.
+    :param settle: Seconds to collect a burst of inotify events into one delta.
+    :return: Yields tuple(folder, sorted list of the names added, sorted list of the names removed).
+    """
+    if cancel is None:
+        cancel = threading.Event()
+    libc = _libc()
+    if libc is None:
+        yield from _pollFolders(list(folders), cancel, poll)
+    else:
+        yield from _inotifyFolders(libc, list(folders), cancel, poll, settle)
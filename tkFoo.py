@@ -6,21 +6,53 @@ Python 3.12.7
 
 tkFoo.py - Custom tkinter class.
 contains the code run the command create by the app.
+TkWorker - run a generator on a worker thread and deliver its items to the Tk mainloop with after() polling.
+NameIndex - sorted prefix & substring index over a list of names.
+FilterCombobox - ttk.Combobox with type-ahead filtering and a dropdown that only renders the visible rows.
+ChunkedText - ScrollBarText that shows a memory mapped file chunk by chunk as the user scrolls.
+Hovertip - idlelib Hovertip created on the first hover, idlelib is not imported at startup.
+ResourceSampler - cpu, rss & disk reads of a process tree sampled from /proc on a thread, with a csv time series.
+Session - a launched process with its pid, command, start time, state and output read on reader threads.
+SessionTab - ttk.Notebook tab with the output of a Session and Kill / Restart / Close buttons.
 
 """
 
 import os
+import csv
+import mmap
+import time
+import queue
+import signal
+import bisect
+import threading
 import subprocess
 
 import tkinter as tk
+import tkinter.ttk as ttk
 from tkinter.constants import *
 
+import foo
+
 class ScrollBarText():
     def __init__(self):
         super().__init__()
         self.sbText = None
+        self.sbScrollY = None
+        self.logLines = None  # Line cap of the log mode, None publishes straight to the Text widget.
+        self.logInterval = 50  # ms between batched inserts in log mode.
+        self.logPending = []
+        self.logClear = False
+        self.logEnd = False
+        self.logFlushId = None
 
-    def scbText(self, parent, title=""):
+    def scbText(self, parent, title="", maxlines=None):
+        """
+        :param parent: Parent widget.
+        :param title: LabelFrame title.
+        :param maxlines: int enables the log mode. Messages are coalesced into one insert per UI tick and the
+                         oldest lines are removed once the Text widget holds more than maxlines.
+        :return: tk.Text widget.
+        """
         frame = tk.LabelFrame(parent, text=title)  # Container for result widget, tk.Text & scrollbars.
         frame.rowconfigure(index=0, weight=1)
         frame.columnconfigure(index=0, weight=1)
@@ -38,23 +70,66 @@ class ScrollBarText():
         scby['command'] = self.sbText.yview
         scbx['command'] = self.sbText.xview
 
+        self.sbScrollY = scby
+        self.logLines = maxlines
+
         return self.sbText
 
     def publish(self, text, newline=True, cls=False, end=True):
+        if newline: text += '\n'
+        if self.logLines:  # Log mode, queue the message for the next batched insert.
+            if cls:
+                self.logPending.clear()
+                self.logClear = True
+            self.logPending.append(text)
+            self.logEnd = self.logEnd or end
+            if self.logFlushId is None:
+                self.logFlushId = self.sbText.after(self.logInterval, self._flush_log)
+            return
+
         self.sbText['state'] = NORMAL
         if cls: self.sbText.delete('1.0', END)
-        if newline: text += '\n'
         self.sbText.insert(END, text)
         self.sbText['state'] = DISABLED
         if end:
             self.sbText.see(END)
 
-    def run_command(self, cmd_str, cls=False):
+    def _flush_log(self):
+        """
+        Insert all pending log messages at once, toggling the Text state once per batch.
+        """
+        self.logFlushId = None
+        text = ''.join(self.logPending)
+        self.logPending.clear()
+
+        self.sbText['state'] = NORMAL
+        if self.logClear: self.sbText.delete('1.0', END)
+        self.sbText.insert(END, text)
+        self._trim_log()
+        self.sbText['state'] = DISABLED
+        if self.logEnd:
+            self.sbText.see(END)
+        self.logClear = False
+        self.logEnd = False
+
+    def _trim_log(self):
+        """
+        Remove the oldest lines above the log line cap. The Text state must be NORMAL.
+        """
+        if self.logLines:
+            lines = int(self.sbText.index('end-1c').split('.')[0]) - 1  # Messages end with a newline.
+            if lines > self.logLines:
+                self.sbText.delete('1.0', f'{lines - self.logLines + 1}.0')
+
+    def run_command(self, cmd_str, cls=False, wait=True, interval=100):
         """
         Method to launch the command-line instructions to run an external application.
 
         :param cmd_str: str() of the command instructions.
         :param cls: BOOL Clear creen before launching the command.
+        :param wait: BOOL Block until the process exits. If False return at once, stdout & stderr are read on
+                     reader threads and published in batches of lines as they arrive.
+        :param interval: Polling interval in ms for the output of a non-blocking launch.
         :return: Status of the subprocess.
         """
 
@@ -63,10 +138,23 @@ class ScrollBarText():
         else:
             return TypeError("<class 'str'>")
 
+        if not wait:
+            if cls: self.publish('', newline=False, cls=True)
+            with foo.timeBlock('run_command.spawn'):  # Time to start the process, not its run time.
+                p = subprocess.Popen(cmd_list, text=True, errors='replace', bufsize=1,
+                                     stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            lines = queue.Queue()
+            readers = [threading.Thread(target=self._read_pipe, args=(pipe, lines), daemon=True) for pipe in (p.stdout, p.stderr)]
+            for reader in readers:
+                reader.start()
+            self.sbText.after(interval, self._poll_command, p, lines, readers, interval)
+            return p
+
         self.sbText['state'] = NORMAL
         if cls: self.sbText.delete('1.0', END)
 
-        p = subprocess.Popen(cmd_list, text=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        with foo.timeBlock('run_command.spawn'):
+            p = subprocess.Popen(cmd_list, text=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
         stdout, stderr = p.communicate()
         if stderr:
             self.sbText.insert(END, stderr)
@@ -74,11 +162,832 @@ class ScrollBarText():
             self.sbText.insert(END, stdout)
 
         self.sbText.insert(END, f"\n *** Process Finished with Exit Code: {p.returncode} ***\n\n")
+        self._trim_log()
         self.sbText['state'] = DISABLED
         self.sbText.see(END)
 
         return p
 
+    @staticmethod
+    def _read_pipe(pipe, lines):
+        """
+        Reader thread for one pipe of a non-blocking launch.
+        """
+        for line in iter(pipe.readline, ''):
+            lines.put(line)
+        pipe.close()
+
+    def _poll_command(self, p, lines, readers, interval):
+        """
+        Publish the lines read since the last poll in one insert, then report the exit code once the process has
+        exited and both pipes are drained.
+        """
+        batch = []
+        while True:
+            try:
+                batch.append(lines.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self.publish(''.join(batch), newline=False)
+
+        if p.poll() is None or any(reader.is_alive() for reader in readers) or not lines.empty():
+            self.sbText.after(interval, self._poll_command, p, lines, readers, interval)
+        else:
+            self.publish(f"\n *** Process Finished with Exit Code: {p.returncode} ***\n")
+
+class TkWorker():
+    """
+    Run a function on a worker thread without blocking the Tk mainloop. The function is called with a cancel
+    keyword (threading.Event) and may return a generator, a list or a single value. Items are queued by the thread
+    and handed to on_items in batches, one batch per after() tick. Once cancelled, no further callbacks are made.
+    """
+    def __init__(self, widget, func, *args, on_items=None, on_done=None, interval=50, **kwargs):
+        """
+        :param widget: Any Tk widget, used for after().
+        :param func: Function to run on the worker thread.
+        :param on_items: Callback with a list of new items.
+        :param on_done: Callback with None or the exception raised by func.
+        :param interval: Polling interval in ms.
+        """
+        self.widget = widget
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.on_items = on_items
+        self.on_done = on_done
+        self.interval = interval
+        self.cancelled = threading.Event()
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        error = None
+        try:
+            result = self.func(*self.args, cancel=self.cancelled, **self.kwargs)
+            items = result if hasattr(result, '__iter__') and not isinstance(result, (str, dict)) else (result,)
+            for item in items:
+                if self.cancelled.is_set():
+                    break
+                self.queue.put(item)
+        except Exception as err:
+            error = err
+        self.queue.put((self, error))  # Sentinel, the worker itself marks the end of the items.
+
+    def start(self):
+        self.thread.start()
+        self.widget.after(self.interval, self._poll)
+        return self
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def is_alive(self):
+        return self.thread.is_alive()
+
+    def _poll(self):
+        items = []
+        finished = False
+        error = None
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if type(item) == tuple and item and item[0] is self:
+                finished = True
+                error = item[1]
+                break
+            items.append(item)
+
+        if self.cancelled.is_set():
+            return
+        if items and self.on_items:
+            self.on_items(items)
+        if finished:
+            if self.on_done:
+                self.on_done(error)
+        else:
+            self.widget.after(self.interval, self._poll)
+
+
+class ResourceSampler():
+    """
+    Sample the cpu, resident memory & disk io of a process and its descendants every interval seconds on a thread,
+    see foo.procStat(). The latest sample is read by the UI without blocking, every sample is appended to a csv file.
+    Linux only, see available().
+    """
+    HEADER = 'time', 'elapsed', 'processes', 'cpu_percent', 'rss_bytes', 'read_bytes', 'write_bytes'
+
+    def __init__(self, pid, interval=1.0, csv_file=None):
+        """
+        :param pid: Process id of the root of the tree.
+        :param interval: Seconds between samples.
+        :param csv_file: Path & name of the csv time series, None for no file.
+        """
+        self.pid = pid
+        self.interval = interval
+        self.csv_file = csv_file
+        self.latest = None  # Dictionary of the HEADER fields.
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def available():
+        return os.path.isfile('/proc/self/stat') and os.path.isfile('/proc/self/status')
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+
+    def _run(self):
+        tick = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+        start = last = time.monotonic()
+        previous = {pid: stat['ticks'] for pid in foo.procTree(self.pid) if (stat := foo.procStat(pid, io=False))}
+        out_file = writer = None
+        try:
+            if self.csv_file:
+                os.makedirs(os.path.dirname(self.csv_file) or '.', exist_ok=True)
+                out_file = open(self.csv_file, 'w', newline='')
+                writer = csv.writer(out_file)
+                writer.writerow(self.HEADER)
+            while not self.stopped.wait(self.interval):
+                stats = {pid: stat for pid in foo.procTree(self.pid) if (stat := foo.procStat(pid))}
+                if not stats:
+                    break
+                now = time.monotonic()
+                used = sum(stat['ticks'] - previous.get(pid, stat['ticks']) for pid, stat in stats.items())
+                previous = {pid: stat['ticks'] for pid, stat in stats.items()}
+                sample = {'time': round(time.time(), 3), 'elapsed': round(now - start, 3), 'processes': len(stats),
+                          'cpu_percent': round(used / tick / max(now - last, 1e-6) * 100, 1),
+                          'rss_bytes': sum(stat['rss'] for stat in stats.values()),
+                          'read_bytes': sum(stat['read_bytes'] for stat in stats.values()),
+                          'write_bytes': sum(stat['write_bytes'] for stat in stats.values())}
+                last = now
+                self.latest = sample
+                if writer:
+                    writer.writerow([sample[ky] for ky in self.HEADER])
+                    out_file.flush()
+        except OSError:
+            pass
+        finally:
+            if out_file:
+                out_file.close()
+
+class Session():
+    """
+    A launched process, ex. a Quake client or listen server. stdout & stderr are read on reader threads into a
+    queue, see read(). On POSIX the process leads its own process group so kill() also stops its children.
+    """
+    def __init__(self, cmd_str, name=None, sample_interval=0, sample_dir=None):
+        """
+        :param cmd_str: str() of the command instructions, see ScrollBarText.run_command().
+        :param name: Session name, defaults to the program of the command.
+        :param sample_interval: Seconds between resource samples, 0 for none, see ResourceSampler.
+        :param sample_dir: Folder of the csv time series of the samples, one file per launch.
+        """
+        self.cmd_str = cmd_str
+        self.name = name or os.path.basename(cmd_str.split(' ')[0])
+        self.sample_interval = sample_interval
+        self.sample_dir = sample_dir
+        self.sampler = None
+        self.proc = None
+        self.lines = queue.Queue()
+        self.readers = []
+        self.start_time = None
+        self.end_time = None
+        self.killed = False
+
+    def start(self):
+        """
+        Launch the command, a running session is killed first.
+
+        :return: self, or the exception if the command could not be started.
+        """
+        self.kill()
+        self.lines = queue.Queue()
+        self.killed = False
+        self.end_time = None
+        try:
+            with foo.timeBlock('run_command.spawn'):
+                self.proc = subprocess.Popen(self.cmd_str.split(' '), text=True, errors='replace', bufsize=1,
+                                             stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                             start_new_session=os.name == 'posix')
+        except (OSError, ValueError) as err:
+            self.proc = None
+            return err
+        self.start_time = time.time()
+        if self.sample_interval and ResourceSampler.available():
+            csv_file = None
+            if self.sample_dir:
+                stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(self.start_time))
+                csv_file = os.path.join(self.sample_dir, f"{stamp}-{self.name.replace(' ', '_')}-{self.proc.pid}.csv")
+            self.sampler = ResourceSampler(self.proc.pid, self.sample_interval, csv_file).start()
+        self.readers = [threading.Thread(target=ScrollBarText._read_pipe, args=(pipe, self.lines), daemon=True)
+                        for pipe in (self.proc.stdout, self.proc.stderr)]
+        for reader in self.readers:
+            reader.start()
+        return self
+
+    @property
+    def pid(self):
+        return self.proc.pid if self.proc else None
+
+    @property
+    def returncode(self):
+        return self.proc.poll() if self.proc else None
+
+    def is_running(self):
+        running = self.proc is not None and self.proc.poll() is None
+        if not running and self.proc is not None and self.end_time is None:
+            self.end_time = time.time()
+        return running
+
+    def is_drained(self):
+        """
+        True once the process has exited and all of its output was read.
+        """
+        return not self.is_running() and not any(reader.is_alive() for reader in self.readers) and self.lines.empty()
+
+    @property
+    def state(self):
+        if self.proc is None:
+            return 'not started'
+        if self.is_running():
+            return 'stopping' if self.killed else 'running'
+        return 'killed' if self.killed else f"exited ({self.proc.returncode})"
+
+    def read(self):
+        """
+        :return: List of the output lines read since the last call.
+        """
+        batch = []
+        while True:
+            try:
+                batch.append(self.lines.get_nowait())
+            except queue.Empty:
+                return batch
+
+    def _signal(self, sig):
+        try:
+            if os.name == 'posix':
+                os.killpg(self.proc.pid, sig)  # The process group, engines may start helper processes.
+            elif sig == signal.SIGTERM:
+                self.proc.terminate()
+            else:
+                self.proc.kill()
+        except (OSError, ProcessLookupError):
+            pass
+
+    def terminate(self):
+        """
+        Ask a running process to exit, see reap().
+        """
+        if self.is_running():
+            self.killed = True
+            self._signal(signal.SIGTERM)
+
+    def force_kill(self):
+        """
+        Kill a running process that ignored terminate(), without waiting for it.
+        """
+        if self.is_running():
+            self.killed = True
+            self._signal(getattr(signal, 'SIGKILL', signal.SIGTERM))
+
+    def kill(self, timeout=3):
+        """
+        Terminate the process and wait for it, it is killed if still running after timeout seconds. This blocks,
+        see SessionTab.stop() for the mainloop.
+
+        :param timeout: Seconds.
+        :return: None
+        """
+        self.reap([self], timeout)
+
+    @staticmethod
+    def reap(sessions, timeout=3):
+        """
+        Terminate all running sessions at once, then wait for each so no child process is left behind.
+
+        :param sessions: List of Session.
+        :param timeout: Seconds shared by all sessions before the remaining ones are killed.
+        :return: None
+        """
+        running = [session for session in sessions if session.is_running()]
+        for session in running:
+            session.terminate()
+        deadline = time.monotonic() + timeout
+        for session in running:
+            try:
+                session.proc.wait(max(0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                session.force_kill()
+                session.proc.wait()
+            session.is_running()  # Record the end time.
+        for session in sessions:
+            if session.sampler:
+                session.sampler.stop()
+
+class SessionTab(ScrollBarText):
+    """
+    ttk.Notebook tab for one Session. The output is published in log mode, the state line shows the pid, start
+    time and live state of the process.
+    """
+    def __init__(self, notebook, session, maxlines=None, interval=100, on_close=None, timeout=3):
+        """
+        :param notebook: ttk.Notebook of the sessions.
+        :param session: Started Session.
+        :param maxlines: Line cap of the output, see ScrollBarText.scbText().
+        :param interval: Polling interval in ms of the output & state.
+        :param on_close: Callback with this tab once it is closed.
+        :param timeout: Seconds before a process that ignores Kill, Restart or Close is killed, see stop().
+        """
+        ScrollBarText.__init__(self)
+        self.notebook = notebook
+        self.session = session
+        self.interval = interval
+        self.on_close = on_close
+        self.timeout = timeout
+        self.pollId = None
+        self.stopId = None
+        self.stopDeadline = None
+        self.stopThen = None
+        self.reported = False
+
+        self.frame = tk.Frame(notebook)
+        bar = tk.Frame(self.frame)
+        bar.pack(fill=X, padx=5, pady=(5, 0))
+        self.stateLabel = tk.Label(bar, anchor=W)
+        self.stateLabel.pack(side=LEFT, expand=True, fill=X)
+        for text, command in (("Close", self.close), ("Restart", self.restart), ("Kill", self.kill)):
+            tk.Button(bar, text=text, command=command).pack(side=RIGHT, padx=(5, 0))
+        self.scbText(self.frame, f" {session.cmd_str} ", maxlines=maxlines)
+        notebook.add(self.frame, text=f" {session.name} ")
+        notebook.select(self.frame)
+        self.poll()
+
+    def poll(self):
+        """
+        Publish the output read since the last poll and update the state line until the session is drained.
+        """
+        self.pollId = None
+        lines = self.session.read()
+        if lines:
+            self.publish(''.join(lines), newline=False)
+
+        started = time.strftime('%H:%M:%S', time.localtime(self.session.start_time)) if self.session.start_time else '-'
+        state = f"PID {self.session.pid}   Started {started}   {self.session.state}"
+        sample = self.session.sampler.latest if self.session.sampler and self.session.is_running() else None
+        if sample:
+            state += f"   CPU {sample['cpu_percent']:.0f}%   RSS {sample['rss_bytes'] / 2**20:.0f} MB   Read {sample['read_bytes'] / 2**20:.1f} MB"
+        self.stateLabel['text'] = state
+        if self.session.is_drained():
+            if not self.reported and self.session.proc is not None:
+                self.reported = True
+                self.publish(f"\n *** Process Finished with Exit Code: {self.session.returncode} ***\n")
+        else:
+            self.pollId = self.frame.after(self.interval, self.poll)
+
+    def stop(self, then=None):
+        """
+        Terminate the session without blocking the mainloop. The process is killed if still running after timeout
+        seconds, its exit is polled with after() and then is called once it is gone. Pressing another button while
+        the session stops replaces then.
+
+        :param then: Callback without arguments.
+        :return: None
+        """
+        if then:
+            self.stopThen = then
+        if self.stopId is not None:
+            return
+        self.session.terminate()
+        self.stopDeadline = time.monotonic() + self.timeout
+        self._waitStop()
+
+    def _waitStop(self):
+        self.stopId = None
+        if self.session.is_running():
+            if self.stopDeadline is not None and time.monotonic() >= self.stopDeadline:
+                self.stopDeadline = None
+                self.session.force_kill()
+            self.stopId = self.frame.after(self.interval, self._waitStop)
+            return
+        if self.session.sampler:
+            self.session.sampler.stop()
+        then, self.stopThen = self.stopThen, None
+        if then:
+            then()
+
+    def kill(self):
+        self.stop()
+
+    def restart(self):
+        self.stop(then=self._restart)
+
+    def _restart(self):
+        result = self.session.start()
+        if isinstance(result, Exception):
+            self.publish(f"\n *** Restart failed: {result} ***\n")
+        else:
+            self.publish(f"\n *** Restarted, PID {self.session.pid} ***\n")
+        self.reported = False
+        if self.pollId is None:
+            self.poll()
+
+    def close(self):
+        self.stop(then=self._close)
+
+    def _close(self):
+        if self.pollId is not None:
+            self.frame.after_cancel(self.pollId)
+            self.pollId = None
+        if self.logFlushId is not None:
+            self.sbText.after_cancel(self.logFlushId)
+            self.logFlushId = None
+        self.notebook.forget(self.frame)
+        self.frame.destroy()
+        if self.on_close:
+            self.on_close(self)
+
+
+class NameIndex():
+    """
+    Sorted index over a list of names for type-ahead filtering. Prefix matches are a bisect over the sorted keys.
+    Substring matches come from a str.find() scan over one string holding all keys while they are rare, or a single
+    comprehension once they turn out to be common. A query that extends the previous one only searches the previous matches.
+    """
+    def __init__(self, names):
+        self.names = sorted(names, key=str.lower)
+        self.keys = [name.lower() for name in self.names]
+        self.haystack = '\n'.join(self.keys) + '\n'
+        self.starts = []  # Offset of each key in haystack.
+        pos = 0
+        for key in self.keys:
+            self.starts.append(pos)
+            pos += len(key) + 1
+        self.last = ('', None)  # Previous query and its substring matches.
+
+    def __len__(self):
+        return len(self.names)
+
+    def _substring(self, text):
+        keys = self.keys
+        last_text, last_matches = self.last
+        if last_matches is not None and last_text and text.startswith(last_text):
+            return [i for i in last_matches if text in keys[i]]
+
+        matches = []
+        common = len(keys) // 16
+        find = self.haystack.find
+        starts = self.starts
+        pos = find(text)
+        while pos != -1:
+            if len(matches) > common:  # Common text, one pass over the keys is faster.
+                return [i for i, key in enumerate(keys) if text in key]
+            i = bisect.bisect_right(starts, pos) - 1
+            matches.append(i)
+            pos = find(text, starts[i] + len(keys[i]) + 1)  # Continue with the next key.
+        return matches
+
+    def search(self, text):
+        """
+        :param text: Search text, case-insensitive.
+        :return: List of indexes into names, prefix matches first then the other substring matches.
+        """
+        text = text.lower()
+        if not text:
+            self.last = ('', None)
+            return list(range(len(self.keys)))
+
+        matches = self._substring(text)
+        self.last = (text, matches)
+        lo = bisect.bisect_left(self.keys, text)
+        hi = bisect.bisect_left(self.keys, text + '\uffff', lo)
+        return list(range(lo, hi)) + [i for i in matches if not lo <= i < hi]
+
+
+class FilterCombobox(ttk.Combobox):
+    """
+    ttk.Combobox for long lists. The values are kept in a NameIndex instead of the Tk widget, typing filters the
+    list on each keystroke and the dropdown only holds the rows that are visible. Selecting a row sets the text and
+    generates <<ComboboxSelected>> like the ttk.Combobox.
+    """
+    def __init__(self, master=None, rows=12, key=None, **kw):
+        """
+        :param rows: Rows of the dropdown.
+        :param key: Function of a value to what identifies it, keeps the highlighted row when the values are
+                    replaced with new labels of the same items, ex. a map name followed by its title once known.
+        """
+        values = kw.pop('values', ())
+        super().__init__(master, **kw)
+        self.rows = rows
+        self.key = key or (lambda value: value)
+        self.index = NameIndex(values)
+        self.matches = list(range(len(self.index)))
+        self.query = None
+        self.top = 0  # First match shown in the dropdown.
+        self.cursor = -1  # Highlighted match, -1 for none.
+        self.popup = None
+        self.listbox = None
+        self.scrollbar = None
+
+        self.bind('<KeyRelease>', self._on_key)
+        self.bind('<Down>', lambda event: self._move(1))
+        self.bind('<Up>', lambda event: self._move(-1))
+        self.bind('<Next>', lambda event: self._move(self.rows))
+        self.bind('<Prior>', lambda event: self._move(-self.rows))
+        self.bind('<Return>', self._on_return)
+        self.bind('<Escape>', lambda event: self.hide())
+        self.bind('<ButtonPress-1>', self._on_press)
+        self.bind('<FocusIn>', self._on_focus_in)
+        self.bind('<FocusOut>', lambda event: self.after(150, self._check_focus))
+
+    # Values are stored in the index, never in the Tk widget. #
+    def __setitem__(self, key, value):
+        if key == 'values':
+            self.set_values(value)
+        else:
+            super().__setitem__(key, value)
+
+    def __getitem__(self, key):
+        if key == 'values':
+            return tuple(self.index.names)
+        return super().__getitem__(key)
+
+    def configure(self, cnf=None, **kw):
+        if isinstance(cnf, dict) and 'values' in cnf:
+            cnf = dict(cnf)
+            self.set_values(cnf.pop('values'))
+        if 'values' in kw:
+            self.set_values(kw.pop('values'))
+        return super().configure(cnf, **kw)
+
+    config = configure
+
+    def cget(self, key):
+        if key == 'values':
+            return tuple(self.index.names)
+        return super().cget(key)
+
+    def set_values(self, values):
+        """
+        Replace the values. The filter being typed is applied to the new values and the highlighted row stays on the
+        same item, values may arrive in batches while the user types. Empty values clear the filter too.
+        """
+        if not values:
+            values = ()
+            self.query = None
+        elif isinstance(values, str):
+            values = (values,)
+        highlighted = self.key(self.index.names[self.matches[self.cursor]]) if 0 <= self.cursor < len(self.matches) else None
+        self.index = NameIndex(values)
+        self.matches = self.index.search(self.query) if self.query else list(range(len(self.index)))
+        self.cursor = -1
+        if highlighted is not None:
+            names = self.index.names
+            self.cursor = next((n for n, i in enumerate(self.matches) if self.key(names[i]) == highlighted), -1)
+        if self.cursor < 0:
+            self.top = 0
+        elif not self.top <= self.cursor < self.top + self.rows:
+            self.top = max(0, self.cursor - self.rows + 1)
+        if self.popup:
+            self._render()
+
+    # Dropdown. #
+    def filter(self, text):
+        self.query = text
+        self.matches = self.index.search(text)
+        self.top = 0
+        self.cursor = 0 if text and self.matches else -1
+
+    def post(self):
+        if str(self['state']) == DISABLED:
+            return
+        if self.popup is None:
+            self.popup = tk.Toplevel(self)
+            self.popup.overrideredirect(True)
+            self.popup.transient(self.winfo_toplevel())
+            self.listbox = tk.Listbox(self.popup, height=self.rows, exportselection=False, activestyle=NONE, takefocus=0)
+            self.listbox.grid(row=0, column=0, sticky=NSEW)
+            self.scrollbar = tk.Scrollbar(self.popup, orient=VERTICAL, command=self._on_scrollbar)
+            self.scrollbar.grid(row=0, column=1, sticky=NS)
+            self.popup.columnconfigure(index=0, weight=1)
+            self.listbox.bind('<ButtonRelease-1>', self._on_click)
+            self.listbox.bind('<FocusOut>', lambda event: self.after(150, self._check_focus))
+            for sequence in '<MouseWheel>', '<Button-4>', '<Button-5>':
+                self.listbox.bind(sequence, self._on_wheel)
+        x = self.winfo_rootx()
+        y = self.winfo_rooty() + self.winfo_height()
+        self.popup.geometry(f"{max(self.winfo_width(), 120)}x{self.listbox.winfo_reqheight()}+{x}+{y}")
+        self.popup.deiconify()
+        self.popup.lift()
+        self._render()
+
+    def hide(self):
+        if self.popup is not None:
+            self.popup.withdraw()
+
+    def is_posted(self):
+        return self.popup is not None and self.popup.winfo_viewable()
+
+    def _render(self):
+        """
+        Fill the listbox with the visible rows only and update the scrollbar to the position in the matches.
+        """
+        total = len(self.matches)
+        self.top = max(0, min(self.top, total - self.rows))
+        visible = self.matches[self.top:self.top + self.rows]
+        self.listbox.delete(0, END)
+        if visible:
+            self.listbox.insert(END, *(self.index.names[i] for i in visible))
+        if 0 <= self.cursor - self.top < len(visible):
+            self.listbox.selection_set(self.cursor - self.top)
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + self.rows) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _scroll_to(self, top):
+        self.top = top
+        self._render()
+
+    def _move(self, step):
+        if not self.is_posted():
+            self.post()
+            return 'break'
+        if self.matches:
+            self.cursor = max(0, min(len(self.matches) - 1, self.cursor + step))
+            if self.cursor < self.top:
+                self.top = self.cursor
+            elif self.cursor >= self.top + self.rows:
+                self.top = self.cursor - self.rows + 1
+            self._render()
+        return 'break'
+
+    def _choose(self, match):
+        self.set(self.index.names[self.matches[match]])
+        self.icursor(END)
+        self.hide()
+        self.event_generate('<<ComboboxSelected>>')
+
+    # Event handlers. #
+    def _on_key(self, event):
+        if event.keysym in ('Up', 'Down', 'Prior', 'Next', 'Return', 'Escape', 'Tab'):
+            return
+        text = self.get()
+        if text != self.query:
+            self.filter(text)
+            self.post()
+
+    def _on_return(self, event):
+        if self.is_posted() and self.matches:
+            self._choose(max(self.cursor, 0))
+        return 'break'
+
+    def _on_press(self, event):
+        if 'arrow' in self.identify(event.x, event.y):
+            if self.is_posted():
+                self.hide()
+            else:
+                self.filter('')
+                self.post()
+            return 'break'
+
+    def _on_focus_in(self, event):
+        if self.get() == 'SELECT':
+            self.selection_range(0, END)  # Typing replaces the placeholder.
+
+    def _check_focus(self):
+        focus = self.focus_get()
+        if focus is not self and (self.popup is None or focus is None or not str(focus).startswith(str(self.popup))):
+            self.hide()
+
+    def _on_click(self, event):
+        row = self.listbox.nearest(event.y)
+        if 0 <= self.top + row < len(self.matches):
+            self._choose(self.top + row)
+
+    def _on_wheel(self, event):
+        if event.num == 5 or event.delta < 0:
+            self._scroll_to(self.top + 3)
+        else:
+            self._scroll_to(self.top - 3)
+        return 'break'
+
+    def _on_scrollbar(self, *args):
+        total = len(self.matches)
+        if args[0] == 'moveto':
+            self._scroll_to(int(float(args[1]) * total))
+        elif args[0] == 'scroll':
+            step = self.rows if args[2] == 'pages' else 1
+            self._scroll_to(self.top + int(args[1]) * step)
+
+
+class ChunkedText(ScrollBarText):
+    """
+    ScrollBarText for large text files. The file is memory mapped and decoded one chunk at a time, the next chunk is
+    added when the view scrolls near the end of the loaded text. Chunks end on a line break when there is one.
+    """
+    def __init__(self, chunk=65536):
+        super().__init__()
+        self.chunk = chunk
+        self.file = None
+        self.mm = None
+        self.pos = 0
+        self.decode = None
+        self.loading = False
+
+    def open_file(self, path, decode):
+        """
+        :param path: Path & name of the text file.
+        :param decode: Function of bytes -> list of tuple(text, tag), tag None for plain text.
+        :return: None
+        """
+        self.close_file()
+        self.file = open(path, 'rb')
+        if os.fstat(self.file.fileno()).st_size:
+            self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.pos = 0
+        self.decode = decode
+        self.sbText['yscrollcommand'] = self._on_yscroll
+        self.sbText.bind('<Destroy>', lambda event: self.close_file(), add='+')
+        self.load_chunk()
+
+    def close_file(self):
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def load_chunk(self):
+        """
+        Append the next chunk of the file to the Text widget.
+
+        :return: BOOL a chunk was added.
+        """
+        self.loading = False
+        mm = self.mm
+        if mm is None or self.pos >= len(mm):
+            return False
+
+        end = min(self.pos + self.chunk, len(mm))
+        if end < len(mm):
+            newline = mm.find(b'\n', end, min(end + self.chunk, len(mm)))
+            if newline != -1:
+                end = newline + 1
+            else:
+                while end > self.pos + 1 and 0x80 <= mm[end] < 0xc0:  # Do not split a UTF-8 character.
+                    end -= 1
+        data = mm[self.pos:end]
+        self.pos = end
+
+        args = []
+        for text, tag in self.decode(data):
+            args += [text, tag or ()]
+        self.sbText['state'] = NORMAL
+        if args:
+            self.sbText.insert(END, *args)
+        self.sbText['state'] = DISABLED
+        return True
+
+    def _on_yscroll(self, first, last):
+        self.sbScrollY.set(first, last)
+        if float(last) > 0.9 and not self.loading and self.mm is not None and self.pos < len(self.mm):
+            self.loading = True
+            self.sbText.after_idle(self.load_chunk)
+
+
+class Hovertip():
+    def __init__(self, anchor_widget, text, hover_delay=1000):
+        """
+        Tooltip of a widget. idlelib.tooltip.Hovertip is imported and created when the pointer first enters the
+        widget, importing idlelib adds a noticeable delay to the start of the app.
+
+        :param anchor_widget: Widget of the tooltip.
+        :param text: Tooltip text.
+        :param hover_delay: ms before the tooltip shows.
+        """
+        self.anchor_widget = anchor_widget
+        self.text = text
+        self.hover_delay = hover_delay
+        self.tip = None
+        anchor_widget.bind('<Enter>', self._on_enter, add='+')
+
+    def _on_enter(self, event=None):
+        if self.tip is None:
+            import idlelib.tooltip as it
+            self.tip = it.Hovertip(self.anchor_widget, text=self.text, hover_delay=self.hover_delay)
+            # Schedule the tip for this first <Enter>, it shows after hover_delay like the later ones. Hovertip binds
+            # <Enter> without add, so its handler replaces this one from the next event on.
+            self.tip._show_event(event)
+
 
 # Test Code #
 if __name__ == '__main__':